@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'processed', 'total', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('started_at', 'finished_at')
+    ordering = ('-id',)
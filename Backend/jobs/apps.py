@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'jobs'
+
+    def ready(self):
+        import jobs.signals
+        # Each app registers its job kinds in its jobs.py
+        autodiscover_modules("jobs")
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:13
+
+import django.db.models.deletion
+import django.utils.timezone
+import jobs.results
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=50)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('result_file', models.FileField(blank=True, max_length=255, null=True, storage=jobs.results.job_results_storage, upload_to=jobs.results.result_file_path)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='job_status_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from .results import job_results_storage, result_file_path
+
+
+class Job(models.Model):
+    """A long-running admin task (export, reconciliation, maintenance), run in the background by jobs.runner"""
+    STATUS_CHOICES = [("pending", "Pending"), ("running", "Running"), ("done", "Done"), ("failed", "Failed")]
+
+    kind = models.CharField(max_length=50)  # registered in jobs.registry
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    total = models.PositiveIntegerField(default=0)  # units of work, 0 while unknown
+    processed = models.PositiveIntegerField(default=0)
+    result = models.JSONField(default=dict, blank=True)  # summary written by the job
+    result_file = models.FileField(
+        storage=job_results_storage, upload_to=result_file_path, max_length=255, null=True, blank=True
+    )
+    error = models.TextField(blank=True, default="")
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Touched while the job runs; a running job whose heartbeat stops lost its process
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="job_status_created_idx"),
+        ]
+
+    def report(self, **fields):
+        """Save progress (total, processed, result) without writing the rest of the row"""
+        for name, value in fields.items():
+            setattr(self, name, value)
+        Job.objects.filter(pk=self.pk).update(**fields)
+
+    def save_result_file(self, filename, content):
+        self.result_file.save(filename, content, save=False)
+        Job.objects.filter(pk=self.pk).update(result_file=self.result_file.name)
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
@@ -0,0 +1,41 @@
+"""
+Job kinds. Apps register the functions that run them in their jobs.py, which
+JobsConfig.ready imports:
+
+    @register("export_users", clean=clean_export_params)
+    def export_users(job):
+        ...
+
+run(job) does the work, reporting progress with job.report() and storing any
+file with job.save_result_file(); what it returns becomes job.result.
+clean(params) validates the params of a new job and returns them, or raises
+ValueError with a message for the admin. Kinds registered with public=False can
+only be started by their own endpoint, which runs checks of its own (deleting a
+user, importing an upload), and not through POST /api/admin/jobs/.
+"""
+
+JOB_KINDS = {}
+PUBLIC_KINDS = set()
+
+
+def register(kind, clean=None, public=True):
+    def decorator(run):
+        JOB_KINDS[kind] = (run, clean)
+        if public:
+            PUBLIC_KINDS.add(kind)
+        return run
+    return decorator
+
+
+def get_kind(kind):
+    """Return (run, clean) for a registered kind, or raise ValueError"""
+    try:
+        return JOB_KINDS[kind]
+    except KeyError:
+        raise ValueError(f"kind must be one of: {', '.join(sorted(JOB_KINDS))}")
+
+
+def check_public(kind):
+    """Raise ValueError unless kind may be started through the generic jobs endpoint"""
+    if kind not in PUBLIC_KINDS:
+        raise ValueError(f"kind must be one of: {', '.join(sorted(PUBLIC_KINDS))}")
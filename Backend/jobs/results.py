@@ -0,0 +1,47 @@
+"""
+Result files of jobs (exports, reconciliation reports). They are kept outside
+MEDIA_ROOT, which is served publicly, and only downloaded through the admin
+jobs endpoint. Files uploaded for a job to read (imports) wait there too until
+the job has run.
+"""
+import csv
+import io
+import os
+import tempfile
+import uuid
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+def job_results_storage():
+    return FileSystemStorage(location=settings.JOB_RESULTS_ROOT)
+
+
+def result_file_path(job, filename):
+    return f"{job.created_at:%Y/%m}/{job.pk}/{filename}"
+
+
+# Uploads live under this directory of the job results storage
+UPLOADS_DIR = "uploads"
+
+
+def save_upload(upload):
+    """Store an uploaded file for a job to read; returns its name in job_results_storage()"""
+    return job_results_storage().save(f"{UPLOADS_DIR}/{uuid.uuid4().hex}/{os.path.basename(upload.name)}", upload)
+
+
+@contextmanager
+def csv_result(job, filename):
+    """
+    A csv.writer whose rows are spooled to a temporary file and stored as the
+    job's result file when the block exits without an error.
+    """
+    with tempfile.TemporaryFile() as raw:
+        text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+        yield csv.writer(text)
+        text.flush()
+        raw.seek(0)
+        job.save_result_file(filename, File(raw))
+        text.detach()
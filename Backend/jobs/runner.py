@@ -0,0 +1,105 @@
+"""
+Runs jobs off the request path. create_job() records a pending Job and hands it
+to Celery once the transaction commits; without a reachable broker it runs in a
+background thread of the web process instead. Whoever runs a job first claims it
+(pending -> running), so a job handed out twice still runs once. A running job
+touches heartbeat_at every HEARTBEAT_INTERVAL; one whose heartbeat stopped lost
+its process and is failed by fail_stale_running_jobs, because a half-done job
+cannot be assumed safe to run again. A job failed that way stays failed even
+if its process turns out to finish it later.
+"""
+import logging
+import threading
+from datetime import timedelta
+from django.db import transaction, close_old_connections
+from django.utils import timezone
+from .models import Job
+from .registry import get_kind
+
+logger = logging.getLogger(__name__)
+
+# Pending jobs older than this were never picked up (the process that started them exited)
+STALE_PENDING_AFTER = timedelta(minutes=5)
+HEARTBEAT_INTERVAL = timedelta(minutes=1)
+# Running jobs whose heartbeat is older than this lost the process running them
+STALE_RUNNING_AFTER = timedelta(minutes=5)
+
+
+def create_job(kind, params=None, created_by=None):
+    """Validate params and start a job of kind. Raises ValueError for an unknown kind or bad params."""
+    run, clean = get_kind(kind)
+    params = params or {}
+    if clean:
+        params = clean(params)
+    with transaction.atomic():
+        job = Job.objects.create(kind=kind, params=params, created_by=created_by)
+        start_job(job)
+    return job
+
+
+def run_job(job_id):
+    """Run a pending job to the end. Returns False when it was not pending (someone else has it)."""
+    now = timezone.now()
+    if not Job.objects.filter(id=job_id, status="pending").update(status="running", started_at=now, heartbeat_at=now):
+        return False
+    job = Job.objects.get(id=job_id)
+    stop = threading.Event()
+    threading.Thread(target=heartbeat, args=(job_id, stop), daemon=True).start()
+    try:
+        run, clean = get_kind(job.kind)
+        result = run(job)
+    except Exception as e:
+        logger.exception("Job %s (%s) failed", job_id, job.kind)
+        Job.objects.filter(id=job_id, status="running").update(
+            status="failed", error=str(e)[:1000], finished_at=timezone.now()
+        )
+        return True
+    finally:
+        stop.set()
+    fields = {"status": "done", "finished_at": timezone.now()}
+    if result is not None:
+        fields["result"] = result
+    Job.objects.filter(id=job_id, status="running").update(**fields)
+    return True
+
+
+def heartbeat(job_id, stop):
+    """
+    Touch the job's heartbeat_at until stop is set. A failed update (a locked database,
+    a dropped connection) is logged and retried on the next beat, with a fresh
+    connection if the old one broke.
+    """
+    try:
+        while not stop.wait(HEARTBEAT_INTERVAL.total_seconds()):
+            try:
+                Job.objects.filter(id=job_id, status="running").update(heartbeat_at=timezone.now())
+            except Exception:
+                logger.exception("Job %s could not update its heartbeat", job_id)
+                close_old_connections()
+    finally:
+        close_old_connections()
+
+
+def start_job(job):
+    """Run the job once the current transaction commits: on Celery, or in a background thread without a broker"""
+    def run():
+        try:
+            from .tasks import task_run_job
+            task_run_job.delay(job.id)
+        except Exception:
+            try:
+                run_job(job.id)
+            finally:
+                close_old_connections()
+    transaction.on_commit(lambda: threading.Thread(target=run, daemon=True).start())
+
+
+def stale_pending_jobs():
+    return Job.objects.filter(status="pending", created_at__lt=timezone.now() - STALE_PENDING_AFTER)
+
+
+def fail_stale_running_jobs():
+    """Mark running jobs whose heartbeat stopped as failed. Returns how many."""
+    return Job.objects.filter(status="running", heartbeat_at__lt=timezone.now() - STALE_RUNNING_AFTER).update(
+        status="failed", error="The process running the job stopped", finished_at=timezone.now()
+    )
@@ -0,0 +1,23 @@
+from django.urls import reverse
+from rest_framework import serializers
+from .models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Progress and result of a background job"""
+    result_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'params', 'status', 'total', 'processed', 'result', 'result_url', 'error',
+            'created_by', 'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+    def get_result_url(self, obj):
+        if not obj.result_file:
+            return None
+        url = reverse('admin-job-result', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,9 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import Job
+
+
+@receiver(post_delete, sender=Job)
+def delete_result_file(sender, instance, **kwargs):
+    if instance.result_file:
+        instance.result_file.delete(save=False)
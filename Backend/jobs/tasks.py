@@ -0,0 +1,17 @@
+from celery import shared_task
+from .runner import run_job, stale_pending_jobs, fail_stale_running_jobs
+
+
+@shared_task
+def task_run_job(job_id):
+    return run_job(job_id)
+
+
+@shared_task
+def task_run_stale_jobs():
+    """Queue pending jobs whose web process exited before running them, and fail running jobs whose process died"""
+    fail_stale_running_jobs()
+    job_ids = list(stale_pending_jobs().values_list("id", flat=True))
+    for job_id in job_ids:
+        task_run_job.delay(job_id)
+    return len(job_ids)
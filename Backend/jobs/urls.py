@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import JobListCreateView, JobDetailView, JobResultView
+
+urlpatterns = [
+    path('', JobListCreateView.as_view(), name='admin-job-list-create'),
+    path('<int:pk>/', JobDetailView.as_view(), name='admin-job-detail'),
+    path('<int:pk>/result/', JobResultView.as_view(), name='admin-job-result'),
+]
@@ -0,0 +1,58 @@
+import os
+from django.http import FileResponse
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from users.admin_views import IsAdminUser
+from .models import Job
+from .registry import check_public
+from .runner import create_job
+from .serializers import JobSerializer
+
+
+class JobListCreateView(APIView):
+    """
+    Recent jobs, newest first, optionally filtered by ?kind= and ?status= (Admin only).
+    POST {"kind": ..., "params": {...}} starts one of the public kinds and returns 202 with the job to poll.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+    LIMIT = 50
+
+    def get(self, request):
+        jobs = Job.objects.order_by('-id')
+        if request.query_params.get('kind'):
+            jobs = jobs.filter(kind=request.query_params['kind'])
+        if request.query_params.get('status'):
+            jobs = jobs.filter(status=request.query_params['status'])
+        return Response(JobSerializer(jobs[:self.LIMIT], many=True, context={'request': request}).data)
+
+    def post(self, request):
+        params = request.data.get('params') or {}
+        if not isinstance(params, dict):
+            return Response({"error": "params must be an object"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            check_public(request.data.get('kind'))
+            job = create_job(request.data.get('kind'), params, created_by=request.user)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(JobSerializer(job, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
+
+
+class JobDetailView(generics.RetrieveAPIView):
+    """Progress of one job (Admin only)"""
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+
+
+class JobResultView(APIView):
+    """Download the result file of a job (Admin only)"""
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+
+    def get(self, request, pk):
+        job = Job.objects.filter(pk=pk).first()
+        if job is None or not job.result_file:
+            return Response({"error": "Job has no result file"}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(
+            job.result_file.open('rb'), as_attachment=True, filename=os.path.basename(job.result_file.name)
+        )
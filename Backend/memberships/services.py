@@ -1,11 +1,13 @@
 from decimal import Decimal
-from users.models import User
-from wallets.models import Wallet, WalletTransaction
+from users.models import User, UserInfo
+from users.authentication import invalidate_cached_user
+from wallets.services import credit_wallet
+from notifications.services import dispatch
 from .models import Membership, MembershipCommission, MembershipPurchase
 from django.db import transaction
 
 @transaction.atomic
-def distribute_commission(buyer: User, membership: Membership):
+def distribute_commission(buyer: User, membership: Membership, purchase: MembershipPurchase = None):
     """
     Distribute commission up to 10 levels.
     Commission is defined in MembershipCommission table.
@@ -20,17 +22,23 @@ def distribute_commission(buyer: User, membership: Membership):
 
         commission_amount = Decimal(commission_obj.commission)
 
-        # Create wallet if not exists
-        wallet, _ = Wallet.objects.get_or_create(user=current_referrer)
-        wallet.balance += commission_amount
-        wallet.save(update_fields=["balance"])
-
-        # Log transaction
-        WalletTransaction.objects.create(
-            wallet=wallet,
+        # Credit wallet (created if not exists) and log transaction
+        credit_wallet(
+            current_referrer,
+            commission_amount,
+            description=f"Level {level} commission from {buyer.username}'s {membership.name} purchase",
+            kind="commission",
+            source_user=buyer,
+            level=level,
+            membership=membership,
+            purchase=purchase,
+        )
+        # Sent to the upline's channels after the purchase commits
+        dispatch(
+            current_referrer,
+            "commission",
+            f"You earned {commission_amount} from {buyer.username} at level {level}",
             amount=commission_amount,
-            transaction_type="credit",
-            description=f"Level {level} commission from {buyer.username}'s {membership.name} purchase"
         )
 
         # Move to next upline
@@ -53,6 +61,27 @@ def purchase_membership(user: User, membership_id: int):
     )
 
     # Distribute commissions
-    distribute_commission(user, membership)
+    distribute_commission(user, membership, purchase)
+
+    return purchase
+
 
-    return purchase
\ No newline at end of file
+def refresh_active_membership(user_id):
+    """
+    Copy the user's latest active purchase onto UserInfo.active_membership, active_purchase
+    and membership_purchased_at (all None when there is none). Called by the purchase signals;
+    call it directly after changing purchases with queryset.update(), which sends no signals.
+    """
+    purchase = (
+        MembershipPurchase.objects
+        .filter(user_id=user_id, is_active=True)
+        .order_by("-purchased_at", "-id")
+        .only("id", "membership_id", "purchased_at")
+        .first()
+    )
+    UserInfo.objects.filter(user_id=user_id).update(
+        active_membership_id=purchase.membership_id if purchase else None,
+        active_purchase_id=purchase.id if purchase else None,
+        membership_purchased_at=purchase.purchased_at if purchase else None,
+    )
+    invalidate_cached_user(user_id)
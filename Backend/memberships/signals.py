@@ -1,6 +1,7 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .models import MembershipPurchase
+from .services import refresh_active_membership
 from users.models import UserInfo
 
 
@@ -16,4 +17,10 @@ def set_user_verified_on_membership_purchase(sender, instance, created, **kwargs
         # Verify user and update membership status when they purchase a membership
         user_info.is_verified = True
         user_info.member_status = instance.membership.name
-        user_info.save()
\ No newline at end of file
+        user_info.save()
+
+
+@receiver([post_save, post_delete], sender=MembershipPurchase)
+def update_active_membership(sender, instance, **kwargs):
+    """Keep the denormalized active membership on UserInfo in step with purchases, deactivations and deletes"""
+    refresh_active_membership(instance.user_id)
@@ -221,7 +221,7 @@ class VerifyPaymentAPI(APIView):
                     )
                     
                     # Distribute commissions
-                    distribute_commission(user, membership)
+                    distribute_commission(user, membership, purchase)
                 
                 return Response({
                     "status": "success",
@@ -288,7 +288,7 @@ class PaymentWebhookAPI(APIView):
                             )
                             
                             # Distribute commissions
-                            distribute_commission(user, membership)
+                            distribute_commission(user, membership, purchase)
                     
                     return Response({"status": "success"}, status=status.HTTP_200_OK)
                 except Exception as e:
@@ -1,9 +1,29 @@
 from django.contrib import admin
-from .models import Notification
+from .models import Notification, Broadcast, OutgoingEmail
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ('user', 'title', 'is_read', 'created_at')
+    list_display = ('user', 'title', 'kind', 'event_count', 'is_read', 'created_at')
     search_fields = ('user__username', 'title', 'message')
-    list_filter = ('is_read', 'created_at')
-    ordering = ('-created_at',)
\ No newline at end of file
+    list_filter = ('is_read', 'kind', 'created_at')
+    ordering = ('-created_at',)
+
+@admin.register(Broadcast)
+class BroadcastAdmin(admin.ModelAdmin):
+    list_display = ('title', 'created_by', 'created_at')
+    search_fields = ('title',)
+    readonly_fields = ('created_by', 'created_at')
+    ordering = ('-created_at',)
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    search_fields = ('to_email', 'subject')
+    list_filter = ('status',)
+    ordering = ('-created_at',)
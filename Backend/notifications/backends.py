@@ -0,0 +1,43 @@
+"""
+Delivery backends for the notification dispatcher (see NOTIFICATION_CHANNELS).
+
+A backend receives a batch of event dicts with user_id, username, email,
+phone_number, kind, title, message and amount, and delivers them over its
+channel. Subclass BaseBackend and implement send_batch to plug in a provider.
+Inbox notifications and emails have no backend: the dispatcher writes them (the
+email as an OutgoingEmail row) in the caller's transaction.
+"""
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class BaseBackend:
+    def __init__(self, **options):
+        self.options = options
+
+    def send_batch(self, events):
+        raise NotImplementedError
+
+
+class ConsoleBackend(BaseBackend):
+    """Logs that an event would be sent, without its recipient or text; for local development"""
+
+    def send_batch(self, events):
+        for event in events:
+            logger.info("%s: %s event for user %s", self.options.get("channel", "notification"), event["kind"], event["user_id"])
+
+
+class FileBackend(BaseBackend):
+    """Appends every event as a JSON line to OPTIONS["path"]; a stand-in for any channel in local tests"""
+    lock = threading.Lock()
+
+    def send_batch(self, events):
+        lines = "".join(
+            json.dumps({"channel": self.options.get("channel"), **event}, default=str) + "\n"
+            for event in events
+        )
+        with self.lock, open(self.options["path"], "a", encoding="utf-8") as f:
+            f.write(lines)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from notifications.retention import prune_expired_rows, vacuum_pruned_tables
+
+
+class Command(BaseCommand):
+    help = "Delete read notifications and expired or used password reset tokens past their retention period"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="Rows per delete transaction (default RETENTION_BATCH_SIZE)")
+        parser.add_argument("--pause", type=float, default=0, help="Seconds to sleep between batches")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the rows that are due")
+        parser.add_argument("--vacuum", action="store_true", help="VACUUM (ANALYZE) the pruned tables afterwards (PostgreSQL)")
+
+    def handle(self, *args, **options):
+        results = prune_expired_rows(options["batch_size"], options["pause"], options["dry_run"])
+        verb = "due" if options["dry_run"] else "deleted"
+        for name, count in results.items():
+            self.stdout.write(self.style.SUCCESS(f"{name}: {count} {verb}"))
+        if options["vacuum"] and not options["dry_run"]:
+            vacuum_pruned_tables()
@@ -0,0 +1,20 @@
+import time
+from django.core.management.base import BaseCommand
+from notifications.outbox import drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Send the emails waiting in the outbox over one SMTP connection"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="Emails claimed at a time (default EMAIL_OUTBOX_BATCH_SIZE)")
+        parser.add_argument("--loop", type=float, metavar="SECONDS", help="Keep running, draining every SECONDS")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = drain_outbox(options["batch_size"])
+            if sent or failed or not options["loop"]:
+                self.stdout.write(self.style.SUCCESS(f"Sent {sent} emails, {failed} failed attempts"))
+            if not options["loop"]:
+                break
+            time.sleep(options["loop"])
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:28
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_broadcasts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='amount_total',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='event_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='group_key',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='kind',
+            field=models.CharField(blank=True, default='', max_length=30),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(fields=('user', 'group_key'), name='notification_unique_digest'),
+        ),
+    ]
@@ -7,4 +7,73 @@ class Notification(models.Model):
     title = models.CharField(max_length=255)
     message = models.TextField()
     is_read = models.BooleanField(default=False)
-    created_at = models.DateTimeField(default=timezone.now)
\ No newline at end of file
+    created_at = models.DateTimeField(default=timezone.now)
+    # Digest rows: events of one kind in one window are merged into the row with the same group_key
+    kind = models.CharField(max_length=30, blank=True, default="")
+    group_key = models.CharField(max_length=100, null=True, blank=True)
+    event_count = models.PositiveIntegerField(default=1)
+    amount_total = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "is_read", "created_at"]),
+            models.Index(fields=["user", "-created_at", "-id"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "group_key"], name="notification_unique_digest"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.title}"
+
+
+class Broadcast(models.Model):
+    """Announcement shown in the inbox of every member who joined before it, stored once"""
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at", "-id"]),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class BroadcastReadMarker(models.Model):
+    """High-water mark of the broadcasts a user has read: every broadcast with id <= last_read_id is read"""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="broadcast_marker")
+    last_read_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user} read broadcasts up to {self.last_read_id}"
+
+
+class OutgoingEmail(models.Model):
+    """Email waiting in the outbox; sent by notifications.outbox.drain_outbox"""
+    STATUS_CHOICES = [("pending", "Pending"), ("sending", "Sending"), ("sent", "Sent"), ("failed", "Failed")]
+
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    # Pending: earliest time of the next attempt. Sending: when the claim expires and the row may be retried.
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to_email} ({self.status})"
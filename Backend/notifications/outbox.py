@@ -0,0 +1,122 @@
+"""
+Email outbox. Requests only insert OutgoingEmail rows; drain_outbox sends them in
+batches over one SMTP connection and retries failures with exponential backoff.
+"""
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction, close_old_connections
+from django.db.models import F
+from django.utils import timezone
+from .models import OutgoingEmail
+
+
+def enqueue_email(to_email, subject, body, from_email=None):
+    """Queue an email and make sure a worker picks it up once the transaction commits"""
+    email = OutgoingEmail.objects.create(
+        to_email=to_email,
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+    transaction.on_commit(wake_outbox_worker)
+    return email
+
+
+def wake_outbox_worker():
+    """Ask Celery to drain the outbox; without a broker, drain in a background thread instead"""
+    def run():
+        try:
+            from .tasks import task_send_queued_mail
+            task_send_queued_mail.delay()
+        except Exception:
+            try:
+                drain_outbox()
+            finally:
+                close_old_connections()
+    threading.Thread(target=run, daemon=True).start()
+
+
+def claim_batch(batch_size):
+    """
+    Claim due emails for this worker. Claimed rows are marked "sending" with a lease;
+    rows of a worker that died mid-batch become due again when the lease runs out,
+    unless that was their last attempt: those fail, as after EMAIL_OUTBOX_MAX_ATTEMPTS
+    errors, so an email that kills its worker is not retried forever.
+    Workers skip rows locked by each other, so several can drain at once.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        OutgoingEmail.objects.filter(
+            status="sending", next_attempt_at__lte=now, attempts__gte=settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+        ).update(status="failed", last_error="The worker sending the last attempt stopped before it finished")
+        ids = list(
+            OutgoingEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status__in=["pending", "sending"], next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        OutgoingEmail.objects.filter(id__in=ids).update(
+            status="sending",
+            attempts=F("attempts") + 1,
+            next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE),
+        )
+    return list(OutgoingEmail.objects.filter(id__in=ids).order_by("id"))
+
+
+def mark_failed_attempt(email, error):
+    """Schedule the next attempt with exponential backoff, or give up after EMAIL_OUTBOX_MAX_ATTEMPTS"""
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        changes = {"status": "failed"}
+    else:
+        delay = min(settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (email.attempts - 1), 3600)
+        changes = {"status": "pending", "next_attempt_at": timezone.now() + timedelta(seconds=delay)}
+    OutgoingEmail.objects.filter(id=email.id).update(last_error=str(error)[:1000], **changes)
+
+
+def drain_outbox(batch_size=None):
+    """
+    Send due emails until none are left, reusing one SMTP connection for all of them.
+    Returns (sent, failed attempts).
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    sent = failed = 0
+    connection = None
+    try:
+        while True:
+            batch = claim_batch(batch_size)
+            if not batch:
+                break
+            for email in batch:
+                try:
+                    if connection is None:
+                        connection = get_connection(fail_silently=False)
+                        connection.open()
+                    EmailMessage(
+                        subject=email.subject,
+                        body=email.body,
+                        from_email=email.from_email or settings.DEFAULT_FROM_EMAIL,
+                        to=[email.to_email],
+                        connection=connection,
+                    ).send()
+                except Exception as e:
+                    failed += 1
+                    mark_failed_attempt(email, e)
+                    # The connection may be broken; open a fresh one for the next email
+                    if connection is not None:
+                        try:
+                            connection.close()
+                        except Exception:
+                            pass
+                        connection = None
+                    continue
+                sent += 1
+                OutgoingEmail.objects.filter(id=email.id).update(
+                    status="sent", sent_at=timezone.now(), last_error=""
+                )
+    finally:
+        if connection is not None:
+            connection.close()
+    return sent, failed
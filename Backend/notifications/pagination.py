@@ -0,0 +1,67 @@
+import base64
+import heapq
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# Inbox rows come from several tables; the source tag breaks created_at ties between them
+NOTIFICATION_SOURCE = "n"
+BROADCAST_SOURCE = "b"
+
+
+def encode_cursor(created_at, source, pk):
+    """Opaque cursor for the position of one row in (created_at, source, id) order"""
+    raw = f"{created_at.isoformat()}|{source}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return (created_at, source, id) from a cursor, or raise ValueError"""
+    try:
+        parts = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        if len(parts) == 2:
+            # Cursor issued before broadcasts were merged into the inbox
+            parts.insert(1, NOTIFICATION_SOURCE)
+        created_at, source, pk = parts
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if created_at is None:
+        raise ValueError("Invalid cursor")
+    return created_at, source, pk
+
+
+def after_cursor(queryset, source, cursor):
+    """Rows of one source that come after the cursor in newest-first order"""
+    created_at, cursor_source, pk = cursor
+    if source < cursor_source:
+        return queryset.filter(created_at__lte=created_at)
+    if source > cursor_source:
+        return queryset.filter(created_at__lt=created_at)
+    return queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+
+def keyset_page(sources, cursor=None, limit=20):
+    """
+    Newest-first page over one or more (source tag, queryset) pairs, keyed on
+    (created_at, source, id). Each source is read with an index range scan of at
+    most limit + 1 rows, then the sources are merged, so the cost does not grow
+    with how deep the reader pages.
+    Returns ([(source, row), ...], next cursor or None).
+    """
+    position = decode_cursor(cursor) if cursor else None
+    streams = []
+    for source, queryset in sources:
+        if position:
+            queryset = after_cursor(queryset, source, position)
+        rows = queryset.order_by("-created_at", "-id")[:limit + 1]
+        streams.append([(source, row) for row in rows])
+
+    merged = list(heapq.merge(
+        *streams, key=lambda item: (item[1].created_at, item[0], item[1].id), reverse=True
+    ))
+    if len(merged) <= limit:
+        return merged, None
+    merged = merged[:limit]
+    source, row = merged[-1]
+    return merged, encode_cursor(row.created_at, source, row.id)
@@ -0,0 +1,147 @@
+"""
+Pub/sub used to push events to open notification streams.
+
+Publishers call publish() from regular (sync) code; stream views subscribe from
+the event loop. The layer is picked with the NOTIFICATION_CHANNEL_LAYER setting:
+
+- InMemoryChannelLayer only reaches streams served by the same process. Use it for
+  tests and for a single ASGI worker.
+- RedisChannelLayer goes through Redis pub/sub, so events published by any web
+  worker or Celery worker reach every stream.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+def user_group(user_id):
+    return f"user.{user_id}"
+
+
+class Subscription:
+    """Events of one group for one stream. get() returns None when timeout passes without an event."""
+
+    async def get(self, timeout=None):
+        raise NotImplementedError
+
+    async def close(self):
+        raise NotImplementedError
+
+
+class BaseChannelLayer:
+    def publish(self, group, message):
+        """Send a JSON-serialisable message to every subscriber of group. Safe to call from any thread."""
+        raise NotImplementedError
+
+    async def subscribe(self, group):
+        """Return a Subscription for group. Must be awaited on the event loop that will read it."""
+        raise NotImplementedError
+
+
+class InMemorySubscription(Subscription):
+    def __init__(self, layer, group, loop, queue):
+        self.layer = layer
+        self.group = group
+        self.loop = loop
+        self.queue = queue
+
+    def offer(self, message):
+        # Runs on the subscriber's loop; a stream that stopped reading loses events instead of growing
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+    async def get(self, timeout=None):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.layer.unsubscribe(self)
+
+
+class InMemoryChannelLayer(BaseChannelLayer):
+    queue_size = 100
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.groups = defaultdict(set)
+
+    def publish(self, group, message):
+        with self.lock:
+            subscriptions = list(self.groups.get(group, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, message)
+            except RuntimeError:
+                # The subscriber's loop is closed; it will be removed when the stream ends
+                pass
+
+    async def subscribe(self, group):
+        subscription = InMemorySubscription(
+            self, group, asyncio.get_running_loop(), asyncio.Queue(maxsize=self.queue_size)
+        )
+        with self.lock:
+            self.groups[group].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.groups.get(subscription.group)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.groups[subscription.group]
+
+
+class RedisSubscription(Subscription):
+    def __init__(self, client, pubsub):
+        self.client = client
+        self.pubsub = pubsub
+
+    async def get(self, timeout=None):
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message["data"])
+
+    async def close(self):
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+class RedisChannelLayer(BaseChannelLayer):
+    prefix = "notifications:"
+
+    def __init__(self, url=None):
+        import redis
+
+        self.url = url or settings.NOTIFICATION_REDIS_URL
+        self.client = redis.Redis.from_url(self.url)
+
+    def publish(self, group, message):
+        self.client.publish(self.prefix + group, json.dumps(message))
+
+    async def subscribe(self, group):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(self.prefix + group)
+        return RedisSubscription(client, pubsub)
+
+
+@lru_cache(maxsize=None)
+def get_channel_layer():
+    return import_string(settings.NOTIFICATION_CHANNEL_LAYER)()
+
+
+def publish_to_user(user_id, event, data):
+    """Push an event to the open streams of a user"""
+    get_channel_layer().publish(user_group(user_id), {"event": event, "data": data})
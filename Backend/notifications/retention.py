@@ -0,0 +1,101 @@
+"""
+Retention rules for rows that are only useful for a while: read notifications,
+expired or used password reset tokens, sent or failed outbox emails and finished
+admin jobs.
+
+Rows are deleted in primary-key order, batch_size at a time, each batch in its
+own short transaction, so the purge never holds locks on many rows and
+autovacuum can reuse the freed space as it goes.
+"""
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction, connection
+from django.db.models import Q
+from django.utils import timezone
+from jobs.models import Job
+from users.models import PasswordResetToken
+from .models import Notification, OutgoingEmail
+
+
+def retention_rules(now=None):
+    """Yield (rule name, queryset of rows past their retention period)"""
+    now = now or timezone.now()
+    read_days = dict(settings.NOTIFICATION_RETENTION_DAYS)
+    default_days = read_days.pop("default", None)
+
+    for kind, days in read_days.items():
+        if days is not None:
+            yield f"read notifications ({kind})", Notification.objects.filter(
+                kind=kind, is_read=True, created_at__lt=now - timedelta(days=days)
+            )
+    if default_days is not None:
+        yield "read notifications", Notification.objects.filter(
+            is_read=True, created_at__lt=now - timedelta(days=default_days)
+        ).exclude(kind__in=list(read_days))
+
+    unread_days = settings.NOTIFICATION_UNREAD_RETENTION_DAYS
+    if unread_days is not None:
+        yield "unread notifications", Notification.objects.filter(
+            is_read=False, created_at__lt=now - timedelta(days=unread_days)
+        )
+
+    cutoff = now - timedelta(days=settings.PASSWORD_RESET_TOKEN_RETENTION_DAYS)
+    yield "password reset tokens", PasswordResetToken.objects.filter(
+        Q(expires_at__lt=cutoff) | Q(used=True, created_at__lt=cutoff)
+    )
+
+    yield "outbox emails", OutgoingEmail.objects.filter(
+        status__in=["sent", "failed"],
+        created_at__lt=now - timedelta(days=settings.EMAIL_OUTBOX_RETENTION_DAYS),
+    )
+
+    # jobs.signals deletes the result file of each deleted job
+    yield "finished jobs", Job.objects.filter(
+        status__in=["done", "failed"], finished_at__lt=now - timedelta(days=settings.JOB_RETENTION_DAYS)
+    )
+
+
+def delete_in_batches(queryset, batch_size=1000, pause=0):
+    """
+    Delete the rows of queryset batch_size primary keys at a time. Each batch is
+    looked up after the last deleted key, so rows that are kept are not scanned again.
+    Returns the number of rows deleted.
+    """
+    model = queryset.model
+    deleted = 0
+    last_pk = None
+    while True:
+        batch = queryset.order_by("pk")
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        ids = list(batch.values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            model.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+        last_pk = ids[-1]
+        if len(ids) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return deleted
+
+
+def prune_expired_rows(batch_size=None, pause=0, dry_run=False):
+    """Apply every retention rule. Returns {rule name: rows deleted (or due, with dry_run)}."""
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+    results = {}
+    for name, queryset in retention_rules():
+        results[name] = queryset.count() if dry_run else delete_in_batches(queryset, batch_size, pause)
+    return results
+
+
+def vacuum_pruned_tables():
+    """Let PostgreSQL reuse the space of the deleted rows right away and refresh planner statistics"""
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        for model in (Notification, PasswordResetToken, OutgoingEmail, Job):
+            cursor.execute(f"VACUUM (ANALYZE) {connection.ops.quote_name(model._meta.db_table)}")
@@ -0,0 +1,31 @@
+from rest_framework import serializers
+from .models import Notification, Broadcast
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    type = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Notification
+        fields = ['id', 'type', 'kind', 'title', 'message', 'event_count', 'amount_total', 'is_read', 'created_at']
+        read_only_fields = fields
+
+    def get_type(self, obj):
+        return "notification"
+
+
+class BroadcastSerializer(serializers.ModelSerializer):
+    """Broadcast as an inbox item; is_read comes from the reader's high-water mark in context"""
+    type = serializers.SerializerMethodField()
+    is_read = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Broadcast
+        fields = ['id', 'type', 'title', 'message', 'is_read', 'created_at']
+        read_only_fields = ['id', 'type', 'is_read', 'created_at']
+
+    def get_type(self, obj):
+        return "broadcast"
+
+    def get_is_read(self, obj):
+        return obj.id <= self.context.get("broadcast_marker", 0)
@@ -0,0 +1,331 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction, IntegrityError, close_old_connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import Notification, Broadcast, BroadcastReadMarker
+from .outbox import enqueue_email
+
+logger = logging.getLogger(__name__)
+
+UNREAD_COUNT_KEY = "notifications:unread:{}"
+UNREAD_BROADCASTS_KEY = "notifications:unread-broadcasts:{}:{}"
+
+# Notification kinds that are coalesced into one digest row per user and day
+DIGESTS = {
+    "commission": {
+        "title": "Referral commission received",
+        "summary": "You earned {amount} from {count} purchases today",
+    },
+    "referral": {
+        "title": "New referral registered",
+        "summary": "{count} new referrals registered in your team today",
+    },
+}
+
+
+def unread_count(user_id):
+    """
+    Unread notification count of a user, served from the cache.
+    The counter is computed once on a miss and then kept current by adjust_unread_count;
+    the TTL bounds how long a missed adjustment can leave it wrong.
+    """
+    key = UNREAD_COUNT_KEY.format(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+        cache.add(key, count, settings.NOTIFICATION_UNREAD_COUNT_TTL)
+    return max(count, 0)
+
+
+def adjust_unread_count(user_id, delta):
+    """Add delta to a cached unread counter. A missing counter is left to be computed on the next read."""
+    if not delta:
+        return
+    try:
+        cache.incr(UNREAD_COUNT_KEY.format(user_id), delta)
+    except ValueError:
+        pass
+
+
+def mark_read(user_id, ids=None, from_id=None, to_id=None):
+    """Mark a user's unread notifications read, by id list and/or id range. Returns the number marked."""
+    queryset = Notification.objects.filter(user_id=user_id, is_read=False)
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    if from_id is not None:
+        queryset = queryset.filter(id__gte=from_id)
+    if to_id is not None:
+        queryset = queryset.filter(id__lte=to_id)
+    marked = queryset.update(is_read=True)
+    adjust_unread_count(user_id, -marked)
+    return marked
+
+
+def notify(user, kind, message, amount=None):
+    """
+    Record one event in the digest of kind for today of user (a User or a user id). The first event of the
+    day creates the row with its own message; later events update that row to a
+    summary, mark it unread again and move it to the top of the inbox, so a busy
+    team costs one row per member and day instead of one per event.
+    """
+    digest = DIGESTS[kind]
+    user_id = getattr(user, "pk", user)
+    now = timezone.now()
+    group_key = f"{kind}:{timezone.localdate(now):%Y-%m-%d}"
+    amount = Decimal(amount) if amount is not None else None
+
+    with transaction.atomic():
+        row = Notification.objects.select_for_update().filter(user_id=user_id, group_key=group_key).first()
+        if row is None:
+            try:
+                with transaction.atomic():
+                    return Notification.objects.create(
+                        user_id=user_id,
+                        kind=kind,
+                        group_key=group_key,
+                        title=digest["title"],
+                        message=message,
+                        amount_total=amount,
+                        created_at=now,
+                        updated_at=now,
+                    )
+            except IntegrityError:
+                # Another event created today's digest first
+                row = Notification.objects.select_for_update().get(user_id=user_id, group_key=group_key)
+
+        reopened = row.is_read
+        row.event_count += 1
+        if amount is not None:
+            row.amount_total = (row.amount_total or Decimal("0")) + amount
+        row.message = digest["summary"].format(count=row.event_count, amount=f"{row.amount_total or 0:,}")
+        row.is_read = False
+        row.created_at = now
+        row.updated_at = now
+        row.save(update_fields=["event_count", "amount_total", "message", "is_read", "created_at", "updated_at"])
+
+    if reopened:
+        adjust_unread_count(row.user_id, 1)
+    return row
+
+
+def send_broadcast(title, message, created_by=None):
+    """Publish an announcement to every member with a single insert"""
+    return Broadcast.objects.create(title=title, message=message, created_by=created_by)
+
+
+def latest_broadcast_id():
+    """
+    Id of the newest broadcast (0 when none). Read from the database on every call:
+    it is one primary key index lookup, and a cached copy would hide new broadcasts
+    from workers that did not send them.
+    """
+    return Broadcast.objects.order_by("-id").values_list("id", flat=True).first() or 0
+
+
+def broadcasts_for(user):
+    """Broadcasts shown in a user's inbox: the ones sent since the user joined"""
+    return Broadcast.objects.filter(created_at__gte=user.created_at)
+
+
+def broadcast_read_marker(user_id):
+    """Id of the newest broadcast the user has read (0 when none)"""
+    return (
+        BroadcastReadMarker.objects.filter(user_id=user_id).values_list("last_read_id", flat=True).first()
+        or 0
+    )
+
+
+def unread_broadcast_count(user):
+    """
+    Unread broadcasts of a user. Cached per user and per latest broadcast id, so a
+    new broadcast or a moved read marker naturally switches to a fresh key.
+    """
+    latest = latest_broadcast_id()
+    key = UNREAD_BROADCASTS_KEY.format(user.id, latest)
+    count = cache.get(key)
+    if count is None:
+        count = broadcasts_for(user).filter(id__gt=broadcast_read_marker(user.id), id__lte=latest).count()
+        cache.set(key, count, settings.NOTIFICATION_UNREAD_COUNT_TTL)
+    return count
+
+
+def mark_broadcasts_read(user, up_to_id):
+    """
+    Move the user's broadcast read marker forward to up_to_id, but never past the
+    latest broadcast: a marker ahead of it would hide broadcasts sent later.
+    """
+    latest = latest_broadcast_id()
+    up_to_id = min(up_to_id, latest)
+    marker, created = BroadcastReadMarker.objects.get_or_create(user=user)
+    if up_to_id > marker.last_read_id:
+        marker.last_read_id = up_to_id
+        marker.save(update_fields=["last_read_id", "updated_at"])
+        cache.delete(UNREAD_BROADCASTS_KEY.format(user.id, latest))
+    return marker.last_read_id
+
+
+class TokenBucket:
+    """Rate limit shared by the workers of a channel: rate events per second, bursts up to capacity"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, count=1):
+        """Take count tokens, sleeping until the bucket has refilled enough to pay for them"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= count
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class ChannelWorker:
+    """
+    Worker pool of one channel. Events wait in a bounded queue; each worker thread takes
+    up to BATCH_SIZE of them, waits for the rate limit and hands them to the backend.
+    Threads start on the first event, so processes that fork (Celery) start their own.
+    """
+
+    def __init__(self, name, config):
+        self.name = name
+        self.backend = import_string(config["BACKEND"])(channel=name, **config.get("OPTIONS", {}))
+        self.workers = config.get("WORKERS", 1)
+        self.batch_size = config.get("BATCH_SIZE", 50)
+        self.batch_wait = config.get("BATCH_WAIT", 0.05)
+        self.limiter = TokenBucket(config["RATE"], config.get("BURST")) if config.get("RATE") else None
+        self.queue = queue.Queue(maxsize=config.get("QUEUE_SIZE", 10000))
+        self.threads = []
+        self.lock = threading.Lock()
+
+    def submit(self, event):
+        if not self.threads:
+            self.start()
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            logger.warning("Notification channel %s is full, dropping %s event for user %s",
+                           self.name, event["kind"], event["user_id"])
+            return False
+        return True
+
+    def start(self):
+        with self.lock:
+            while len(self.threads) < self.workers:
+                thread = threading.Thread(target=self.run, name=f"notify-{self.name}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            try:
+                if self.limiter:
+                    self.limiter.acquire(len(batch))
+                self.backend.send_batch(batch)
+            except Exception:
+                logger.exception("Notification channel %s failed to send %d events", self.name, len(batch))
+            finally:
+                close_old_connections()
+                for _ in batch:
+                    self.queue.task_done()
+
+    def flush(self, timeout=None):
+        """Wait until every queued event has been handed to the backend. Returns False on timeout."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+
+class Dispatcher:
+    """Routes events to the channels listed for their kind in NOTIFICATION_ROUTES"""
+
+    def __init__(self):
+        self.channels = {}
+        self.lock = threading.Lock()
+
+    def channel(self, name):
+        if name not in self.channels:
+            config = settings.NOTIFICATION_CHANNELS.get(name)
+            if config is None:
+                return None
+            with self.lock:
+                if name not in self.channels:
+                    self.channels[name] = ChannelWorker(name, config)
+        return self.channels[name]
+
+    def dispatch(self, user, kind, message, amount=None, title=None, channels=None):
+        """
+        Deliver one event to each of its channels. The inbox notification ("in_app") and
+        the email ("email", an outbox row) are written at once, in the caller's
+        transaction, so they commit or roll back with the event and survive a restart.
+        The other channels are queued once the transaction commits and delivered by
+        their workers.
+        """
+        event = {
+            "user_id": user.pk,
+            "username": user.username,
+            "email": user.email,
+            "phone_number": user.phone_number,
+            "kind": kind,
+            "title": title or DIGESTS[kind]["title"],
+            "message": message,
+            "amount": amount,
+        }
+        names = channels or settings.NOTIFICATION_ROUTES.get(kind, ["in_app"])
+        if "in_app" in names:
+            notify(user, kind, message, amount=amount)
+        if "email" in names and settings.EMAIL_ENABLED and user.email:
+            enqueue_email(
+                to_email=user.email,
+                subject=f"{event['title']} - Dreamy Life",
+                body=f"Hello {user.username},\n\n{message}\n\nBest regards,\nDreamy Life Team\n",
+            )
+        queued = [name for name in names if name not in ("in_app", "email")]
+        if not queued:
+            return
+
+        def submit():
+            for name in queued:
+                channel = self.channel(name)
+                if channel is not None:
+                    channel.submit(event)
+
+        transaction.on_commit(submit)
+
+    def flush(self, timeout=None):
+        return all([channel.flush(timeout) for channel in list(self.channels.values())])
+
+
+dispatcher = Dispatcher()
+dispatch = dispatcher.dispatch
+# Deliver what is still queued before a short-lived process (management command, test run) exits
+atexit.register(dispatcher.flush, timeout=10)
@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from wallets.models import Wallet, WalletTransaction
+from .models import Notification
+from .serializers import NotificationSerializer
+from .services import adjust_unread_count
+from .pubsub import publish_to_user
+
+
+@receiver(post_save, sender=Notification)
+def count_new_unread_notification(sender, instance, created, **kwargs):
+    """Keep the cached unread counter current when a notification is created"""
+    if created and not instance.is_read:
+        adjust_unread_count(instance.user_id, 1)
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_deleted_unread_notification(sender, instance, **kwargs):
+    if not instance.is_read:
+        adjust_unread_count(instance.user_id, -1)
+
+
+@receiver(post_save, sender=Notification)
+def push_notification(sender, instance, **kwargs):
+    """Push new and updated (digest) unread notifications to the user's open streams"""
+    if instance.is_read:
+        return
+    data = NotificationSerializer(instance).data
+    transaction.on_commit(lambda: publish_to_user(instance.user_id, "notification", data), robust=True)
+
+
+def push_wallet_balance(wallet_id):
+    wallet = Wallet.objects.filter(id=wallet_id).values("user_id", "balance").first()
+    if wallet:
+        publish_to_user(wallet["user_id"], "wallet", {"balance": str(wallet["balance"])})
+
+
+@receiver(post_save, sender=WalletTransaction)
+def push_wallet_transaction(sender, instance, created, **kwargs):
+    """Balances are moved with queryset updates, so every new ledger row announces the new balance"""
+    if created and instance.kind != "opening_balance":
+        transaction.on_commit(lambda: push_wallet_balance(instance.wallet_id), robust=True)
+
+
+@receiver(post_save, sender=Wallet)
+def push_wallet_save(sender, instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(lambda: push_wallet_balance(instance.id), robust=True)
@@ -0,0 +1,13 @@
+from celery import shared_task
+from .retention import prune_expired_rows
+from .outbox import drain_outbox
+
+
+@shared_task
+def task_prune_expired_rows():
+    return prune_expired_rows()
+
+
+@shared_task
+def task_send_queued_mail():
+    return drain_outbox()
@@ -0,0 +1,10 @@
+from django.urls import path
+from .views import NotificationListView, UnreadCountView, MarkReadView, BroadcastCreateView, NotificationStreamView
+
+urlpatterns = [
+    path("", NotificationListView.as_view(), name="notification-list"),
+    path("unread-count/", UnreadCountView.as_view(), name="notification-unread-count"),
+    path("mark-read/", MarkReadView.as_view(), name="notification-mark-read"),
+    path("stream/", NotificationStreamView.as_view(), name="notification-stream"),
+    path("broadcasts/", BroadcastCreateView.as_view(), name="notification-broadcast-create"),
+]
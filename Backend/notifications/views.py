@@ -0,0 +1,208 @@
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status, permissions
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
+from users.admin_views import IsAdminUser
+from users.authentication import CachedJWTAuthentication
+from wallets.models import Wallet
+from .models import Notification
+from .serializers import NotificationSerializer, BroadcastSerializer
+from .pagination import keyset_page, NOTIFICATION_SOURCE, BROADCAST_SOURCE
+from .pubsub import get_channel_layer, user_group
+from .services import (
+    unread_count, mark_read,
+    send_broadcast, broadcasts_for, broadcast_read_marker, unread_broadcast_count, mark_broadcasts_read
+)
+
+
+class NotificationListView(APIView):
+    """Inbox of the authenticated user (personal notifications and broadcasts), newest first, with cursor pagination"""
+    permission_classes = [permissions.IsAuthenticated]
+    MAX_LIMIT = 100
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get("limit", 20)), 1), self.MAX_LIMIT)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        marker = broadcast_read_marker(request.user.id)
+        notifications = Notification.objects.filter(user=request.user)
+        broadcasts = broadcasts_for(request.user)
+        if request.query_params.get("unread", "").lower() == "true":
+            notifications = notifications.filter(is_read=False)
+            broadcasts = broadcasts.filter(id__gt=marker)
+
+        # Broadcasts are merged in at read time instead of being copied to every inbox
+        try:
+            rows, next_cursor = keyset_page(
+                [(NOTIFICATION_SOURCE, notifications), (BROADCAST_SOURCE, broadcasts)],
+                request.query_params.get("cursor"),
+                limit,
+            )
+        except ValueError:
+            return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = [
+            NotificationSerializer(row).data if source == NOTIFICATION_SOURCE
+            else BroadcastSerializer(row, context={"broadcast_marker": marker}).data
+            for source, row in rows
+        ]
+        return Response({
+            "results": results,
+            "next_cursor": next_cursor,
+        }, status=status.HTTP_200_OK)
+
+
+class UnreadCountView(APIView):
+    """Unread notification count of the authenticated user (cached counter)"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        notifications = unread_count(request.user.id)
+        broadcasts = unread_broadcast_count(request.user)
+        return Response({
+            "unread": notifications + broadcasts,
+            "notifications": notifications,
+            "broadcasts": broadcasts,
+        }, status=status.HTTP_200_OK)
+
+
+class MarkReadView(APIView):
+    """
+    Mark notifications read.
+    Body: {"ids": [...]} and/or {"from_id": n, "to_id": m}; {"to_id": m} alone marks everything up to m.
+    {"broadcast_to_id": b} marks every broadcast up to b read.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        ids = request.data.get("ids")
+        from_id = request.data.get("from_id")
+        to_id = request.data.get("to_id")
+        broadcast_to_id = request.data.get("broadcast_to_id")
+
+        if ids is None and from_id is None and to_id is None and broadcast_to_id is None:
+            return Response(
+                {"error": "ids, from_id, to_id or broadcast_to_id is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # A string or an object would be iterated character by character or key by key
+        if ids is not None and not isinstance(ids, list):
+            return Response({"error": "ids must be a list of integers"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ids = [int(i) for i in ids] if ids is not None else None
+            from_id = int(from_id) if from_id is not None else None
+            to_id = int(to_id) if to_id is not None else None
+            broadcast_to_id = int(broadcast_to_id) if broadcast_to_id is not None else None
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "ids, from_id, to_id and broadcast_to_id must be integers"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        marked = 0
+        if ids is not None or from_id is not None or to_id is not None:
+            marked = mark_read(request.user.id, ids=ids, from_id=from_id, to_id=to_id)
+        if broadcast_to_id is not None:
+            mark_broadcasts_read(request.user, broadcast_to_id)
+
+        return Response({
+            "marked": marked,
+            "unread": unread_count(request.user.id) + unread_broadcast_count(request.user),
+        }, status=status.HTTP_200_OK)
+
+
+class BroadcastCreateView(APIView):
+    """Send an announcement to all members (Admin only)"""
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+
+    def post(self, request):
+        serializer = BroadcastSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        broadcast = send_broadcast(
+            serializer.validated_data["title"],
+            serializer.validated_data["message"],
+            created_by=request.user,
+        )
+        return Response(BroadcastSerializer(broadcast).data, status=status.HTTP_201_CREATED)
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class NotificationStreamView(View):
+    """
+    Server-Sent Events stream of the authenticated user's new notifications and wallet balance.
+    Needs an ASGI server, because every open stream is one long-lived request.
+    EventSource cannot send headers, so the access token may be passed as ?token=.
+    """
+
+    @staticmethod
+    def authenticate(request):
+        auth = CachedJWTAuthentication()
+        raw_token = request.GET.get("token")
+        if raw_token is None:
+            header = auth.get_header(request)
+            raw_token = auth.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        try:
+            user = auth.get_user(auth.get_validated_token(raw_token))
+        except (InvalidToken, AuthenticationFailed):
+            return None
+        return user if user.is_active else None
+
+    @staticmethod
+    def snapshot(user):
+        balance = Wallet.objects.filter(user=user).values_list("balance", flat=True).first()
+        notifications = unread_count(user.id)
+        broadcasts = unread_broadcast_count(user)
+        return {
+            "unread": notifications + broadcasts,
+            "notifications": notifications,
+            "broadcasts": broadcasts,
+            "balance": str(balance if balance is not None else 0),
+        }
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse(
+                {"error": "The notification stream is only available when served over ASGI"},
+                status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+        user = await sync_to_async(self.authenticate)(request)
+        if user is None:
+            return JsonResponse({"error": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        # Subscribe before reading the snapshot, so nothing published in between is lost
+        subscription = await get_channel_layer().subscribe(user_group(user.id))
+        snapshot = await sync_to_async(self.snapshot)(user)
+        response = StreamingHttpResponse(
+            self.stream(subscription, snapshot), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def stream(self, subscription, snapshot):
+        try:
+            yield "retry: 5000\n\n"
+            yield sse_event("snapshot", snapshot)
+            while True:
+                message = await subscription.get(timeout=settings.NOTIFICATION_STREAM_KEEPALIVE)
+                if message is None:
+                    # Comment line; keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                else:
+                    yield sse_event(message["event"], message["data"])
+        finally:
+            await subscription.close()
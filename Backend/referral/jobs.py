@@ -0,0 +1,11 @@
+"""Background maintenance of the referral tree."""
+from jobs.registry import register
+from users.models import User
+from .services import rebuild_referral_levels
+
+
+@register("rebuild_referral_levels")
+def rebuild_levels(job):
+    """Recompute every user's level in the referral tree"""
+    job.report(total=User.objects.count())
+    return rebuild_referral_levels(progress=lambda placed: job.report(processed=placed))
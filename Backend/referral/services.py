@@ -1,9 +1,8 @@
 from users.models import User, UserInfo
 from memberships.models import MembershipCommission
-from wallets.models import Wallet, WalletTransaction
-from notifications.models import Notification
+from wallets.services import credit_wallet
+from notifications.services import dispatch
 from django.db import transaction
-from decimal import Decimal
 
 # Precomputed table model (not shown above) can be implemented; here we follow a simple traversal using UserInfo.referred_by chain.
 def get_uplines(user_id, max_level=10):
@@ -52,22 +51,72 @@ def distribute_commission(buyer_id, membership):
             continue
         amount = rule.commission
         # atomic wallet credit
-        with transaction.atomic():
-            wallet, _ = Wallet.objects.select_for_update().get_or_create(user=user_obj)
-            wallet.balance = wallet.balance + Decimal(amount)
-            wallet.save()
-            WalletTransaction.objects.create(
-                wallet=wallet,
-                transaction_type="credit",
-                amount=amount,
-                description=f"Referral commission from {buyer.username} (L{lvl})"
-            )
-        Notification.objects.create(
-            user=user_obj,
-            title="Referral commission received",
-            message=f"You earned {amount} from {buyer.username} at level {lvl}"
+        credit_wallet(
+            user_obj,
+            amount,
+            description=f"Referral commission from {buyer.username} (L{lvl})",
+            kind="commission",
+            source_user=buyer,
+            level=lvl,
+            membership=membership,
+        )
+        dispatch(
+            user_obj,
+            "commission",
+            f"You earned {amount} from {buyer.username} at level {lvl}",
+            amount=amount,
         )
 
 def populate_referral_levels_for_user(user_id, parent_id):
     # This function can be used to populate precomputed levels if needed
-    pass
\ No newline at end of file
+    pass
+
+def update_levels_below(root_ids, level=0, batch_size=1000, progress=None):
+    """
+    Set UserInfo.level of root_ids to level and of every user below them to their
+    depth under it, walking the referral tree one level at a time. Each level costs
+    a few queries per batch_size users instead of one per user. progress(users placed)
+    is called after every batch.
+
+    Returns (users placed, levels changed, deepest level placed).
+    """
+    placed = changed = 0
+    deepest = level - 1
+    seen = set()
+    frontier = list(root_ids)
+    while frontier:
+        seen.update(frontier)
+        children = []
+        for start in range(0, len(frontier), batch_size):
+            batch = frontier[start:start + batch_size]
+            with transaction.atomic():
+                changed += UserInfo.objects.filter(user_id__in=batch).exclude(level=level).update(level=level)
+            children.extend(
+                child for child in User.objects.filter(referred_by_id__in=batch).order_by("id").values_list("id", flat=True)
+                if child not in seen
+            )
+            placed += len(batch)
+            if progress:
+                progress(placed)
+        deepest = level
+        frontier = children
+        level += 1
+    return placed, changed, deepest
+
+
+def rebuild_referral_levels(batch_size=1000, progress=None):
+    """
+    Recompute UserInfo.level (0 for users without a sponsor, sponsor's level + 1
+    otherwise) for every user. progress(users placed) is called after every batch.
+
+    Returns {"placed", "changed", "depth", "unplaced"}; users left unplaced sit on
+    a sponsor cycle and keep their level.
+    """
+    roots = User.objects.filter(referred_by__isnull=True).order_by("id").values_list("id", flat=True)
+    placed, changed, deepest = update_levels_below(list(roots), 0, batch_size, progress)
+    return {
+        "placed": placed,
+        "changed": changed,
+        "depth": max(deepest, 0),
+        "unplaced": User.objects.count() - placed,
+    }
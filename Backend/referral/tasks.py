@@ -1,7 +1,7 @@
 from celery import shared_task
 from .services import get_uplines, distribute_commission
 from users.models import User
-from notifications.models import Notification
+from notifications.services import dispatch
 from memberships.models import Membership
 
 @shared_task
@@ -12,10 +12,10 @@ def task_notify_uplines_on_register(user_id):
     except User.DoesNotExist:
         return
     for up in uplines:
-        Notification.objects.create(
-            user=up["user"],
-            title="New referral registered",
-            message=f"{user.username} registered using your code (L{up['level']})."
+        dispatch(
+            up["user"],
+            "referral",
+            f"{user.username} registered using your code (L{up['level']})."
         )
 
 @shared_task
@@ -0,0 +1,184 @@
+"""
+Indexed text search over a few columns of one table, with ranking and prefix matching.
+
+PostgreSQL: one GIN trigram index (pg_trgm) over the lowercased columns serves
+substring matches and typo-tolerant word matches (term <% column). Rows are
+ranked by weighted word similarity, plus a bonus when a column starts with the term.
+
+SQLite (local testing): an FTS5 table over the columns, kept in sync by triggers.
+Every word of the term is matched as a prefix and rows are ranked by bm25.
+
+Other databases, and PostgreSQL servers without the pg_trgm extension, fall back
+to icontains without ranking.
+"""
+import logging
+import re
+from functools import lru_cache
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+WORD = re.compile(r"\w+")
+
+
+def like_escape(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+@lru_cache(maxsize=None)
+def relation_exists(alias, name):
+    """Whether the index or table name exists (cached; install() and uninstall() clear it)"""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT 1 FROM pg_class WHERE relname = %s AND pg_table_is_visible(oid)", [name])
+        else:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [name])
+        return cursor.fetchone() is not None
+
+
+class SearchIndex:
+    """
+    Search index over columns of table; columns maps column name to weight.
+    Created by a migration with install() and removed with uninstall().
+    """
+
+    def __init__(self, table, columns):
+        self.table = table
+        self.columns = columns
+        self.trigram_index = f"{table}_search_trgm"
+        self.fts_table = f"{table}_search"
+
+    # ---------------------------------------------------------------- schema
+
+    def install(self, connection):
+        if connection.vendor == "postgresql":
+            expressions = ", ".join(f'lower("{column}"::text) gin_trgm_ops' for column in self.columns)
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+                if cursor.fetchone() is None:
+                    logger.warning("pg_trgm is not available; %s search uses unindexed icontains", self.table)
+                    return
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{self.trigram_index}" ON "{self.table}" USING gin ({expressions})'
+                )
+        elif connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+                if not cursor.fetchone()[0]:
+                    return
+                created = not self._fts_exists(cursor)
+                columns = ", ".join(self.columns)
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_table} USING fts5("
+                    f"{columns}, content='{self.table}', content_rowid='id', prefix='2 3')"
+                )
+                self._create_triggers(cursor)
+                if created:
+                    cursor.execute(f"INSERT INTO {self.fts_table}({self.fts_table}) VALUES ('rebuild')")
+        relation_exists.cache_clear()
+
+    def uninstall(self, connection):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP INDEX IF EXISTS "{self.trigram_index}"')
+        elif connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                for suffix in ("ai", "ad", "au"):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {self.fts_table}_{suffix}")
+                cursor.execute(f"DROP TABLE IF EXISTS {self.fts_table}")
+        relation_exists.cache_clear()
+
+    def repair(self, connection):
+        """
+        Recreate the SQLite sync triggers. SQLite migrations that rebuild the table
+        (most AlterField/AddField) drop its triggers; run after every migrate.
+        """
+        if connection.vendor != "sqlite":
+            return
+        with connection.cursor() as cursor:
+            if self._fts_exists(cursor):
+                self._create_triggers(cursor)
+
+    def _fts_exists(self, cursor):
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [self.fts_table])
+        return cursor.fetchone() is not None
+
+    def _create_triggers(self, cursor):
+        columns = ", ".join(self.columns)
+        new = ", ".join(f"new.{column}" for column in self.columns)
+        old = ", ".join(f"old.{column}" for column in self.columns)
+        delete_old = (
+            f"INSERT INTO {self.fts_table}({self.fts_table}, rowid, {columns}) VALUES ('delete', old.id, {old});"
+        )
+        insert_new = f"INSERT INTO {self.fts_table}(rowid, {columns}) VALUES (new.id, {new});"
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ai AFTER INSERT ON {self.table} BEGIN {insert_new} END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ad AFTER DELETE ON {self.table} BEGIN {delete_old} END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_au AFTER UPDATE ON {self.table} "
+            f"BEGIN {delete_old} {insert_new} END"
+        )
+
+    # ---------------------------------------------------------------- queries
+
+    def search(self, queryset, term):
+        """Rows of queryset that match term, annotated with search_rank (higher is a better match)"""
+        term = term.strip().lower()
+        if not term:
+            return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+        vendor = connections[queryset.db].vendor
+        if vendor == "postgresql" and relation_exists(queryset.db, self.trigram_index):
+            return self._search_trigram(queryset, term)
+        if vendor == "sqlite" and relation_exists(queryset.db, self.fts_table):
+            return self._search_fts(queryset, term)
+        return self._search_icontains(queryset, term)
+
+    def _search_trigram(self, queryset, term):
+        columns = [f'lower("{self.table}"."{column}"::text)' for column in self.columns]
+        contains = f"%{like_escape(term)}%"
+        prefix = f"{like_escape(term)}%"
+
+        matches = " OR ".join(f"{column} LIKE %s OR %s <%% {column}" for column in columns)
+        similarity = ", ".join(
+            f"{weight} * word_similarity(%s, {column})" for column, weight in zip(columns, self.columns.values())
+        )
+        starts = " OR ".join(f"{column} LIKE %s" for column in columns)
+        rank = f"GREATEST({similarity}) + CASE WHEN {starts} THEN 1 ELSE 0 END"
+        return (
+            queryset
+            .filter(RawSQL(f"({matches})", [contains, term] * len(columns), output_field=BooleanField()))
+            .annotate(search_rank=RawSQL(rank, [term] * len(columns) + [prefix] * len(columns), output_field=FloatField()))
+        )
+
+    def _search_fts(self, queryset, term):
+        words = WORD.findall(term)
+        if not words:
+            return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+        query = " ".join(f'"{word}"*' for word in words)
+        weights = ", ".join(str(weight) for weight in self.columns.values())
+        row = f'"{self.table}"."id"'
+        return (
+            queryset
+            .filter(RawSQL(
+                f"{row} IN (SELECT rowid FROM {self.fts_table} WHERE {self.fts_table} MATCH %s)",
+                [query], output_field=BooleanField(),
+            ))
+            .annotate(search_rank=RawSQL(
+                f"-(SELECT bm25({self.fts_table}, {weights}) FROM {self.fts_table} "
+                f"WHERE {self.fts_table} MATCH %s AND rowid = {row})",
+                [query], output_field=FloatField(),
+            ))
+        )
+
+    def _search_icontains(self, queryset, term):
+        condition = Q()
+        for column in self.columns:
+            condition |= Q(**{f"{column}__icontains": term})
+        return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 import environ
+import django
 
 env = environ.Env(DEBUG=(bool, False))
 environ.Env.read_env()  # reads .env
@@ -25,6 +26,7 @@ INSTALLED_APPS = [
     "notifications",
     "referral",
     "vendors",
+    "jobs",
 ]
 
 MIDDLEWARE = [
@@ -39,6 +41,7 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "referral_system.urls"
 WSGI_APPLICATION = "referral_system.wsgi.application"
+ASGI_APPLICATION = "referral_system.asgi.application"
 
 DATABASES = {
      'default': {
@@ -51,6 +54,15 @@ DATABASES = {
     }
 }
 
+# DATABASE_URL overrides the database above, e.g. to point at a local PostgreSQL for testing
+if env("DATABASE_URL", default=""):
+    DATABASES["default"] = env.db("DATABASE_URL")
+
+# SQLite: take the write lock when a transaction starts, so background workers
+# (notification dispatcher, outbox) wait for each other instead of failing as "database is locked"
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3" and django.VERSION >= (5, 1):
+    DATABASES["default"].setdefault("OPTIONS", {}).setdefault("transaction_mode", "IMMEDIATE")
+
 AUTH_USER_MODEL = "users.User"
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -72,12 +84,34 @@ TEMPLATES = [
 ]
 
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": ("rest_framework_simplejwt.authentication.JWTAuthentication",),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("users.authentication.CachedJWTAuthentication",),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_THROTTLE_CLASSES": ["rest_framework.throttling.AnonRateThrottle","rest_framework.throttling.UserRateThrottle"],
     "DEFAULT_THROTTLE_RATES": {"anon": "20/minute","user": "2000/day"}
 }
 
+# Login password checks run on this many threads; when more than LOGIN_HASH_MAX_PENDING
+# logins are waiting, new ones get 503 instead of queueing without bound
+LOGIN_HASH_WORKERS = env.int("LOGIN_HASH_WORKERS", default=os.cpu_count() or 2)
+LOGIN_HASH_MAX_PENDING = env.int("LOGIN_HASH_MAX_PENDING", default=LOGIN_HASH_WORKERS * 16)
+
+# Users per transaction in admin bulk operations (/api/admin/users/bulk/)
+BULK_OPERATION_CHUNK_SIZE = env.int("BULK_OPERATION_CHUNK_SIZE", default=500)
+
+# Processes hashing the passwords of imported users (manage.py import_users, /api/admin/users/import/)
+IMPORT_HASH_WORKERS = env.int("IMPORT_HASH_WORKERS", default=os.cpu_count() or 2)
+
+# Seconds to cache the authenticated user (with info and vendor) between requests; 0 disables the cache.
+# Saves and deletes invalidate it; changes made with queryset.update() show up after at most this long.
+AUTH_USER_CACHE_TTL = env.int("AUTH_USER_CACHE_TTL", default=0)
+
+# Seconds to cache the owner of a referral code looked up by registration; 0 disables the cache
+REFER_CODE_CACHE_TTL = env.int("REFER_CODE_CACHE_TTL", default=3600)
+# Keep a Bloom filter of every referral code in each worker, so registrations with an unknown code
+# are rejected without a query. Workers learn new codes through the cache, so it only takes effect
+# with a shared CACHE_URL (not locmemcache:// or dummycache://).
+REFER_CODE_BLOOM = env.bool("REFER_CODE_BLOOM", default=False)
+
 # JWT Token Settings - Extended lifetime to prevent automatic logout
 from datetime import timedelta
 
@@ -89,6 +123,44 @@ SIMPLE_JWT = {
     "UPDATE_LAST_LOGIN": True,
 }
 
+# Cache - set CACHE_URL (e.g. redis://localhost:6379/1) so counters are shared between workers
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
+# Cached unread notification counters are recomputed at least this often (seconds)
+NOTIFICATION_UNREAD_COUNT_TTL = env.int("NOTIFICATION_UNREAD_COUNT_TTL", default=3600)
+
+# Notification dispatcher: channels with their backend, worker threads, batch size and
+# rate limit (events per second), and the channels each event kind goes to. "in_app"
+# (the inbox) and "email" (the outbox) are written in the caller's transaction and need
+# no channel entry. Commissions stay in the inbox, where they are coalesced into one
+# digest per day; routing them to "email" sends one email per upline credit.
+# notifications.backends.FileBackend with OPTIONS={"path": "..."} records events for local tests.
+NOTIFICATION_CHANNELS = {}
+NOTIFICATION_ROUTES = {
+    "commission": ["in_app"],
+    "referral": ["in_app"],
+}
+# SMS provider backend (a notifications.backends.BaseBackend subclass); commission and
+# referral events go out by SMS only once one is set
+NOTIFICATION_SMS_BACKEND = env("NOTIFICATION_SMS_BACKEND", default=None)
+if NOTIFICATION_SMS_BACKEND:
+    NOTIFICATION_CHANNELS["sms"] = {
+        "BACKEND": NOTIFICATION_SMS_BACKEND,
+        "WORKERS": 1,
+        "BATCH_SIZE": 20,
+        "RATE": env.float("NOTIFICATION_SMS_RATE", default=5),
+    }
+    for routes in NOTIFICATION_ROUTES.values():
+        routes.append("sms")
+
+# Pub/sub feeding /api/notifications/stream/. The in-memory layer only reaches streams
+# served by the same process; use notifications.pubsub.RedisChannelLayer with several
+# workers or when Celery tasks create notifications.
+NOTIFICATION_CHANNEL_LAYER = env("NOTIFICATION_CHANNEL_LAYER", default="notifications.pubsub.InMemoryChannelLayer")
+NOTIFICATION_REDIS_URL = env("NOTIFICATION_REDIS_URL", default=env("REDIS_URL", default="redis://localhost:6379/0"))
+# Seconds between keepalive comments on an idle stream
+NOTIFICATION_STREAM_KEEPALIVE = env.int("NOTIFICATION_STREAM_KEEPALIVE", default=15)
+
 # Celery - Make optional for development
 try:
     CELERY_BROKER_URL = env("REDIS_URL", default="redis://localhost:6379/0")
@@ -100,6 +172,46 @@ except Exception:
     CELERY_BROKER_URL = None
     CELERY_RESULT_BACKEND = None
 
+# Periodic tasks, run with `celery -A referral_system.celery beat`
+CELERY_BEAT_SCHEDULE = {
+    "prune-expired-rows": {
+        "task": "notifications.tasks.task_prune_expired_rows",
+        "schedule": timedelta(hours=6),
+    },
+    # Picks up retries and anything queued while no worker was reachable
+    "send-queued-mail": {
+        "task": "notifications.tasks.task_send_queued_mail",
+        "schedule": timedelta(minutes=1),
+    },
+    # Corrects dashboard counters for writes that bypass signals (queryset.update, bulk_create)
+    "recount-dashboard-stats": {
+        "task": "users.tasks.task_recount_dashboard_stats",
+        "schedule": timedelta(hours=1),
+    },
+    # Runs admin jobs left pending by a web process that exited before starting them, and fails
+    # running jobs whose process died
+    "run-stale-jobs": {
+        "task": "jobs.tasks.task_run_stale_jobs",
+        "schedule": timedelta(minutes=5),
+    },
+}
+
+# Retention: days to keep read notifications per kind ("default" covers every kind not listed)
+NOTIFICATION_RETENTION_DAYS = {
+    "default": env.int("NOTIFICATION_RETENTION_DAYS", default=90),
+    "commission": env.int("COMMISSION_NOTIFICATION_RETENTION_DAYS", default=180),
+}
+# Days to keep unread notifications; None keeps them until they are read
+NOTIFICATION_UNREAD_RETENTION_DAYS = env.int("NOTIFICATION_UNREAD_RETENTION_DAYS", default=None)
+# Days to keep password reset tokens after they expire or are used
+PASSWORD_RESET_TOKEN_RETENTION_DAYS = env.int("PASSWORD_RESET_TOKEN_RETENTION_DAYS", default=1)
+# Days to keep sent and failed outbox emails; their bodies include password reset links
+EMAIL_OUTBOX_RETENTION_DAYS = env.int("EMAIL_OUTBOX_RETENTION_DAYS", default=7)
+# Days to keep finished admin jobs and their result files
+JOB_RETENTION_DAYS = env.int("JOB_RETENTION_DAYS", default=30)
+# Rows deleted per transaction by the retention job
+RETENTION_BATCH_SIZE = env.int("RETENTION_BATCH_SIZE", default=1000)
+
 # Static
 STATIC_URL = "/static/"
 
@@ -107,6 +219,9 @@ STATIC_URL = "/static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Result files of admin jobs (exports, reports); not served publicly, downloaded through /api/admin/jobs/<id>/result/
+JOB_RESULTS_ROOT = env("JOB_RESULTS_ROOT", default=os.path.join(BASE_DIR, "job_results"))
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -147,14 +262,27 @@ CORS_ALLOW_METHODS = [
 # Email Configuration
 EMAIL_BACKEND = env("EMAIL_BACKEND", default="django.core.mail.backends.smtp.EmailBackend")
 EMAIL_HOST = env("EMAIL_HOST", default="smtp.gmail.com")
-EMAIL_PORT = env("EMAIL_PORT", default=587)
-EMAIL_USE_TLS = env("EMAIL_USE_TLS", default=True)
+EMAIL_PORT = env.int("EMAIL_PORT", default=587)
+EMAIL_USE_TLS = env.bool("EMAIL_USE_TLS", default=True)
 EMAIL_HOST_USER = env("EMAIL_HOST_USER", default="")
 EMAIL_HOST_PASSWORD = env("EMAIL_HOST_PASSWORD", default="")
 DEFAULT_FROM_EMAIL = env("DEFAULT_FROM_EMAIL", default=EMAIL_HOST_USER or "noreply@dreamylife.com")
+# Without SMTP credentials emails are not queued and reset links are printed to the console.
+# Set EMAIL_ENABLED=True to send through a server that needs no login (e.g. a local SMTP stand-in).
+EMAIL_ENABLED = env.bool("EMAIL_ENABLED", default=bool(EMAIL_HOST_USER.strip() and EMAIL_HOST_PASSWORD.strip()))
+
+# Email outbox: emails claimed per batch, attempts before giving up,
+# base retry delay (doubled per attempt) and how long a claimed email stays reserved (seconds)
+EMAIL_OUTBOX_BATCH_SIZE = env.int("EMAIL_OUTBOX_BATCH_SIZE", default=50)
+EMAIL_OUTBOX_MAX_ATTEMPTS = env.int("EMAIL_OUTBOX_MAX_ATTEMPTS", default=6)
+EMAIL_OUTBOX_RETRY_DELAY = env.int("EMAIL_OUTBOX_RETRY_DELAY", default=60)
+EMAIL_OUTBOX_LEASE = env.int("EMAIL_OUTBOX_LEASE", default=300)
 
 # Frontend URL for password reset links
 FRONTEND_URL = env("FRONTEND_URL", default="http://localhost:3000")
 
 # Backend URL for absolute image URLs
-BACKEND_URL = env("BACKEND_URL", default="http://localhost:8000")
\ No newline at end of file
+BACKEND_URL = env("BACKEND_URL", default="http://localhost:8000")
+
+# Ledger rows older than this many days are moved to the cold archive by `manage.py archive_ledgers`
+LEDGER_ARCHIVE_AFTER_DAYS = env.int("LEDGER_ARCHIVE_AFTER_DAYS", default=730)
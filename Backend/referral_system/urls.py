@@ -7,9 +7,11 @@ from rest_framework_simplejwt.views import TokenRefreshView
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/users/", include("users.urls")),
+    path("api/admin/jobs/", include("jobs.urls")),
     path("api/admin/", include("users.admin_urls")),
     path("api/memberships/", include("memberships.urls")),
     path("api/vendors/", include("vendors.urls")),
     path("api/wallets/", include("wallets.urls")),
+    path("api/notifications/", include("notifications.urls")),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, UserInfo
+from .models import User, UserInfo, DashboardStat, DailyStat
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
@@ -30,4 +30,18 @@ class UserInfoAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'user__phone_number', 'own_refercode')
     list_filter = ('member_status', 'is_verified', 'level')
     ordering = ('-created_at',)
-    readonly_fields = ('own_refercode',)
\ No newline at end of file
+    readonly_fields = ('own_refercode',)
+    # Legacy base64 column; pictures are edited through avatar
+    exclude = ('profile_picture', 'avatar_thumbnail')
+
+
+@admin.register(DashboardStat)
+class DashboardStatAdmin(admin.ModelAdmin):
+    list_display = ('name', 'value', 'updated_at')
+
+
+@admin.register(DailyStat)
+class DailyStatAdmin(admin.ModelAdmin):
+    list_display = ('metric', 'day', 'count')
+    list_filter = ('metric',)
+    ordering = ('-day',)
@@ -1,13 +1,13 @@
 from rest_framework import serializers
 from .models import User, UserInfo
-from memberships.models import MembershipPurchase
+from .serializers import ProfilePictureMixin
 
 
-class AdminUserInfoSerializer(serializers.ModelSerializer):
+class AdminUserInfoSerializer(ProfilePictureMixin, serializers.ModelSerializer):
     """Admin serializer for UserInfo with all fields editable"""
     class Meta:
         model = UserInfo
-        fields = "__all__"
+        exclude = ['avatar', 'avatar_thumbnail', 'active_membership', 'active_purchase', 'membership_purchased_at']
         read_only_fields = ['id', 'user', 'own_refercode', 'level', 'created_at', 'updated_at']
 
 
@@ -18,6 +18,7 @@ class AdminUserSerializer(serializers.ModelSerializer):
     downlines_count = serializers.SerializerMethodField()
     active_membership = serializers.SerializerMethodField()
     referred_by_username = serializers.SerializerMethodField()
+    referred_by_refercode = serializers.SerializerMethodField()
     
     class Meta:
         model = User
@@ -25,32 +26,28 @@ class AdminUserSerializer(serializers.ModelSerializer):
             'id', 'username', 'email', 'phone_number', 'password',
             'is_active', 'is_staff', 'is_superuser', 'referred_by',
             'created_at', 'updated_at', 'last_login',
-            'info', 'downlines_count', 'active_membership', 'referred_by_username'
+            'info', 'downlines_count', 'active_membership', 'referred_by_username',
+            'referred_by_refercode'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'last_login']
     
     def get_downlines_count(self, obj):
-        """Get count of direct downlines"""
+        """Get count of direct downlines (annotated by with_admin_columns on list and detail)"""
+        if hasattr(obj, 'downlines_total'):
+            return obj.downlines_total
         return obj.downlines.count()
     
     def get_active_membership(self, obj):
-        """Get the active membership purchase for the user"""
-        try:
-            active_purchase = MembershipPurchase.objects.filter(
-                user=obj,
-                is_active=True
-            ).order_by('-purchased_at').first()
-            
-            if active_purchase:
-                return {
-                    'id': active_purchase.id,
-                    'name': active_purchase.membership.name,
-                    'purchased_at': active_purchase.purchased_at,
-                    'is_active': active_purchase.is_active
-                }
-        except:
-            pass
-        return None
+        """The active membership, read from the denormalized columns on UserInfo"""
+        info = getattr(obj, 'info', None)
+        if info is None or info.active_membership_id is None:
+            return None
+        return {
+            'id': info.active_purchase_id,
+            'name': info.active_membership.name,
+            'purchased_at': info.membership_purchased_at,
+            'is_active': True
+        }
     
     def get_referred_by_username(self, obj):
         """Get username of the user who referred this user"""
@@ -58,6 +55,11 @@ class AdminUserSerializer(serializers.ModelSerializer):
             return obj.referred_by.username
         return None
     
+    def get_referred_by_refercode(self, obj):
+        """Referral code of the user who referred this user"""
+        info = getattr(obj.referred_by, 'info', None) if obj.referred_by else None
+        return info.own_refercode if info else None
+    
     def create(self, validated_data):
         """Create user with password"""
         password = validated_data.pop('password', None)
@@ -137,4 +139,3 @@ class AdminUserCreateSerializer(serializers.ModelSerializer):
         UserInfo.objects.get_or_create(user=user)
         
         return user
-
@@ -2,12 +2,26 @@ from django.urls import path
 from .admin_views import (
     AdminUserListCreateView,
     AdminUserDetailView,
-    admin_dashboard_stats
+    admin_dashboard_stats,
+    admin_dashboard_growth,
+    AdminReferCodeLookupView,
+    AdminUserBulkView,
+    AdminUserImportView,
+    AdminUserExportView,
+    AdminGenealogyExportView
 )
+from vendors.views import AdminOrderExportView
 
 urlpatterns = [
     path('dashboard/stats/', admin_dashboard_stats, name='admin-dashboard-stats'),
+    path('dashboard/growth/', admin_dashboard_growth, name='admin-dashboard-growth'),
     path('users/', AdminUserListCreateView.as_view(), name='admin-user-list-create'),
     path('users/<int:pk>/', AdminUserDetailView.as_view(), name='admin-user-detail'),
+    path('users/lookup/', AdminReferCodeLookupView.as_view(), name='admin-user-lookup'),
+    path('users/bulk/', AdminUserBulkView.as_view(), name='admin-user-bulk'),
+    path('users/import/', AdminUserImportView.as_view(), name='admin-user-import'),
+    path('exports/users.<str:file_format>', AdminUserExportView.as_view(), name='admin-export-users'),
+    path('exports/orders.<str:file_format>', AdminOrderExportView.as_view(), name='admin-export-orders'),
+    path('exports/genealogy/<int:pk>.<str:file_format>', AdminGenealogyExportView.as_view(), name='admin-export-genealogy'),
 ]
 
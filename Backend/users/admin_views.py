@@ -1,10 +1,27 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
-from django.db.models import Q, Count
+from rest_framework.views import APIView
+from rest_framework.parsers import JSONParser
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
+from jobs.models import Job
+from jobs.results import job_results_storage, save_upload
+from jobs.runner import create_job
+from jobs.serializers import JobSerializer
+from referral_system.exports import EXPORT_FORMATS, export_response
+from .authentication import invalidate_cached_user
 from .models import User, UserInfo
 from .admin_serializers import AdminUserSerializer, AdminUserCreateSerializer, AdminUserInfoSerializer
+from .pagination import keyset_paginate, USER_ORDERING_FIELDS
+from .exports import (
+    USER_EXPORT_HEADER, user_export_rows, GENEALOGY_HEADER, GENEALOGY_MAX_DEPTH, genealogy_rows
+)
+from .filters import filter_users
+from .imports import IMPORT_FORMATS
+from .stats import dashboard_counters, daily_series
 
 User = get_user_model()
 
@@ -15,10 +32,32 @@ class IsAdminUser(permissions.BasePermission):
         return request.user and (request.user.is_staff or request.user.is_superuser)
 
 
+def with_admin_columns(queryset):
+    """
+    Users with everything AdminUserSerializer reads, in the same query: info and its
+    active membership, the referrer with their info, and the direct downline count as a correlated
+    subquery (a JOIN + GROUP BY would stop the list from being read in index order).
+    """
+    downlines = (
+        User.objects.filter(referred_by=OuterRef('pk'))
+        .order_by()
+        .values('referred_by')
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    return (
+        queryset
+        .select_related('info__active_membership', 'referred_by__info')
+        .defer('info__profile_picture', 'referred_by__info__profile_picture')
+        .annotate(downlines_total=Coalesce(Subquery(downlines), 0))
+    )
+
+
 class AdminUserListCreateView(generics.ListCreateAPIView):
-    """List all users or create a new user (Admin only)"""
+    """List users with keyset pagination or create a new user (Admin only)"""
     permission_classes = [permissions.IsAuthenticated, IsAdminUser]
-    queryset = User.objects.all().select_related('info', 'referred_by').prefetch_related('downlines')
+    queryset = User.objects.all()
+    MAX_LIMIT = 500
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -26,37 +65,41 @@ class AdminUserListCreateView(generics.ListCreateAPIView):
         return AdminUserSerializer
     
     def get_queryset(self):
-        queryset = User.objects.all().select_related('info', 'referred_by')
-        
-        # Search functionality
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(username__icontains=search) |
-                Q(email__icontains=search) |
-                Q(phone_number__icontains=search)
-            )
-        
-        # Filter by is_active
-        is_active = self.request.query_params.get('is_active', None)
-        if is_active is not None:
-            queryset = queryset.filter(is_active=is_active.lower() == 'true')
-        
-        # Filter by is_staff
-        is_staff = self.request.query_params.get('is_staff', None)
-        if is_staff is not None:
-            queryset = queryset.filter(is_staff=is_staff.lower() == 'true')
+        return filter_users(with_admin_columns(User.objects.all()), self.request.query_params)
+    
+    def list(self, request, *args, **kwargs):
+        """One page of users; pass next_cursor back as ?cursor= for the next page"""
+        try:
+            limit = min(max(int(request.query_params.get('limit', 100)), 1), self.MAX_LIMIT)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Filter by member_status
-        member_status = self.request.query_params.get('member_status', None)
-        if member_status:
-            queryset = queryset.filter(info__member_status=member_status)
+        try:
+            queryset = self.get_queryset()
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Ordering
-        ordering = self.request.query_params.get('ordering', '-created_at')
-        queryset = queryset.order_by(ordering)
+        # Without an explicit ordering, a search lists its best matches first
+        if request.query_params.get('search') and 'ordering' not in request.query_params:
+            ordering, allowed = '-search_rank', ('search_rank',)
+        else:
+            # Ordering is limited to indexed fields, so every page is an index range scan
+            ordering, allowed = request.query_params.get('ordering', '-created_at'), USER_ORDERING_FIELDS
+        try:
+            rows, next_cursor = keyset_paginate(
+                queryset,
+                ordering,
+                request.query_params.get('cursor'),
+                limit,
+                allowed,
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        return queryset
+        return Response({
+            "results": self.get_serializer(rows, many=True).data,
+            "next_cursor": next_cursor,
+        })
     
     def perform_create(self, serializer):
         serializer.save()
@@ -65,7 +108,7 @@ class AdminUserListCreateView(generics.ListCreateAPIView):
 class AdminUserDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete a user (Admin only)"""
     permission_classes = [permissions.IsAuthenticated, IsAdminUser]
-    queryset = User.objects.all().select_related('info', 'referred_by')
+    queryset = with_admin_columns(User.objects.all())
     serializer_class = AdminUserSerializer
     
     def update(self, request, *args, **kwargs):
@@ -92,7 +135,12 @@ class AdminUserDetailView(generics.RetrieveUpdateDestroyAPIView):
         return Response(serializer.data)
     
     def destroy(self, request, *args, **kwargs):
-        """Delete user"""
+        """
+        Delete user in the background: returns 202 with the delete_user job to poll.
+        The user is deactivated first, so they cannot log in or use a token while
+        the job runs. ?reparent=sponsor moves the user's direct downlines to the
+        user's sponsor instead of leaving them without one.
+        """
         instance = self.get_object()
         
         # Prevent deleting yourself
@@ -102,27 +150,156 @@ class AdminUserDetailView(generics.RetrieveUpdateDestroyAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        self.perform_destroy(instance)
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        # A deletion already under way is returned instead of starting a second one
+        job = Job.objects.filter(
+            kind='delete_user', params__user_id=instance.id, status__in=['pending', 'running']
+        ).first()
+        if job is None:
+            params = {'user_id': instance.id, 'reparent': request.query_params.get('reparent', 'none')}
+            try:
+                with transaction.atomic():
+                    if instance.is_active:
+                        instance.is_active = False
+                        instance.save(update_fields=['is_active', 'updated_at'])
+                    job = create_job('delete_user', params, created_by=request.user)
+            except ValueError as e:
+                return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            # Again after the commit, in case a request cached the user while it was open
+            invalidate_cached_user(instance.id)
+        return Response(JobSerializer(job, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated, IsAdminUser])
 def admin_dashboard_stats(request):
-    """Get dashboard statistics for admin"""
-    from memberships.models import MembershipPurchase
-    from vendors.models import Vendor, Product
-    from wallets.models import Wallet
-    
-    stats = {
-        'total_users': User.objects.count(),
-        'active_users': User.objects.filter(is_active=True).count(),
-        'staff_users': User.objects.filter(is_staff=True).count(),
-        'total_vendors': Vendor.objects.count(),
-        'total_products': Product.objects.count(),
-        'total_memberships': MembershipPurchase.objects.filter(is_active=True).count(),
-        'recent_users': User.objects.order_by('-created_at')[:5].values('id', 'username', 'email', 'created_at'),
-    }
+    """Get dashboard statistics for admin (running totals from users.stats, not COUNT(*) per load)"""
+    stats = dashboard_counters()
+    stats['recent_users'] = User.objects.order_by('-created_at')[:5].values('id', 'username', 'email', 'created_at')
     
     return Response(stats)
 
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsAdminUser])
+def admin_dashboard_growth(request):
+    """Signups and membership purchases per day for the last ?days= days (default 30, at most 366)"""
+    try:
+        days = min(max(int(request.query_params.get('days', 30)), 1), 366)
+    except ValueError:
+        return Response({"error": "days must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({"days": daily_series(days)})
+
+
+class AdminReferCodeLookupView(APIView):
+    """
+    Find the owner of a referral code (Admin only): ?refer_code= returns
+    {"id", "username", "refer_code"}, or 404.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+    
+    def get(self, request):
+        code = request.query_params.get('refer_code', '').strip()
+        owner = UserInfo.objects.filter(own_refercode=code).values('user_id', 'user__username').first() if code else None
+        if owner is None:
+            return Response({"error": "No user has this referral code"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"id": owner['user_id'], "username": owner['user__username'], "refer_code": code})
+
+
+class AdminUserBulkView(APIView):
+    """
+    Start a bulk operation on users (Admin only), or list the recent ones.
+    POST {"action": ..., "ids": [...]} or {"action": ..., "filter": {...}}; assign_membership
+    also takes "membership_id" and "commission". Returns 202 with the bulk_users job to poll.
+    JSON only: "ids" and "filter" have no form-encoded form.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+    parser_classes = [JSONParser]
+    
+    def get(self, request):
+        operations = Job.objects.filter(kind='bulk_users').order_by('-id')[:50]
+        return Response(JobSerializer(operations, many=True, context={'request': request}).data)
+    
+    def post(self, request):
+        try:
+            if not isinstance(request.data, dict):
+                raise ValueError("Expected a JSON object")
+            job = create_job('bulk_users', request.data, created_by=request.user)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(JobSerializer(job, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
+
+
+class AdminUserImportView(APIView):
+    """
+    Import members from an uploaded CSV or JSON Lines file (Admin only), or list the recent imports.
+    POST multipart with "file" (.csv or .jsonl) and optional "dry_run". Returns 202 with the import_users job to poll.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+    
+    def get(self, request):
+        imports = Job.objects.filter(kind='import_users').order_by('-id')[:50]
+        return Response(JobSerializer(imports, many=True, context={'request': request}).data)
+    
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "file is required"}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = upload.name.rsplit('.', 1)[-1].lower()
+        if file_format not in IMPORT_FORMATS:
+            return Response({"error": "Import file must be .csv or .jsonl"}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        name = save_upload(upload)
+        try:
+            job = create_job(
+                'import_users',
+                {'upload': name, 'format': file_format, 'dry_run': dry_run},
+                created_by=request.user
+            )
+        except ValueError as e:
+            job_results_storage().delete(name)
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(JobSerializer(job, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
+
+
+class AdminUserExportView(APIView):
+    """
+    Stream users with their info, sponsor and active membership as CSV or XLSX (Admin only).
+    Takes the filters of the admin user list.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+    
+    def get(self, request, file_format):
+        if file_format not in EXPORT_FORMATS:
+            return Response({"error": "Export format must be csv or xlsx"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            users = filter_users(User.objects.all(), request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return export_response(request, file_format, "users", USER_EXPORT_HEADER, user_export_rows(users), sheet="Users")
+
+
+class AdminGenealogyExportView(APIView):
+    """
+    Stream a sponsor's downline tree as CSV or XLSX (Admin only), level by level.
+    ?depth= sets how many levels to include (default 10).
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+    
+    def get(self, request, pk, file_format):
+        if file_format not in EXPORT_FORMATS:
+            return Response({"error": "Export format must be csv or xlsx"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            depth = int(request.query_params.get('depth', 10))
+        except ValueError:
+            depth = 0
+        if not 1 <= depth <= GENEALOGY_MAX_DEPTH:
+            return Response(
+                {"error": f"depth must be between 1 and {GENEALOGY_MAX_DEPTH}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not User.objects.filter(pk=pk).exists():
+            return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
+        return export_response(
+            request, file_format, f"genealogy-{pk}", GENEALOGY_HEADER, genealogy_rows(pk, depth), sheet="Genealogy"
+        )
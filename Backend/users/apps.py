@@ -1,8 +1,16 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
 
     def ready(self):
-        import users.signals
\ No newline at end of file
+        import users.signals
+        post_migrate.connect(repair_search_index, sender=self)
+
+
+def repair_search_index(sender, using, **kwargs):
+    from .search import USER_SEARCH
+    USER_SEARCH.repair(connections[using])
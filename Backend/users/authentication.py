@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .models import User
+
+AUTH_USER_KEY = "auth:user:{}"
+
+
+def load_user(user_id):
+    """
+    User with info, vendor and wallet joined in one query. With AUTH_USER_CACHE_TTL the
+    user, info and vendor are cached for that many seconds; the wallet is left out of
+    the cached copy because its balance changes all the time, and is loaded on access.
+    """
+    ttl = settings.AUTH_USER_CACHE_TTL
+    key = AUTH_USER_KEY.format(user_id)
+    if ttl:
+        user = cache.get(key)
+        if user is not None:
+            return user
+
+    user = (
+        User.objects
+        .select_related("info__active_membership", "vendor", "wallet")
+        .defer("info__profile_picture")
+        .filter(**{api_settings.USER_ID_FIELD: user_id})
+        .first()
+    )
+    if user is not None and ttl:
+        wallet = user._state.fields_cache.pop("wallet", None)
+        cache.set(key, user, ttl)
+        if wallet is not None:
+            user._state.fields_cache["wallet"] = wallet
+    return user
+
+
+def invalidate_cached_user(user_id):
+    if settings.AUTH_USER_CACHE_TTL:
+        cache.delete(AUTH_USER_KEY.format(user_id))
+
+
+def invalidate_cached_users(user_ids):
+    if settings.AUTH_USER_CACHE_TTL:
+        cache.delete_many([AUTH_USER_KEY.format(user_id) for user_id in user_ids])
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that resolves the user with load_user"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = load_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
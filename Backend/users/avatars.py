@@ -0,0 +1,84 @@
+"""
+Profile pictures: stored as image files (UserInfo.avatar) with a small thumbnail,
+instead of base64 data URLs in UserInfo.profile_picture.
+"""
+import base64
+import binascii
+import re
+import secrets
+from io import BytesIO
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+AVATAR_SIZE = 512
+THUMBNAIL_SIZE = 96
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+
+DATA_URL = re.compile(r"^data:(?P<mime>[\w.+-]+/[\w.+-]+)?(?:;[\w.+-]+=[\w.+-]+)*;base64,(?P<data>.*)$", re.S)
+
+
+def decode_data_url(value):
+    """Bytes of a base64 data URL. Raises ValueError when value is not one."""
+    match = DATA_URL.match(value.strip())
+    if not match:
+        raise ValueError("Not a base64 data URL")
+    if len(match.group("data")) > MAX_UPLOAD_BYTES * 4 // 3 + 4:
+        raise ValueError("Image is too large")
+    try:
+        return base64.b64decode(match.group("data"), validate=False)
+    except (binascii.Error, ValueError):
+        raise ValueError("Invalid base64 data")
+
+
+def open_image(content):
+    """Decode and verify image bytes, upright per their EXIF orientation. Raises ValueError for data that is not an image."""
+    if len(content) > MAX_UPLOAD_BYTES:
+        raise ValueError("Image is too large")
+    try:
+        image = Image.open(BytesIO(content))
+        image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise ValueError("Not a valid image")
+    return ImageOps.exif_transpose(image)
+
+
+def render(image, size):
+    """Scale image to fit size x size; PNG when it has transparency, JPEG otherwise"""
+    image = image.copy()
+    image.thumbnail((size, size))
+    output = BytesIO()
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    if has_alpha:
+        image.save(output, "PNG", optimize=True)
+        return output.getvalue(), "png"
+    image.convert("RGB").save(output, "JPEG", quality=85, optimize=True)
+    return output.getvalue(), "jpg"
+
+
+def set_avatar(user_info, content, save=True):
+    """
+    Store an image (bytes, or an image returned by open_image) as the user's avatar and
+    thumbnail; content=None removes them. The legacy profile_picture column is cleared.
+    Raises ValueError for data that is not an image.
+    """
+    old_files = [f.name for f in (user_info.avatar, user_info.avatar_thumbnail) if f]
+
+    if content is None:
+        user_info.avatar = None
+        user_info.avatar_thumbnail = None
+    else:
+        image = content if isinstance(content, Image.Image) else open_image(content)
+
+        name = f"{user_info.user_id}-{secrets.token_hex(4)}"
+        avatar, extension = render(image, AVATAR_SIZE)
+        thumbnail, thumbnail_extension = render(image, THUMBNAIL_SIZE)
+        user_info.avatar.save(f"{name}.{extension}", ContentFile(avatar), save=False)
+        user_info.avatar_thumbnail.save(f"{name}.{thumbnail_extension}", ContentFile(thumbnail), save=False)
+
+    user_info.profile_picture = None
+    if save:
+        user_info.save(update_fields=["avatar", "avatar_thumbnail", "profile_picture", "updated_at"])
+
+    storage = user_info._meta.get_field("avatar").storage
+    for name in old_files:
+        storage.delete(name)
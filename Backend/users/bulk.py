@@ -0,0 +1,185 @@
+"""
+Admin bulk operations over users, run off the request path as bulk_users jobs.
+
+Users are selected by id list or by the admin list filters (users.filters) and
+processed in id order, BULK_OPERATION_CHUNK_SIZE per transaction, with progress
+saved after every chunk. A failure stops the job; the chunks before it stay
+applied. update() and bulk_create() send no signals, so each action does itself
+what the signals would: dashboard counters, the auth user cache, and for memberships
+the UserInfo verification and denormalized active membership. Deletes go through
+users.deletion one user at a time, outside the chunk transaction.
+"""
+from contextlib import nullcontext
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from . import stats
+from .authentication import invalidate_cached_users
+from .deletion import delete_user, REPARENT_CHOICES
+from .filters import filter_users, USER_FILTER_KEYS
+from .models import User, UserInfo
+
+ACTIONS = ("activate", "deactivate", "grant_staff", "revoke_staff", "assign_membership", "delete")
+
+# Actions that never touch superusers or the admin who started the job
+PROTECTED_ACTIONS = {"deactivate", "revoke_staff", "delete"}
+
+
+def clean_bulk_params(params):
+    """
+    Validate {"action", "ids" or "filter", "membership_id", "commission"} for a
+    bulk_users job and return the params to store. Raises ValueError.
+    """
+    action = params.get("action")
+    if action not in ACTIONS:
+        raise ValueError(f"action must be one of: {', '.join(ACTIONS)}")
+
+    ids = params.get("ids")
+    user_filter = params.get("filter")
+    if (ids is None) == (user_filter is None):
+        raise ValueError("Provide either ids or filter")
+    if ids is not None:
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+            raise ValueError("ids must be a non-empty list of user ids")
+        cleaned = {"action": action, "ids": ids}
+    else:
+        # An empty filter would select every user; make the caller say what they mean
+        if not isinstance(user_filter, dict) or not user_filter:
+            raise ValueError("filter must be a non-empty object")
+        unknown = set(user_filter) - set(USER_FILTER_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown filter keys: {', '.join(sorted(unknown))}")
+        filter_users(User.objects.all(), user_filter)
+        cleaned = {"action": action, "filter": user_filter}
+
+    if action == "assign_membership":
+        from memberships.models import Membership
+        try:
+            membership_id = int(params.get("membership_id"))
+        except (TypeError, ValueError):
+            raise ValueError("membership_id is required for assign_membership")
+        if not Membership.objects.filter(id=membership_id).exists():
+            raise ValueError("Membership not found")
+        cleaned["membership_id"] = membership_id
+        cleaned["commission"] = bool(params.get("commission", False))
+    if action == "delete":
+        reparent = params.get("reparent", "none")
+        if reparent not in REPARENT_CHOICES:
+            raise ValueError(f"reparent must be one of: {', '.join(REPARENT_CHOICES)}")
+        cleaned["reparent"] = reparent
+    return cleaned
+
+
+def selected_users(params, created_by_id=None):
+    if "ids" in params:
+        queryset = User.objects.filter(id__in=params["ids"])
+    else:
+        queryset = filter_users(User.objects.all(), params["filter"])
+    if params["action"] in PROTECTED_ACTIONS:
+        queryset = queryset.exclude(is_superuser=True)
+        if created_by_id:
+            queryset = queryset.exclude(id=created_by_id)
+    return queryset
+
+
+def set_flag(ids, field, value, counter):
+    """Set a boolean field on the users that do not have it yet; returns how many changed"""
+    changed = User.objects.filter(id__in=ids).exclude(**{field: value}).update(
+        **{field: value, "updated_at": timezone.now()}
+    )
+    stats.adjust_counter(counter, changed if value else -changed)
+    invalidate_cached_users(ids)
+    return changed
+
+
+def assign_membership(ids, membership_id, commission):
+    """Give each user an active purchase of the membership, skipping users who already have one"""
+    from memberships.models import Membership, MembershipPurchase
+    from memberships.services import distribute_commission, refresh_active_membership
+
+    membership = Membership.objects.get(id=membership_id)
+    owners = set(
+        MembershipPurchase.objects.filter(user_id__in=ids, membership=membership, is_active=True)
+        .values_list("user_id", flat=True)
+    )
+    users = list(User.objects.filter(id__in=ids).exclude(id__in=owners).select_related("referred_by").order_by("id"))
+    if not users:
+        return 0
+
+    now = timezone.now()
+    purchases = MembershipPurchase.objects.bulk_create(
+        [MembershipPurchase(user=user, membership=membership, purchased_at=now, is_active=True) for user in users]
+    )
+    stats.adjust_counter(stats.TOTAL_MEMBERSHIPS, len(purchases))
+    stats.adjust_daily(stats.PURCHASES, now, len(purchases))
+
+    # What memberships.signals does for a single purchase
+    user_ids = [user.id for user in users]
+    for user_id in set(user_ids) - set(UserInfo.objects.filter(user_id__in=user_ids).values_list("user_id", flat=True)):
+        UserInfo.objects.get_or_create(user_id=user_id)
+    purchase_ids = {purchase.user_id: purchase.pk for purchase in purchases}
+    infos = list(UserInfo.objects.filter(user_id__in=user_ids).only("id", "user_id"))
+    for info in infos:
+        info.is_verified = True
+        info.member_status = membership.name
+        info.active_membership = membership
+        info.active_purchase_id = purchase_ids.get(info.user_id)
+        info.membership_purchased_at = now
+    UserInfo.objects.bulk_update(
+        infos, ["is_verified", "member_status", "active_membership", "active_purchase", "membership_purchased_at"]
+    )
+    if any(pk is None for pk in purchase_ids.values()):
+        # The database does not return ids from bulk inserts
+        for user_id in user_ids:
+            refresh_active_membership(user_id)
+    invalidate_cached_users(user_ids)
+
+    if commission:
+        for user, purchase in zip(users, purchases):
+            distribute_commission(user, membership, purchase if purchase.pk else None)
+    return len(purchases)
+
+
+def delete_users(ids, reparent="none"):
+    """Delete the users one by one with users.deletion, which removes their rows in short batches"""
+    for user_id in ids:
+        delete_user(user_id, reparent)
+    return len(ids)
+
+
+def apply_action(params, ids):
+    """Run the action of params on one chunk of user ids; returns how many users changed"""
+    action = params["action"]
+    if action == "activate":
+        return set_flag(ids, "is_active", True, stats.ACTIVE_USERS)
+    if action == "deactivate":
+        return set_flag(ids, "is_active", False, stats.ACTIVE_USERS)
+    if action == "grant_staff":
+        return set_flag(ids, "is_staff", True, stats.STAFF_USERS)
+    if action == "revoke_staff":
+        return set_flag(ids, "is_staff", False, stats.STAFF_USERS)
+    if action == "assign_membership":
+        return assign_membership(ids, params["membership_id"], params.get("commission", False))
+    if action == "delete":
+        return delete_users(ids, params.get("reparent", "none"))
+    raise ValueError(f"Unknown bulk action: {action}")
+
+
+def run_bulk_users(job, chunk_size=None):
+    """Run a bulk_users job, one transaction per chunk of users. Returns {"affected": users changed}."""
+    chunk_size = chunk_size or settings.BULK_OPERATION_CHUNK_SIZE
+    queryset = selected_users(job.params, job.created_by_id)
+    job.report(total=queryset.count())
+    processed = affected = 0
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:chunk_size])
+        if not ids:
+            break
+        # A delete commits batch by batch; one transaction around it would hold every lock to the end
+        with nullcontext() if job.params["action"] == "delete" else transaction.atomic():
+            affected += apply_action(job.params, ids)
+        processed += len(ids)
+        last_id = ids[-1]
+        job.report(processed=processed, result={"affected": affected})
+    return {"affected": affected}
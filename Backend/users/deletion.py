@@ -0,0 +1,142 @@
+"""
+Deleting a user with a large history, run as a delete_user job.
+
+user.delete() would cascade through every wallet and ledger row, notification,
+order, product and purchase of the user, and null the sponsor of every downline,
+in one transaction that holds row locks on all of them until it commits. Here
+the dependent rows go first, batch_size per transaction, in the order the
+cascade would reach them; the final user.delete() only has a handful of rows
+left. Batches are deleted with queryset.delete(), so the post_delete signals
+(dashboard counters, unread counters) still run.
+
+The user is deactivated before anything is removed, so they cannot sign in or
+be credited while the job runs. A job that fails can be started again; it picks
+up whatever is left.
+"""
+from django.db import transaction
+from django.utils import timezone
+from memberships.models import MembershipPurchase
+from notifications.models import Notification, BroadcastReadMarker
+from notifications.retention import delete_in_batches
+from referral.services import update_levels_below
+from vendors.models import Vendor, Product, ProductImage, Order, OrderItem
+from wallets.models import (
+    WalletTransaction, FundsTransaction, PointsTransaction, ArchivedTransaction, LedgerArchive, EarningsRollup,
+)
+from wallets.services import LEDGERS
+from .authentication import invalidate_cached_users
+from .models import User, UserInfo, PasswordResetToken
+
+# What happens to the direct downlines of a deleted user
+REPARENT_CHOICES = ("none", "sponsor")  # no sponsor (what SET_NULL does), or the deleted user's sponsor
+
+
+def update_in_batches(queryset, values, batch_size=1000):
+    """Apply update(**values) to the rows of queryset batch_size at a time; the updated rows must leave queryset"""
+    model = queryset.model
+    updated = 0
+    while True:
+        ids = list(queryset.order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return updated
+        with transaction.atomic():
+            updated += model.objects.filter(pk__in=ids).update(**values)
+
+
+def deletion_steps(user_id):
+    """
+    (name, queryset, values) in the order they run: values is an update that detaches
+    rows other users keep, None deletes the rows.
+    """
+    accounts = {ledger: list(model.objects.filter(user_id=user_id).values_list("id", flat=True)) for ledger, model in LEDGERS.items()}
+    products = Product.objects.filter(vendor__user_id=user_id)
+    return [
+        # Rows of other users that point at this user or at rows about to go
+        ("commission sources", WalletTransaction.objects.filter(source_user_id=user_id), {"source_user": None}),
+        ("commission purchases", WalletTransaction.objects.filter(purchase__user_id=user_id), {"purchase": None}),
+        # Ledgers
+        ("wallet transactions", WalletTransaction.objects.filter(wallet_id__in=accounts["wallet"]), None),
+        ("funds transactions", FundsTransaction.objects.filter(funds_id__in=accounts["funds"]), None),
+        ("points transactions", PointsTransaction.objects.filter(points_id__in=accounts["points"]), None),
+        *[
+            (f"archived {ledger} transactions", ArchivedTransaction.objects.filter(ledger=ledger, account_id__in=ids), None)
+            for ledger, ids in accounts.items()
+        ],
+        *[
+            (f"{ledger} archive totals", LedgerArchive.objects.filter(ledger=ledger, account_id__in=ids), None)
+            for ledger, ids in accounts.items()
+        ],
+        ("earnings rollup", EarningsRollup.objects.filter(user_id=user_id), None),
+        # Inbox
+        ("notifications", Notification.objects.filter(user_id=user_id), None),
+        ("broadcast read marker", BroadcastReadMarker.objects.filter(user_id=user_id), None),
+        # Shop: the user's orders, then the user's products with their images and the order items that sell them
+        ("order items", OrderItem.objects.filter(order__user_id=user_id), None),
+        ("orders", Order.objects.filter(user_id=user_id), None),
+        ("product order items", OrderItem.objects.filter(product__in=products), None),
+        ("product images", ProductImage.objects.filter(product__in=products), None),
+        ("products", products, None),
+        ("vendor", Vendor.objects.filter(user_id=user_id), None),
+        ("membership purchases", MembershipPurchase.objects.filter(user_id=user_id), None),
+        ("password reset tokens", PasswordResetToken.objects.filter(user_id=user_id), None),
+    ]
+
+
+def reparent_downlines(user, reparent="none", batch_size=1000):
+    """
+    Move the user's direct downlines to the user's sponsor (reparent="sponsor") or
+    leave them without one, then recompute the level of every user below them.
+    Returns (downlines moved, levels changed).
+    """
+    sponsor_id = user.referred_by_id if reparent == "sponsor" else None
+    downline_ids = list(User.objects.filter(referred_by_id=user.id).order_by("id").values_list("id", flat=True))
+    for start in range(0, len(downline_ids), batch_size):
+        batch = downline_ids[start:start + batch_size]
+        with transaction.atomic():
+            User.objects.filter(id__in=batch).update(referred_by_id=sponsor_id, updated_at=timezone.now())
+        invalidate_cached_users(batch)
+
+    level = 0
+    if sponsor_id:
+        sponsor_level = UserInfo.objects.filter(user_id=sponsor_id).values_list("level", flat=True).first()
+        level = (sponsor_level or 0) + 1
+    placed, changed, deepest = update_levels_below(downline_ids, level, batch_size)
+    return len(downline_ids), changed
+
+
+def delete_user(user_id, reparent="none", batch_size=1000, progress=None):
+    """
+    Delete the user and everything that belongs to them in bounded batches.
+    progress(rows processed, rows in total) is called after every step.
+    Returns {"downlines", "levels_changed", "deleted": {step: rows}}.
+    """
+    user = User.objects.filter(id=user_id).first()
+    if user is None:
+        return {"downlines": 0, "levels_changed": 0, "deleted": {}}
+    if user.is_active:
+        user.is_active = False
+        user.save(update_fields=["is_active", "updated_at"])
+
+    downlines, levels_changed = reparent_downlines(user, reparent, batch_size)
+
+    steps = deletion_steps(user_id)
+    total = sum(queryset.count() for name, queryset, values in steps) + 1
+    done = 0
+    deleted = {}
+    for name, queryset, values in steps:
+        if values is None:
+            count = delete_in_batches(queryset, batch_size)
+        else:
+            count = update_in_batches(queryset, values, batch_size)
+        if count:
+            deleted[name] = count
+        done += count
+        if progress:
+            progress(done, total)
+
+    # Only the user, their info, wallets and a few admin rows are left for the cascade
+    with transaction.atomic():
+        User.objects.get(id=user_id).delete()
+    if progress:
+        progress(total, total)
+    return {"downlines": downlines, "levels_changed": levels_changed, "deleted": deleted}
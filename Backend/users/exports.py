@@ -0,0 +1,89 @@
+"""
+Rows of the admin user and genealogy exports (referral_system.exports writes them).
+
+Both read the joined columns they need in one query through a server-side cursor
+(queryset iterator(), connection.chunked_cursor()), so a full export keeps one
+chunk of rows in memory instead of a model instance and a serializer per user.
+"""
+from django.db import connection
+from memberships.models import Membership
+from .models import User, UserInfo
+
+# Export column and the values() lookup it reads
+USER_EXPORT_COLUMNS = [
+    ("id", "id"),
+    ("username", "username"),
+    ("email", "email"),
+    ("phone_number", "phone_number"),
+    ("is_active", "is_active"),
+    ("is_staff", "is_staff"),
+    ("created_at", "created_at"),
+    ("sponsor_id", "referred_by_id"),
+    ("sponsor_username", "referred_by__username"),
+    ("sponsor_email", "referred_by__email"),
+    ("refer_code", "info__own_refercode"),
+    ("level", "info__level"),
+    ("member_status", "info__member_status"),
+    ("is_verified", "info__is_verified"),
+    ("membership", "info__active_membership__name"),
+    ("membership_purchased_at", "info__membership_purchased_at"),
+    ("address", "info__address"),
+    ("nid_or_brid", "info__nid_or_brid"),
+    ("profession", "info__profession"),
+    ("blood_group", "info__blood_group"),
+    ("gender", "info__gender"),
+    ("marital_status", "info__marital_status"),
+    ("father_name", "info__father_name"),
+    ("mother_name", "info__mother_name"),
+    ("working_place", "info__working_place"),
+]
+USER_EXPORT_HEADER = [column for column, lookup in USER_EXPORT_COLUMNS]
+
+GENEALOGY_HEADER = [
+    "depth", "id", "username", "email", "phone_number", "sponsor_id", "sponsor_username",
+    "refer_code", "member_status", "membership", "is_active", "created_at",
+]
+# Deepest level a genealogy export may ask for
+GENEALOGY_MAX_DEPTH = 100
+
+
+def user_export_rows(queryset, chunk_size=2000):
+    """Rows of USER_EXPORT_COLUMNS for the users of queryset, in id order"""
+    rows = queryset.order_by("id").values_list(*(lookup for column, lookup in USER_EXPORT_COLUMNS))
+    return rows.iterator(chunk_size=chunk_size)
+
+
+def genealogy_rows(sponsor_id, max_depth=10, chunk_size=2000):
+    """
+    Rows of GENEALOGY_HEADER for every user below sponsor_id, down to max_depth
+    levels, level by level. The tree is walked by one recursive query in the database.
+    Every user has one sponsor, so a sponsor cycle below sponsor_id has to pass
+    through it; stopping there keeps the walk from going round.
+    """
+    quote = connection.ops.quote_name
+    users = quote(User._meta.db_table)
+    infos = quote(UserInfo._meta.db_table)
+    memberships = quote(Membership._meta.db_table)
+    sql = f"""
+        WITH RECURSIVE tree (id, depth) AS (
+            SELECT id, 1 FROM {users} WHERE referred_by_id = %s
+            UNION ALL
+            SELECT u.id, tree.depth + 1 FROM {users} u JOIN tree ON u.referred_by_id = tree.id
+            WHERE tree.depth < %s AND u.id <> %s
+        )
+        SELECT tree.depth, u.id, u.username, u.email, u.phone_number, s.id, s.username,
+               i.own_refercode, i.member_status, m.name, u.is_active, u.created_at
+        FROM tree
+        JOIN {users} u ON u.id = tree.id
+        LEFT JOIN {users} s ON s.id = u.referred_by_id
+        LEFT JOIN {infos} i ON i.user_id = u.id
+        LEFT JOIN {memberships} m ON m.id = i.active_membership_id
+        ORDER BY tree.depth, u.referred_by_id, u.id
+    """
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql, [sponsor_id, max_depth, sponsor_id])
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
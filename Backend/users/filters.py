@@ -0,0 +1,67 @@
+from datetime import datetime, time
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_date
+from .search import USER_SEARCH
+
+# Keys accepted by filter_users, as query parameters of the admin user list or as the
+# "filter" object of bulk_users and export_users jobs
+USER_FILTER_KEYS = ("search", "is_active", "is_staff", "member_status", "referred_by", "created_after", "created_before")
+
+
+def as_bool(value):
+    return value if isinstance(value, bool) else str(value).lower() == "true"
+
+
+def parse_moment(key, value):
+    """Aware datetime from an ISO datetime or date (midnight); raises ValueError"""
+    try:
+        moment = parse_datetime(str(value))
+        if moment is None:
+            day = parse_date(str(value))
+            moment = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValueError(f"{key} must be a date or datetime")
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def filter_users(queryset, params):
+    """Apply the admin user filters in params (a dict or QueryDict). Raises ValueError for invalid values."""
+    # Search functionality (indexed, ranked by relevance as search_rank)
+    search = params.get('search', None)
+    if search:
+        queryset = USER_SEARCH.search(queryset, search)
+    
+    # Filter by is_active
+    is_active = params.get('is_active', None)
+    if is_active is not None:
+        queryset = queryset.filter(is_active=as_bool(is_active))
+    
+    # Filter by is_staff
+    is_staff = params.get('is_staff', None)
+    if is_staff is not None:
+        queryset = queryset.filter(is_staff=as_bool(is_staff))
+    
+    # Filter by member_status
+    member_status = params.get('member_status', None)
+    if member_status:
+        queryset = queryset.filter(info__member_status=member_status)
+    
+    # Filter by sponsor
+    referred_by = params.get('referred_by', None)
+    if referred_by not in (None, ''):
+        try:
+            queryset = queryset.filter(referred_by_id=int(referred_by))
+        except (TypeError, ValueError):
+            raise ValueError("referred_by must be a user id")
+    
+    # Filter by signup date
+    created_after = params.get('created_after', None)
+    if created_after:
+        queryset = queryset.filter(created_at__gte=parse_moment('created_after', created_after))
+    created_before = params.get('created_before', None)
+    if created_before:
+        queryset = queryset.filter(created_at__lt=parse_moment('created_before', created_before))
+    
+    return queryset
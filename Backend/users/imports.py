@@ -0,0 +1,287 @@
+"""
+Importing the members of a partner organisation from CSV or JSON Lines, with
+`manage.py import_users` or an import_users job.
+
+Each row is a member with the sponsor's referral code in referred_by, as in
+registration. The code may belong to an existing user or to another row, given
+in that row's refer_code. The whole file is validated first, with every lookup
+(taken emails, phone numbers and codes, sponsors) done in bulk. The rows are
+then ordered so that sponsors come before their downlines, and written with
+bulk_create, batch_size users with their UserInfo, wallet, funds and points per
+transaction. Passwords are hashed on a process pool (users.passwords) ahead of
+the writes.
+
+Rows that fail validation are skipped with their downlines in the file and
+reported by line. Rows already imported fail as taken, so a file can be run
+again after a failure; give refer_code to keep their downlines attached.
+bulk_create sends no signals: the dashboard counters and the referral code cache
+are updated here, and no registration notifications go out.
+"""
+import csv
+import io
+import json
+import random
+import string
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils import timezone
+from wallets.services import LEDGERS
+from . import stats
+from .models import User, UserInfo
+from .passwords import password_hasher
+from .refercodes import remember_refer_codes
+
+IMPORT_FORMATS = ("csv", "jsonl")
+
+# UserInfo fields a row may fill
+PROFILE_FIELDS = (
+    "address", "nid_or_brid", "profession", "blood_group", "gender",
+    "marital_status", "father_name", "mother_name", "working_place",
+)
+REQUIRED_FIELDS = ("username", "email", "phone_number")
+IMPORT_COLUMNS = (*REQUIRED_FIELDS, "password", "refer_code", "referred_by", *PROFILE_FIELDS)
+
+# Longest value of each column the database accepts
+MAX_LENGTHS = {
+    "username": User._meta.get_field("username").max_length,
+    "email": User._meta.get_field("email").max_length,
+    "phone_number": User._meta.get_field("phone_number").max_length,
+    "refer_code": UserInfo._meta.get_field("own_refercode").max_length,
+    **{field: UserInfo._meta.get_field(field).max_length for field in PROFILE_FIELDS if UserInfo._meta.get_field(field).max_length},
+}
+
+
+def read_rows(stream, file_format):
+    """
+    Yield (line number, {column: value}) for every row of a binary stream. Values
+    are stripped strings; a row that cannot be read has the error message as its value.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if file_format == "csv":
+        reader = csv.DictReader(text)
+        for values in reader:
+            yield reader.line_num, {
+                column: (value or "").strip() for column, value in values.items() if isinstance(column, str)
+            }
+        return
+    for number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            values = json.loads(line)
+        except ValueError:
+            yield number, "Not a JSON object"
+            continue
+        if not isinstance(values, dict):
+            yield number, "Not a JSON object"
+            continue
+        yield number, {column: "" if value is None else str(value).strip() for column, value in values.items()}
+
+
+def clean_row(values):
+    """The import columns of a row, or raises ValueError"""
+    if isinstance(values, str):
+        raise ValueError(values)
+    row = {column: values.get(column, "") for column in IMPORT_COLUMNS}
+    for column in REQUIRED_FIELDS:
+        if not row[column]:
+            raise ValueError(f"{column} is required")
+    for column, max_length in MAX_LENGTHS.items():
+        if len(row[column]) > max_length:
+            raise ValueError(f"{column} is longer than {max_length} characters")
+    try:
+        validate_email(row["email"])
+    except ValidationError:
+        raise ValueError("Enter a valid email address")
+    return row
+
+
+def chunks(values, size):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def taken_values(field, values, batch_size):
+    """The values of a unique column that existing rows already hold, batch_size per query"""
+    model, lookup = (UserInfo, "own_refercode") if field == "refer_code" else (User, field)
+    taken = set()
+    for chunk in chunks(values, batch_size):
+        taken.update(model.objects.filter(**{f"{lookup}__in": chunk}).values_list(lookup, flat=True))
+    return taken
+
+
+def plan_import(lines, batch_size=1000):
+    """
+    Validate the rows of read_rows() and order them so that every sponsor comes before its downlines.
+    Returns (rows, errors). Each row carries its "line", "generation" (0 when the sponsor
+    is not in the file), "level" and "sponsor": ("row", index in rows) or ("user", user id)
+    or None. errors is [(line, message)] in line order.
+    """
+    rows, errors = [], []
+    for line, values in lines:
+        try:
+            row = clean_row(values)
+        except ValueError as e:
+            errors.append((line, str(e)))
+            continue
+        row["line"] = line
+        rows.append(row)
+
+    # Unique columns: once in the file and not taken yet
+    first_line = {}
+    taken = {
+        field: taken_values(field, {row[field] for row in rows if row[field]}, batch_size)
+        for field in ("email", "phone_number", "refer_code")
+    }
+    failed = {}
+    for row in rows:
+        for field in ("email", "phone_number", "refer_code"):
+            value = row[field]
+            if not value:
+                continue
+            if value in taken[field]:
+                failed[row["line"]] = f"{field} {value} already taken"
+                break
+            if (field, value) in first_line:
+                failed[row["line"]] = f"{field} {value} already on line {first_line[field, value]}"
+                break
+        else:
+            for field in ("email", "phone_number", "refer_code"):
+                if row[field]:
+                    first_line[field, row[field]] = row["line"]
+
+    # Sponsors: a valid row of the file first, then an existing user
+    in_file = {row["refer_code"]: row for row in rows if row["refer_code"] and row["line"] not in failed}
+    skipped_codes = {row["refer_code"]: row["line"] for row in rows if row["refer_code"] and row["line"] in failed}
+    outside = {row["referred_by"] for row in rows if row["referred_by"] and row["referred_by"] not in in_file}
+    existing = {}
+    for chunk in chunks(outside, batch_size):
+        for code, user_id, level in UserInfo.objects.filter(own_refercode__in=chunk).values_list("own_refercode", "user_id", "level"):
+            existing[code] = (user_id, level)
+
+    roots, downlines = [], {}
+    for row in rows:
+        if row["line"] in failed:
+            continue
+        code = row["referred_by"]
+        if not code:
+            row.update(sponsor=None, level=0)
+            roots.append(row)
+        elif code in in_file:
+            downlines.setdefault(code, []).append(row)
+        elif code in existing:
+            user_id, level = existing[code]
+            row.update(sponsor=("user", user_id), level=level + 1)
+            roots.append(row)
+        elif code in skipped_codes:
+            failed[row["line"]] = f"Sponsor on line {skipped_codes[code]} was not imported"
+        else:
+            failed[row["line"]] = "Invalid referral code"
+
+    ordered = []
+    generation = roots
+    depth = 0
+    while generation:
+        following = []
+        for row in generation:
+            row["generation"] = depth
+            ordered.append(row)
+            if row["refer_code"] in downlines:
+                for downline in downlines.pop(row["refer_code"]):
+                    downline.update(sponsor=("row", len(ordered) - 1), level=row["level"] + 1)
+                    following.append(downline)
+        generation = following
+        depth += 1
+
+    # Rows never reached hang below a skipped row or a row that is its own upline
+    for code, stranded in downlines.items():
+        for row in stranded:
+            failed[row["line"]] = f"Sponsor {code} was not imported or is part of a referral cycle"
+    errors.extend(failed.items())
+    errors.sort()
+    return ordered, errors
+
+
+def import_batches(rows, batch_size):
+    """Runs of at most batch_size rows of one generation, so sponsors are always written in an earlier batch"""
+    batch = []
+    for row in rows:
+        if batch and (len(batch) == batch_size or batch[-1]["generation"] != row["generation"]):
+            yield batch
+            batch = []
+        batch.append(row)
+    if batch:
+        yield batch
+
+
+def new_refer_codes(count, used):
+    """count random referral codes in the format of UserInfo.save, unused in used and the database"""
+    codes = set()
+    while len(codes) < count:
+        candidates = {"".join(random.choices(string.digits, k=8)) for i in range(count - len(codes))} - used - codes
+        candidates -= set(UserInfo.objects.filter(own_refercode__in=candidates).values_list("own_refercode", flat=True))
+        codes |= candidates
+    used |= codes
+    return list(codes)
+
+
+def write_batch(batch, passwords, ids, used_codes):
+    now = timezone.now()
+    users = [
+        User(
+            username=row["username"],
+            email=row["email"],
+            phone_number=row["phone_number"],
+            password=password,
+            referred_by_id=(ids[row["sponsor"][1]] if row["sponsor"][0] == "row" else row["sponsor"][1]) if row["sponsor"] else None,
+            created_at=now,
+        )
+        for row, password in zip(batch, passwords)
+    ]
+    codes = iter(new_refer_codes(sum(1 for row in batch if not row["refer_code"]), used_codes))
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        infos = UserInfo.objects.bulk_create([
+            UserInfo(
+                user=user,
+                own_refercode=row["refer_code"] or next(codes),
+                level=row["level"],
+                member_status="user",
+                is_verified=False,
+                **{field: row[field] or None for field in PROFILE_FIELDS},
+            )
+            for row, user in zip(batch, users)
+        ])
+        for model in LEDGERS.values():
+            model.objects.bulk_create([model(user=user) for user in users])
+        stats.adjust_counter(stats.TOTAL_USERS, len(users))
+        stats.adjust_counter(stats.ACTIVE_USERS, len(users))
+        stats.adjust_daily(stats.SIGNUPS, now, len(users))
+        remember_refer_codes({info.own_refercode: info.user_id for info in infos})
+    return [user.id for user in users]
+
+
+def import_users(lines, batch_size=1000, workers=None, dry_run=False, progress=None):
+    """
+    Import the rows of read_rows(). progress(users imported, users to import) is
+    called after every batch. With dry_run the rows are only validated.
+    Returns ({"rows", "imported", "skipped"}, errors as plan_import returns them).
+    """
+    rows, errors = plan_import(lines, batch_size)
+    result = {"rows": len(rows) + len(errors), "imported": 0, "skipped": len(errors)}
+    if dry_run or not rows:
+        return result, errors
+
+    ids = []  # user id of each row, by index in rows
+    used_codes = {row["refer_code"] for row in rows if row["refer_code"]}
+    with password_hasher(workers or settings.IMPORT_HASH_WORKERS) as hash_passwords:
+        passwords = hash_passwords([row.pop("password") for row in rows])
+        for batch in import_batches(rows, batch_size):
+            ids.extend(write_batch(batch, [next(passwords) for row in batch], ids, used_codes))
+            result["imported"] = len(ids)
+            if progress:
+                progress(len(ids), len(rows))
+    return result, errors
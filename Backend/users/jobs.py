@@ -0,0 +1,100 @@
+"""Background jobs over users: bulk operations, deletion, imports and CSV exports."""
+from jobs.registry import register
+from jobs.results import csv_result, job_results_storage, UPLOADS_DIR
+from referral_system.exports import csv_row
+from .bulk import clean_bulk_params, run_bulk_users
+from .deletion import delete_user, REPARENT_CHOICES
+from .exports import USER_EXPORT_HEADER, user_export_rows
+from .filters import filter_users, USER_FILTER_KEYS
+from .imports import import_users, read_rows, IMPORT_FORMATS
+from .models import User
+
+register("bulk_users", clean=clean_bulk_params)(run_bulk_users)
+
+
+def clean_delete_params(params):
+    """{"user_id": ..., "reparent": "none" or "sponsor"}"""
+    try:
+        user_id = int(params.get("user_id"))
+    except (TypeError, ValueError):
+        raise ValueError("user_id is required")
+    if not User.objects.filter(id=user_id).exists():
+        raise ValueError("User not found")
+    reparent = params.get("reparent", "none")
+    if reparent not in REPARENT_CHOICES:
+        raise ValueError(f"reparent must be one of: {', '.join(REPARENT_CHOICES)}")
+    return {"user_id": user_id, "reparent": reparent}
+
+
+# Only through DELETE /api/admin/users/<id>/, which refuses self-deletion and deactivates the user first
+@register("delete_user", clean=clean_delete_params, public=False)
+def delete_user_job(job):
+    """Delete one user and their history in short batches (users.deletion)"""
+    return delete_user(
+        job.params["user_id"], job.params.get("reparent", "none"),
+        progress=lambda done, total: job.report(processed=done, total=total),
+    )
+
+
+def clean_import_params(params):
+    """{"upload": name of a file stored with jobs.results.save_upload, "format": "csv" or "jsonl", "dry_run"}"""
+    upload = params.get("upload")
+    if not isinstance(upload, str) or not upload.startswith(f"{UPLOADS_DIR}/") or ".." in upload:
+        raise ValueError("upload is required")
+    if not job_results_storage().exists(upload):
+        raise ValueError("Upload not found")
+    file_format = params.get("format")
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(IMPORT_FORMATS)}")
+    return {"upload": upload, "format": file_format, "dry_run": bool(params.get("dry_run", False))}
+
+
+# Only through POST /api/admin/users/import/, which stores the upload
+@register("import_users", clean=clean_import_params, public=False)
+def import_users_job(job):
+    """Import the uploaded members (users.imports); rows that were skipped go to errors.csv"""
+    storage = job_results_storage()
+    try:
+        with storage.open(job.params["upload"], "rb") as stream:
+            result, errors = import_users(
+                read_rows(stream, job.params["format"]),
+                dry_run=job.params.get("dry_run", False),
+                progress=lambda done, total: job.report(processed=done, total=total),
+            )
+    finally:
+        storage.delete(job.params["upload"])
+    if errors:
+        with csv_result(job, "errors.csv") as writer:
+            writer.writerow(["line", "error"])
+            for error in errors:
+                writer.writerow(csv_row(error))
+    return result
+
+
+def clean_export_params(params):
+    """{"filter": {...}} with the admin user list filters; no filter exports every user"""
+    user_filter = params.get("filter") or {}
+    if not isinstance(user_filter, dict):
+        raise ValueError("filter must be an object")
+    unknown = set(user_filter) - set(USER_FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown filter keys: {', '.join(sorted(unknown))}")
+    filter_users(User.objects.all(), user_filter)
+    return {"filter": user_filter}
+
+
+@register("export_users", clean=clean_export_params)
+def export_users(job, chunk_size=2000):
+    """Write the filtered users to users.csv (the columns of the admin export) in id order"""
+    queryset = filter_users(User.objects.all(), job.params.get("filter", {}))
+    job.report(total=queryset.count())
+    exported = 0
+    with csv_result(job, "users.csv") as writer:
+        writer.writerow(USER_EXPORT_HEADER)
+        for row in user_export_rows(queryset, chunk_size):
+            writer.writerow(csv_row(row))
+            exported += 1
+            if exported % chunk_size == 0:
+                job.report(processed=exported)
+    job.report(processed=exported)
+    return {"exported": exported}
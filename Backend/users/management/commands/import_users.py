@@ -0,0 +1,43 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from users.imports import import_users, read_rows, IMPORT_FORMATS, IMPORT_COLUMNS
+
+
+class Command(BaseCommand):
+    help = (
+        "Import members with their sponsor's referral code from CSV or JSON Lines. "
+        f"Columns: {', '.join(IMPORT_COLUMNS)}"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import")
+        parser.add_argument("--format", choices=IMPORT_FORMATS, help="File format (default: from the file extension)")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Users written per transaction")
+        parser.add_argument("--workers", type=int, help="Processes hashing passwords (default IMPORT_HASH_WORKERS)")
+        parser.add_argument("--dry-run", action="store_true", help="Only validate the rows and report what would be skipped")
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or os.path.splitext(options["path"])[1].lstrip(".").lower()
+        if file_format not in IMPORT_FORMATS:
+            raise CommandError(f"Unknown file format; pass --format ({', '.join(IMPORT_FORMATS)})")
+        try:
+            stream = open(options["path"], "rb")
+        except OSError as e:
+            raise CommandError(str(e))
+
+        with stream:
+            result, errors = import_users(
+                read_rows(stream, file_format),
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+                dry_run=options["dry_run"],
+                progress=lambda done, total: self.stdout.write(f"Imported {done} of {total}"),
+            )
+        for line, message in errors:
+            self.stderr.write(f"Line {line}: {message}")
+        if options["dry_run"]:
+            self.stdout.write(f"{result['rows'] - result['skipped']} of {result['rows']} rows would be imported")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['imported']} of {result['rows']} rows, {result['skipped']} skipped"
+        ))
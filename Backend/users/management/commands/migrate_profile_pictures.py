@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from users.models import UserInfo
+from users.avatars import decode_data_url, set_avatar
+
+
+class Command(BaseCommand):
+    help = "Decode the base64 data URLs in UserInfo.profile_picture into avatar image files with thumbnails"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Profiles read per query")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the profiles that would be converted")
+
+    def handle(self, *args, **options):
+        pending = UserInfo.objects.filter(profile_picture__startswith="data:")
+        if options["dry_run"]:
+            self.stdout.write(f"{pending.count()} profile pictures to convert")
+            return
+
+        converted = failed = 0
+        last_id = 0
+        while True:
+            # Only one batch of data URLs is held in memory at a time
+            batch = list(
+                pending.filter(id__gt=last_id).order_by("id").values_list("id", "profile_picture")[:options["batch_size"]]
+            )
+            if not batch:
+                break
+            for info_id, data_url in batch:
+                last_id = info_id
+                try:
+                    content = decode_data_url(data_url)
+                    with transaction.atomic():
+                        user_info = UserInfo.objects.select_for_update().get(id=info_id)
+                        set_avatar(user_info, content)
+                except ValueError as e:
+                    failed += 1
+                    self.stderr.write(f"UserInfo {info_id}: {e}")
+                    continue
+                converted += 1
+            self.stdout.write(f"Converted {converted} so far")
+
+        self.stdout.write(self.style.SUCCESS(f"Converted {converted} profile pictures, {failed} failed"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from users.stats import recount_dashboard_stats
+
+
+class Command(BaseCommand):
+    help = "Recount the admin dashboard totals and daily signup/purchase counts from the source tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=2, help="Recount the daily counts of this many recent days (default 2)")
+        parser.add_argument("--all", action="store_true", help="Recount the daily counts of every day")
+
+    def handle(self, *args, **options):
+        written = recount_dashboard_stats(None if options["all"] else options["days"])
+        self.stdout.write(self.style.SUCCESS(f"Recounted dashboard stats: {written} rows written"))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_passwordresettoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userinfo',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, upload_to='avatars/'),
+        ),
+        migrations.AddField(
+            model_name='userinfo',
+            name='avatar_thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='avatars/thumbnails/'),
+        ),
+    ]
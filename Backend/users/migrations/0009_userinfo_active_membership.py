@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_active_membership(apps, schema_editor):
+    """Copy each user's latest active purchase onto UserInfo"""
+    MembershipPurchase = apps.get_model("memberships", "MembershipPurchase")
+    UserInfo = apps.get_model("users", "UserInfo")
+    purchases = (
+        MembershipPurchase.objects
+        .filter(is_active=True)
+        .order_by("user_id", "-purchased_at", "-id")
+        .values("id", "user_id", "membership_id", "purchased_at")
+        .iterator(chunk_size=2000)
+    )
+    latest = {}
+    for purchase in purchases:
+        latest.setdefault(purchase["user_id"], purchase)
+
+    user_ids = list(latest)
+    for start in range(0, len(user_ids), 2000):
+        batch = []
+        for info in UserInfo.objects.filter(user_id__in=user_ids[start:start + 2000]).only("id", "user_id"):
+            purchase = latest[info.user_id]
+            info.active_membership_id = purchase["membership_id"]
+            info.active_purchase_id = purchase["id"]
+            info.membership_purchased_at = purchase["purchased_at"]
+            batch.append(info)
+        UserInfo.objects.bulk_update(batch, ["active_membership", "active_purchase", "membership_purchased_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memberships', '0002_membershippurchase'),
+        ('users', '0008_userinfo_avatar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userinfo',
+            name='active_membership',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='memberships.membership'),
+        ),
+        migrations.AddField(
+            model_name='userinfo',
+            name='active_purchase',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='memberships.membershippurchase'),
+        ),
+        migrations.AddField(
+            model_name='userinfo',
+            name='membership_purchased_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_active_membership, migrations.RunPython.noop),
+    ]
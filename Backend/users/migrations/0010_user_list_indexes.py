@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0009_userinfo_active_membership'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['created_at', 'id'], name='user_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['username', 'id'], name='user_username_id_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from users.search import USER_SEARCH
+    USER_SEARCH.install(schema_editor.connection)
+
+
+def uninstall_search_index(apps, schema_editor):
+    from users.search import USER_SEARCH
+    USER_SEARCH.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_user_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
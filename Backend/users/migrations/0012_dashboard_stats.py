@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:59
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_dashboard_stats(apps, schema_editor):
+    """Count the existing rows once; from here on the signals in users.signals keep the stats current"""
+    User = apps.get_model("users", "User")
+    Vendor = apps.get_model("vendors", "Vendor")
+    Product = apps.get_model("vendors", "Product")
+    MembershipPurchase = apps.get_model("memberships", "MembershipPurchase")
+    DashboardStat = apps.get_model("users", "DashboardStat")
+    DailyStat = apps.get_model("users", "DailyStat")
+
+    counters = {
+        "total_users": User.objects.count(),
+        "active_users": User.objects.filter(is_active=True).count(),
+        "staff_users": User.objects.filter(is_staff=True).count(),
+        "total_vendors": Vendor.objects.count(),
+        "total_products": Product.objects.count(),
+        "total_memberships": MembershipPurchase.objects.filter(is_active=True).count(),
+    }
+    DashboardStat.objects.bulk_create([DashboardStat(name=name, value=value) for name, value in counters.items()])
+
+    for metric, model, field in (("signups", User, "created_at"), ("purchases", MembershipPurchase, "purchased_at")):
+        rows = model.objects.annotate(day=TruncDate(field)).values("day").annotate(count=Count("id")).order_by()
+        DailyStat.objects.bulk_create(
+            [DailyStat(metric=metric, day=row["day"], count=row["count"]) for row in rows],
+            batch_size=2000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_user_search_index'),
+        ('vendors', '0025_product_search_index'),
+        ('memberships', '0002_membershippurchase'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=50)),
+                ('day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('metric', 'day')},
+            },
+        ),
+        migrations.RunPython(backfill_dashboard_stats, migrations.RunPython.noop),
+    ]
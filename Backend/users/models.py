@@ -33,11 +33,23 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     objects = UserManager()
 
+    class Meta:
+        # Keyset pagination of the admin user list (email and phone_number have unique indexes)
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="user_created_at_id_idx"),
+            models.Index(fields=["username", "id"], name="user_username_id_idx"),
+        ]
+
     def __str__(self):
         return self.username
 
 import random, string
 
+class UserInfoManager(models.Manager):
+    def get_queryset(self):
+        # The legacy profile_picture column can hold megabytes of base64; only load it on request
+        return super().get_queryset().defer("profile_picture")
+
 class UserInfo(models.Model):
     MEMBER_CHOICES = [("user","user"),("Basic","Basic"),("Standard","Standard"),("Smart","Smart"),("VVIP","VVIP")]
 
@@ -46,9 +58,15 @@ class UserInfo(models.Model):
 
     level = models.IntegerField(default=0)  # level depth in referral chain
     member_status = models.CharField(max_length=20, choices=MEMBER_CHOICES, default="user")
+    # Latest active MembershipPurchase, copied here by memberships.signals so lists need no per-user query
+    active_membership = models.ForeignKey("memberships.Membership", null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    active_purchase = models.ForeignKey("memberships.MembershipPurchase", null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    membership_purchased_at = models.DateTimeField(null=True, blank=True)
 
     # profile fields
-    profile_picture = models.TextField(null=True, blank=True)  # Changed to TextField to support data URLs
+    profile_picture = models.TextField(null=True, blank=True)  # Legacy base64 data URLs, moved to avatar by migrate_profile_pictures
+    avatar = models.ImageField(upload_to="avatars/", null=True, blank=True)
+    avatar_thumbnail = models.ImageField(upload_to="avatars/thumbnails/", null=True, blank=True)
     is_verified = models.BooleanField(default=False)
     address = models.TextField(null=True, blank=True)
     nid_or_brid = models.CharField(max_length=100, null=True, blank=True)
@@ -62,6 +80,8 @@ class UserInfo(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UserInfoManager()
+
     def save(self, *args, **kwargs):
         if not self.own_refercode:
             while True:
@@ -94,4 +114,27 @@ class PasswordResetToken(models.Model):
     
     def is_valid(self):
         """Check if token is valid (not used and not expired)"""
-        return not self.used and timezone.now() < self.expires_at
\ No newline at end of file
+        return not self.used and timezone.now() < self.expires_at
+
+class DashboardStat(models.Model):
+    """Running totals shown on the admin dashboard, kept current by users.stats"""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class DailyStat(models.Model):
+    """Events per day for the admin growth charts (signups, purchases), kept current by users.stats"""
+    metric = models.CharField(max_length=50)
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("metric", "day")
+
+    def __str__(self):
+        return f"{self.metric} {self.day}: {self.count}"
+
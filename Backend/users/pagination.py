@@ -0,0 +1,67 @@
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+# Sort keys the admin user list accepts; each one can be read in order from an index
+USER_ORDERING_FIELDS = ("created_at", "username", "email", "phone_number", "id")
+
+
+def parse_ordering(ordering, allowed=USER_ORDERING_FIELDS):
+    """Return (field, descending) for "field" or "-field". Raises ValueError for fields not in allowed."""
+    descending = ordering.startswith("-")
+    field = ordering.lstrip("-")
+    if field not in allowed:
+        raise ValueError(f"ordering must be one of: {', '.join(allowed)} (prefix with - for descending)")
+    return field, descending
+
+
+def encode_cursor(value, pk):
+    """Opaque cursor for the position of one row in (sort field, id) order"""
+    raw = json.dumps([value.isoformat() if hasattr(value, "isoformat") else value, pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor, model_field):
+    """Return (value, id) from a cursor, or raise ValueError"""
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return model_field.to_python(value), int(pk)
+    except (ValueError, TypeError, ValidationError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def sort_field(queryset, field):
+    """The model field, or the output field of an annotation, that field sorts on"""
+    if field in queryset.query.annotations:
+        return queryset.query.annotations[field].output_field
+    return queryset.model._meta.get_field(field)
+
+
+def keyset_paginate(queryset, ordering, cursor=None, limit=100, allowed=USER_ORDERING_FIELDS):
+    """
+    One page of queryset sorted by ordering, keyed on (field, id). The page is an
+    index range scan of limit + 1 rows wherever the reader is in the list, unlike
+    OFFSET, which reads and throws away every row before the page. field may also
+    be an annotation of queryset, such as search_rank.
+    Returns (rows, next cursor or None).
+    """
+    field, descending = parse_ordering(ordering, allowed)
+    if cursor:
+        value, pk = decode_cursor(cursor, sort_field(queryset, field))
+        if field == "id":
+            after = Q(id__lt=pk) if descending else Q(id__gt=pk)
+        elif descending:
+            after = Q(**{f"{field}__lt": value}) | Q(**{field: value, "id__lt": pk})
+        else:
+            after = Q(**{f"{field}__gt": value}) | Q(**{field: value, "id__gt": pk})
+        queryset = queryset.filter(after)
+
+    order = ["-id"] if descending else ["id"]
+    if field != "id":
+        order.insert(0, f"-{field}" if descending else field)
+    rows = list(queryset.order_by(*order)[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(getattr(rows[-1], field), rows[-1].id)
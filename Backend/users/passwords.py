@@ -0,0 +1,38 @@
+"""
+Hashing passwords of imported users on a process pool.
+
+Each hash costs the full work factor of the password hasher, so an import of a
+partner organisation is bound by it. The pool is started with "spawn": workers
+only import this module and the settings, never the web process or a thread of
+it, and need no database. This module must not import models for that reason.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from django.contrib.auth.hashers import make_password
+
+
+def hash_password(password):
+    """make_password, with no password (None or "") giving an unusable one"""
+    return make_password(password or None)
+
+
+@contextmanager
+def password_hasher(workers):
+    """
+    A map(passwords) that hashes on workers processes and yields the hashes in order,
+    hashing ahead of the consumer. Celery's worker processes may not start children,
+    so there the hashes run on threads (PBKDF2 releases the GIL while it hashes).
+    """
+    if workers <= 1:
+        yield lambda passwords: map(hash_password, passwords)
+        return
+    if multiprocessing.current_process().daemon:
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import-hash")
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        yield lambda passwords: pool.map(hash_password, passwords, chunksize=16)
+    finally:
+        # An import that stopped early does not wait for the hashes still queued
+        pool.shutdown(cancel_futures=True)
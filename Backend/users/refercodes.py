@@ -0,0 +1,243 @@
+"""
+Resolving referral codes for registration without a query per attempt.
+
+A code never changes owner, so code -> user id is cached for
+REFER_CODE_CACHE_TTL seconds; deleting the owner forgets it. With
+REFER_CODE_BLOOM each worker also keeps a Bloom filter of every code, so a
+code nobody owns is rejected without touching the database or the cache
+entry of the code.
+
+The filter must never say no to a code that exists. Every committed code is
+announced in the shared cache under the next number of a sequence
+(remember_refer_codes); a worker that misses a code first adds the codes
+announced since it last looked, and only answers "no" when it has seen them
+all. When an announcement is missing, the answer falls back to the database,
+and a filter that stays behind is rebuilt from the database. A code whose
+announcement fails is announced again with the next registration of the same
+process; since no other worker can notice that, every filter is also rebuilt
+once it is BLOOM_MAX_AGE seconds old, and a filter that cannot reach the cache
+answers "maybe" and leaves the code to the database. A cache private to
+each process cannot carry announcements between workers, so the filter stays
+off with one and every code is looked up as without REFER_CODE_BLOOM.
+"""
+import hashlib
+import logging
+import math
+import random
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .models import UserInfo
+
+logger = logging.getLogger(__name__)
+
+REFER_CODE_KEY = "refercode:{}"
+
+# Cache backends that only the process holding them can see
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+# Sequence number of the last announced code, and the code announced under each number
+ANNOUNCED_KEY = "refercode:announced"
+ANNOUNCEMENT_KEY = "refercode:announced:{}"
+ANNOUNCEMENT_TTL = 24 * 3600
+
+# False positive rate of the filter, and the bit positions per code that give it
+BLOOM_ERROR_RATE = 0.01
+BLOOM_HASHES = 7
+# A filter further behind than this many codes, or stuck on a missing announcement
+# for this many seconds, is rebuilt from the database instead of caught up
+BLOOM_MAX_CATCH_UP = 10000
+BLOOM_GAP_TIMEOUT = 60
+# A filter is rebuilt at least this often (seconds), in case an announcement was never made
+BLOOM_MAX_AGE = 600
+
+
+def announced():
+    """Sequence number of the last announced code, starting the sequence when the cache lost it"""
+    number = cache.get(ANNOUNCED_KEY)
+    if number is None:
+        # A random start, so a restarted sequence does not repeat numbers a filter has seen
+        cache.add(ANNOUNCED_KEY, random.getrandbits(48), None)
+        number = cache.get(ANNOUNCED_KEY)
+    return number
+
+
+def announce(codes):
+    try:
+        last = cache.incr(ANNOUNCED_KEY, len(codes))
+    except ValueError:
+        announced()
+        last = cache.incr(ANNOUNCED_KEY, len(codes))
+    first = last - len(codes) + 1
+    cache.set_many({ANNOUNCEMENT_KEY.format(first + i): code for i, code in enumerate(codes)}, ANNOUNCEMENT_TTL)
+
+
+# Codes of this process whose announcement failed, announced again with the next ones
+unannounced = []
+unannounced_lock = threading.Lock()
+
+
+def announce_codes(codes):
+    """Announce codes and any left over from a failed announcement; on failure keep them for the next try"""
+    with unannounced_lock:
+        codes = unannounced + codes
+        try:
+            announce(codes)
+        except Exception:
+            logger.exception("Could not announce %d referral codes", len(codes))
+            unannounced[:] = codes
+            # This filter has not seen the codes either
+            code_filter.invalidate()
+        else:
+            unannounced.clear()
+
+
+class ReferCodeFilter:
+    """Bloom filter of every own_refercode in this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.table = None  # (bits, size), replaced whole so lookups outside the lock see a consistent one
+        self.capacity = self.count = 0
+        self.seen = None  # sequence number of the last announcement added
+        self.gap = None  # (missing sequence number, since when)
+        self.built_at = None
+
+    @staticmethod
+    def positions(code, size):
+        digest = hashlib.blake2b(code.encode(), digest_size=16).digest()
+        first, step = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * step) % size for i in range(BLOOM_HASHES)]
+
+    @classmethod
+    def set_bits(cls, table, code):
+        bits, size = table
+        for position in cls.positions(code, size):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def add(self, code):
+        self.set_bits(self.table, code)
+        self.count += 1
+
+    def __contains__(self, code):
+        table = self.table
+        if table is None:
+            return False
+        bits, size = table
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self.positions(code, size))
+
+    def rebuild(self, number):
+        """Load every code; number is the announcement read before, so every code announced up to it is in the table"""
+        capacity = max(2 * UserInfo.objects.count(), 10000)
+        size = math.ceil(-capacity * math.log(BLOOM_ERROR_RATE) / math.log(2) ** 2)
+        table = (bytearray((size + 7) // 8), size)
+        count = 0
+        for code in UserInfo.objects.values_list("own_refercode", flat=True).iterator(chunk_size=10000):
+            self.set_bits(table, code)
+            count += 1
+        self.table, self.capacity, self.count = table, capacity, count
+        self.seen = number
+        self.gap = None
+        self.built_at = time.monotonic()
+
+    def invalidate(self):
+        """Rebuild from the database on the next miss"""
+        self.table = None
+
+    def catch_up(self):
+        """Add the codes announced since the last look. Returns False when one of them is missing from the cache."""
+        number = announced()
+        if (
+            self.table is None
+            or not 0 <= number - self.seen <= BLOOM_MAX_CATCH_UP
+            or self.count > self.capacity
+            or time.monotonic() - self.built_at > BLOOM_MAX_AGE
+        ):
+            self.rebuild(number)
+            return True
+        keys = [ANNOUNCEMENT_KEY.format(n) for n in range(self.seen + 1, number + 1)]
+        codes = cache.get_many(keys)
+        for key in keys:
+            if key not in codes:
+                missing = self.seen + 1
+                if self.gap is None or self.gap[0] != missing:
+                    self.gap = (missing, time.monotonic())
+                elif time.monotonic() - self.gap[1] > BLOOM_GAP_TIMEOUT:
+                    self.rebuild(number)
+                    return True
+                return False
+            self.add(codes[key])
+            self.seen += 1
+        self.gap = None
+        return True
+
+    def might_exist(self, code):
+        """False only when no user has code"""
+        if code in self:
+            return True
+        with self.lock:
+            try:
+                complete = self.catch_up()
+            except Exception:
+                logger.exception("Could not catch up the referral code filter")
+                return True
+            return code in self or not complete
+
+
+code_filter = ReferCodeFilter()
+warned_backends = set()
+
+
+def bloom_enabled():
+    """REFER_CODE_BLOOM, unless the default cache cannot share announcements between workers"""
+    if not settings.REFER_CODE_BLOOM:
+        return False
+    backend = settings.CACHES["default"]["BACKEND"]
+    if backend in PROCESS_LOCAL_CACHES:
+        if backend not in warned_backends:
+            warned_backends.add(backend)
+            logger.warning("REFER_CODE_BLOOM is ignored: the default cache (%s) is not shared between processes; set CACHE_URL", backend)
+        return False
+    return True
+
+
+def resolve_refer_code(code):
+    """User id of the owner of a referral code, or None"""
+    if bloom_enabled() and not code_filter.might_exist(code):
+        return None
+    ttl = settings.REFER_CODE_CACHE_TTL
+    key = REFER_CODE_KEY.format(code)
+    if ttl:
+        user_id = cache.get(key)
+        if user_id is not None:
+            return user_id
+    user_id = UserInfo.objects.filter(own_refercode=code).values_list("user_id", flat=True).first()
+    if user_id is not None and ttl:
+        cache.set(key, user_id, ttl)
+    return user_id
+
+
+def remember_refer_codes(owners):
+    """Cache and announce new codes ({code: user id}) once the transaction creating them commits"""
+    if not owners:
+        return
+
+    def remember():
+        # Runs after the registration committed, so a cache failure must not reach the client
+        if settings.REFER_CODE_CACHE_TTL:
+            try:
+                cache.set_many({REFER_CODE_KEY.format(code): user_id for code, user_id in owners.items()}, settings.REFER_CODE_CACHE_TTL)
+            except Exception:
+                logger.exception("Could not cache %d referral codes", len(owners))
+        if bloom_enabled():
+            announce_codes(list(owners))
+    transaction.on_commit(remember)
+
+
+def forget_refer_code(code):
+    cache.delete(REFER_CODE_KEY.format(code))
@@ -0,0 +1,4 @@
+from referral_system.search import SearchIndex
+
+# Admin user search; weights rank matches in each column
+USER_SEARCH = SearchIndex("users_user", {"username": 1.0, "email": 1.0, "phone_number": 1.0})
@@ -1,8 +1,17 @@
 from rest_framework import serializers
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from .models import User, UserInfo
-from memberships.models import MembershipPurchase
+from .refercodes import resolve_refer_code, forget_refer_code
+from .avatars import MAX_UPLOAD_BYTES, decode_data_url, open_image, set_avatar
 
 class RegisterSerializer(serializers.Serializer):
+    """
+    Registration in a few queries: one for a taken email or phone number, the
+    sponsor's referral code through users.refercodes (usually no query), and the
+    sponsor with their level once, for the new user.
+    """
     username = serializers.CharField()
     phone_number = serializers.CharField()
     email = serializers.EmailField()
@@ -12,51 +21,68 @@ class RegisterSerializer(serializers.Serializer):
     def validate_username(self, v):
         return v
 
-    def validate_phone_number(self, v):
-        if User.objects.filter(phone_number=v).exists():
-            raise serializers.ValidationError("phone number already taken")
-        return v
-
-    def validate_email(self, v):
-        if User.objects.filter(email=v).exists():
-            raise serializers.ValidationError("email already taken")
-        return v
-
     def validate_referred_by(self, v):
         # Allow empty string or None (no referral)
         if not v or (isinstance(v, str) and v.strip() == ""):
             return None
-        # If referral code is provided, validate it exists
-        if not UserInfo.objects.filter(own_refercode=v).exists():
-            raise serializers.ValidationError("Invalid referral code")
         return v
 
+    def validate(self, attrs):
+        errors = {}
+        taken = User.objects.filter(
+            Q(email=attrs["email"]) | Q(phone_number=attrs["phone_number"])
+        ).values_list("email", "phone_number")
+        for email, phone_number in taken:
+            if phone_number == attrs["phone_number"]:
+                errors["phone_number"] = ["phone number already taken"]
+            if email == attrs["email"]:
+                errors["email"] = ["email already taken"]
+
+        # If referral code is provided, validate it exists; create() reuses the owner
+        referral_code = attrs.get("referred_by")
+        if referral_code:
+            attrs["sponsor_id"] = resolve_refer_code(referral_code)
+            if attrs["sponsor_id"] is None:
+                errors["referred_by"] = ["Invalid referral code"]
+
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
     def create(self, validated_data):
-        referral_code = validated_data.pop("referred_by", None)
         referred_by_user = None
         level = 0
 
-        if referral_code and referral_code.strip():
-            parent_info = UserInfo.objects.filter(own_refercode=referral_code).first()
-            if parent_info:
-                referred_by_user = parent_info.user
-                level = parent_info.level + 1
-
-        user = User.objects.create_user(
-            email=validated_data["email"],
-            username=validated_data["username"],
-            phone_number=validated_data["phone_number"],
-            password=validated_data["password"],
-            referred_by=referred_by_user
-        )
-
-        # Create UserInfo with default values: member_status="user" and is_verified=False
-        UserInfo.objects.create(
-            user=user, 
-            level=level,
-            member_status="user",  # Default membership status
-            is_verified=False  # Not verified by default
-        )
+        sponsor_id = validated_data.get("sponsor_id")
+        if sponsor_id:
+            parent_info = UserInfo.objects.select_related("user").filter(user_id=sponsor_id).first()
+            if parent_info is None:
+                # The sponsor was deleted after their code was cached
+                forget_refer_code(validated_data["referred_by"])
+                raise serializers.ValidationError({"referred_by": ["Invalid referral code"]})
+            referred_by_user = parent_info.user
+            level = parent_info.level + 1
+
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(
+                    email=validated_data["email"],
+                    username=validated_data["username"],
+                    phone_number=validated_data["phone_number"],
+                    password=validated_data["password"],
+                    referred_by=referred_by_user
+                )
+
+                # Create UserInfo with default values: member_status="user" and is_verified=False
+                UserInfo.objects.create(
+                    user=user, 
+                    level=level,
+                    member_status="user",  # Default membership status
+                    is_verified=False  # Not verified by default
+                )
+        except IntegrityError:
+            # Someone registered the same email or phone number since validate()
+            raise serializers.ValidationError({"non_field_errors": ["email or phone number already taken"]})
 
         return user
 
@@ -108,30 +134,86 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'username', 'email', 'phone_number', 'is_staff', 'is_superuser']
 
-class UserInfoSerializer(serializers.ModelSerializer):
+class ProfilePictureField(serializers.Field):
+    """
+    Reads as the absolute URL of an image field of UserInfo. Writes accept a base64
+    image data URL or an uploaded file; "" or null removes the picture, and an
+    http(s) URL (the current picture sent back) leaves it unchanged.
+    """
+    def __init__(self, image_field="avatar", **kwargs):
+        self.image_field = image_field
+        kwargs.setdefault("source", "*")
+        kwargs.setdefault("required", False)
+        super().__init__(**kwargs)
+
+    def validate_empty_values(self, data):
+        if data is None and not self.read_only:
+            return (False, data)
+        return super().validate_empty_values(data)
+
+    def to_representation(self, user_info):
+        image = getattr(user_info, self.image_field)
+        if not image:
+            return None
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(image.url)
+        backend_url = getattr(settings, 'BACKEND_URL', 'http://localhost:8000')
+        return f"{backend_url}{image.url}"
+
+    def to_internal_value(self, data):
+        if data in (None, ""):
+            return {"picture_content": None}
+        try:
+            if hasattr(data, "read"):
+                if getattr(data, "size", 0) > MAX_UPLOAD_BYTES:
+                    raise ValueError("Image is too large")
+                content = data.read(MAX_UPLOAD_BYTES + 1)
+            elif isinstance(data, str):
+                if data.startswith(("http://", "https://", "/")):
+                    return {}
+                content = decode_data_url(data)
+            else:
+                raise serializers.ValidationError("Expected a base64 image data URL or an image file")
+            # Decoded here so a bad image fails validation before anything is saved
+            return {"picture_content": open_image(content)}
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
+
+class ProfilePictureMixin(serializers.Serializer):
+    """profile_picture and profile_picture_thumbnail backed by the avatar files instead of the legacy column"""
+    profile_picture = ProfilePictureField()
+    profile_picture_thumbnail = ProfilePictureField(image_field="avatar_thumbnail", read_only=True)
+
+    def update(self, instance, validated_data):
+        content = validated_data.pop("picture_content", False)
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if content is not False:
+                set_avatar(instance, content)
+        return instance
+
+
+class UserInfoSerializer(ProfilePictureMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     active_membership = serializers.SerializerMethodField()
     
     class Meta:
         model = UserInfo
-        fields = "__all__"
+        exclude = ['avatar', 'avatar_thumbnail', 'active_purchase', 'membership_purchased_at']
         # is_verified and member_status are read-only - they can only be updated via membership purchase signal
         read_only_fields = ['id', 'user', 'own_refercode', 'level', 'member_status', 'is_verified', 'created_at', 'updated_at']
     
     def get_active_membership(self, obj):
-        """Get the active membership purchase for the user"""
-        active_purchase = MembershipPurchase.objects.filter(
-            user=obj.user,
-            is_active=True
-        ).order_by('-purchased_at').first()
-        
-        if active_purchase:
-            return {
-                'name': active_purchase.membership.name,
-                'purchased_at': active_purchase.purchased_at,
-                'is_active': active_purchase.is_active
-            }
-        return None
+        """The active membership, read from the denormalized columns on UserInfo"""
+        if obj.active_membership_id is None:
+            return None
+        return {
+            'name': obj.active_membership.name,
+            'purchased_at': obj.membership_purchased_at,
+            'is_active': True
+        }
 
 class PasswordResetRequestSerializer(serializers.Serializer):
     """Serializer for requesting password reset"""
@@ -0,0 +1,83 @@
+"""
+Login: one lookup query by email or phone number, and password hashing on a
+bounded thread pool that the (async) login view awaits, so no request worker or
+event loop waits on PBKDF2. A miss, or an account without a usable password,
+hashes against a dummy password, so it takes as long as a wrong password.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.db.models import Q
+from .models import User
+
+
+class LoginBusy(Exception):
+    """More logins are waiting for the hash pool than LOGIN_HASH_MAX_PENDING"""
+
+
+_pool = ThreadPoolExecutor(max_workers=settings.LOGIN_HASH_WORKERS, thread_name_prefix="login-hash")
+_pending = threading.BoundedSemaphore(settings.LOGIN_HASH_MAX_PENDING)
+
+
+@lru_cache(maxsize=None)
+def dummy_password_hash():
+    return make_password("dummy-password-for-timing")
+
+
+@lru_cache(maxsize=None)
+def warm_up():
+    """Compute the dummy hash in the background on the first login, so the first miss is not slower than the rest"""
+    _pool.submit(dummy_password_hash)
+
+
+def verify_password(password, encoded):
+    """
+    Return (password matches, stored hash should be upgraded), checking against the
+    dummy password when encoded is None. Runs on the hash pool; no database access.
+    """
+    encoded = encoded or dummy_password_hash()
+    upgrade = []
+    matches = check_password(password, encoded, setter=lambda raw_password: upgrade.append(True))
+    return matches, bool(upgrade)
+
+
+def submit_hash(password, encoded):
+    if not _pending.acquire(blocking=False):
+        raise LoginBusy()
+    future = _pool.submit(verify_password, password, encoded)
+    future.add_done_callback(lambda f: _pending.release())
+    return future
+
+
+def login_candidates(identifier):
+    """Users whose email or phone number is identifier; an email match comes first"""
+    return User.objects.filter(Q(email=identifier) | Q(phone_number=identifier))[:2]
+
+
+def pick_user(users, identifier):
+    users = sorted(users, key=lambda user: user.email != identifier)
+    return users[0] if users else None
+
+
+def password_to_check(user):
+    """(encoded password to hash against, None for the dummy one; whether a match may log the user in)"""
+    if user is None or not user.password or not user.has_usable_password():
+        return None, False
+    return user.password, True
+
+
+async def aauthenticate_login(identifier, password):
+    """Return the user for identifier (email or phone number) and password, or None. Raises LoginBusy."""
+    warm_up()
+    user = pick_user([user async for user in login_candidates(identifier)], identifier)
+    encoded, usable = password_to_check(user)
+    matches, upgrade = await asyncio.wrap_future(submit_hash(password, encoded))
+    if not (usable and matches):
+        return None
+    if upgrade:
+        user.set_password(password)
+        await user.asave(update_fields=["password"])
+    return user
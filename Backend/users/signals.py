@@ -1,10 +1,120 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from .models import UserInfo, User
 from referral.services import populate_referral_levels_for_user
+from .authentication import invalidate_cached_user
+from .refercodes import remember_refer_codes, forget_refer_code
+from . import stats
 
 # @receiver(post_save, sender=UserInfo)
 # def on_userinfo_created(sender, instance, created, **kwargs):
 #     if created and instance.user.referred_by:
 #         # populate precomputed upline levels for this user
-#         populate_referral_levels_for_user(instance.user.id, instance.user.referred_by.id)
\ No newline at end of file
+#         populate_referral_levels_for_user(instance.user.id, instance.user.referred_by.id)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserInfo)
+@receiver([post_save, post_delete], sender="vendors.Vendor")
+def invalidate_user_profile(sender, instance, **kwargs):
+    invalidate_cached_user(instance.user_id)
+
+
+@receiver(post_save, sender=UserInfo)
+def remember_refer_code(sender, instance, created, **kwargs):
+    if created:
+        remember_refer_codes({instance.own_refercode: instance.user_id})
+
+
+@receiver(post_delete, sender=UserInfo)
+def forget_deleted_refer_code(sender, instance, **kwargs):
+    forget_refer_code(instance.own_refercode)
+
+
+# Admin dashboard statistics (users.stats). pre_save reads the stored flags of a row
+# whose counted flags may change, so post_save can tell whether one changed.
+
+def loaded_flag(instance, field):
+    # Deferred fields are not in __dict__; reading them here would cost a query per row
+    return instance.__dict__.get(field)
+
+
+def stored_flags(sender, instance, fields, update_fields):
+    """Stored values of fields (None for each when the save cannot change them or the row is new)"""
+    if instance._state.adding or (update_fields is not None and not set(fields) & set(update_fields)):
+        return (None,) * len(fields)
+    return sender._default_manager.filter(pk=instance.pk).values_list(*fields).first() or (None,) * len(fields)
+
+
+@receiver(pre_save, sender=User)
+def remember_user_flags(sender, instance, update_fields=None, **kwargs):
+    instance._stats_flags = stored_flags(sender, instance, ("is_active", "is_staff"), update_fields)
+
+
+@receiver(post_save, sender=User)
+def count_user(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        stats.adjust_counter(stats.TOTAL_USERS, 1)
+        stats.adjust_counter(stats.ACTIVE_USERS, int(instance.is_active))
+        stats.adjust_counter(stats.STAFF_USERS, int(instance.is_staff))
+        stats.adjust_daily(stats.SIGNUPS, instance.created_at, 1)
+    else:
+        was_active, was_staff = instance._stats_flags
+        if was_active is not None and (update_fields is None or "is_active" in update_fields):
+            stats.adjust_counter(stats.ACTIVE_USERS, int(instance.is_active) - int(was_active))
+        if was_staff is not None and (update_fields is None or "is_staff" in update_fields):
+            stats.adjust_counter(stats.STAFF_USERS, int(instance.is_staff) - int(was_staff))
+
+
+@receiver(post_delete, sender=User)
+def uncount_user(sender, instance, **kwargs):
+    stats.adjust_counter(stats.TOTAL_USERS, -1)
+    stats.adjust_counter(stats.ACTIVE_USERS, -int(bool(loaded_flag(instance, "is_active"))))
+    stats.adjust_counter(stats.STAFF_USERS, -int(bool(loaded_flag(instance, "is_staff"))))
+    stats.adjust_daily(stats.SIGNUPS, loaded_flag(instance, "created_at"), -1)
+
+
+@receiver(post_save, sender="vendors.Vendor")
+def count_vendor(sender, instance, created, **kwargs):
+    if created:
+        stats.adjust_counter(stats.TOTAL_VENDORS, 1)
+
+
+@receiver(post_delete, sender="vendors.Vendor")
+def uncount_vendor(sender, instance, **kwargs):
+    stats.adjust_counter(stats.TOTAL_VENDORS, -1)
+
+
+@receiver(post_save, sender="vendors.Product")
+def count_product(sender, instance, created, **kwargs):
+    if created:
+        stats.adjust_counter(stats.TOTAL_PRODUCTS, 1)
+
+
+@receiver(post_delete, sender="vendors.Product")
+def uncount_product(sender, instance, **kwargs):
+    stats.adjust_counter(stats.TOTAL_PRODUCTS, -1)
+
+
+@receiver(pre_save, sender="memberships.MembershipPurchase")
+def remember_purchase_flags(sender, instance, update_fields=None, **kwargs):
+    instance._stats_active, = stored_flags(sender, instance, ("is_active",), update_fields)
+
+
+@receiver(post_save, sender="memberships.MembershipPurchase")
+def count_purchase(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        stats.adjust_counter(stats.TOTAL_MEMBERSHIPS, int(instance.is_active))
+        stats.adjust_daily(stats.PURCHASES, instance.purchased_at, 1)
+    elif instance._stats_active is not None and (update_fields is None or "is_active" in update_fields):
+        stats.adjust_counter(stats.TOTAL_MEMBERSHIPS, int(instance.is_active) - int(instance._stats_active))
+
+
+@receiver(post_delete, sender="memberships.MembershipPurchase")
+def uncount_purchase(sender, instance, **kwargs):
+    stats.adjust_counter(stats.TOTAL_MEMBERSHIPS, -int(bool(loaded_flag(instance, "is_active"))))
+    stats.adjust_daily(stats.PURCHASES, loaded_flag(instance, "purchased_at"), -1)
@@ -0,0 +1,148 @@
+"""
+Admin dashboard statistics, kept as running totals (DashboardStat) and per-day
+counts (DailyStat) instead of being counted on every dashboard load.
+
+The signals in users.signals adjust them once the transaction of each write
+commits, each adjustment in its own short autocommit UPDATE: a registration or
+purchase never holds the lock of a shared counter row while the rest of its
+transaction runs. A rolled-back write adjusts nothing. Writes that send no signals (queryset.update(), bulk_create(), raw SQL) are
+corrected by recount_dashboard_stats, which runs periodically.
+"""
+import logging
+from datetime import datetime, time, timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import User, DashboardStat, DailyStat
+
+logger = logging.getLogger(__name__)
+
+# Counters shown by admin_dashboard_stats
+TOTAL_USERS = "total_users"
+ACTIVE_USERS = "active_users"
+STAFF_USERS = "staff_users"
+TOTAL_VENDORS = "total_vendors"
+TOTAL_PRODUCTS = "total_products"
+TOTAL_MEMBERSHIPS = "total_memberships"  # active membership purchases
+
+# Daily metrics shown by admin_dashboard_growth
+SIGNUPS = "signups"
+PURCHASES = "purchases"
+
+
+def counter_querysets():
+    """The query each counter stands for; recount_dashboard_stats runs them"""
+    from memberships.models import MembershipPurchase
+    from vendors.models import Vendor, Product
+    return {
+        TOTAL_USERS: User.objects.all(),
+        ACTIVE_USERS: User.objects.filter(is_active=True),
+        STAFF_USERS: User.objects.filter(is_staff=True),
+        TOTAL_VENDORS: Vendor.objects.all(),
+        TOTAL_PRODUCTS: Product.objects.all(),
+        TOTAL_MEMBERSHIPS: MembershipPurchase.objects.filter(is_active=True),
+    }
+
+
+def daily_querysets():
+    """The rows each daily metric counts, by created_at or purchased_at"""
+    from memberships.models import MembershipPurchase
+    return {
+        SIGNUPS: (User.objects.all(), "created_at"),
+        PURCHASES: (MembershipPurchase.objects.all(), "purchased_at"),
+    }
+
+
+def after_commit(apply, *args):
+    """Run apply(*args) once the current transaction commits; a failure is logged and left to the recount"""
+    def run():
+        try:
+            apply(*args)
+        except Exception:
+            logger.exception("Could not update dashboard statistic %s", args[0])
+    transaction.on_commit(run)
+
+
+def adjust_counter(name, delta):
+    """Add delta to a counter once the current transaction commits"""
+    if delta:
+        after_commit(apply_counter, name, delta)
+
+
+def adjust_daily(metric, moment, delta):
+    """Add delta to the count of metric on the local day of moment, once the current transaction commits"""
+    if delta and moment is not None:
+        after_commit(apply_daily, metric, timezone.localdate(moment), delta)
+
+
+def apply_counter(name, delta):
+    if DashboardStat.objects.filter(name=name).update(value=F("value") + delta):
+        return
+    try:
+        with transaction.atomic():
+            DashboardStat.objects.create(name=name, value=delta)
+    except IntegrityError:
+        # Another write created the row first
+        DashboardStat.objects.filter(name=name).update(value=F("value") + delta)
+
+
+def apply_daily(metric, day, delta):
+    if DailyStat.objects.filter(metric=metric, day=day).update(count=F("count") + delta):
+        return
+    try:
+        with transaction.atomic():
+            DailyStat.objects.create(metric=metric, day=day, count=delta)
+    except IntegrityError:
+        DailyStat.objects.filter(metric=metric, day=day).update(count=F("count") + delta)
+
+
+def dashboard_counters():
+    """Every counter by name in one query; counters that were never written are 0"""
+    values = dict(DashboardStat.objects.values_list("name", "value"))
+    return {name: values.get(name, 0) for name in counter_querysets()}
+
+
+def daily_series(days):
+    """[{"day", "signups", "purchases"}] for the last days days up to today, with 0 for days without events"""
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    series = {start + timedelta(days=i): {metric: 0 for metric in daily_querysets()} for i in range(days)}
+    for metric, day, count in DailyStat.objects.filter(day__gte=start, day__lte=today).values_list("metric", "day", "count"):
+        if metric in series[day]:
+            series[day][metric] = count
+    return [{"day": day, **counts} for day, counts in series.items()]
+
+
+def recount_dashboard_stats(days=2):
+    """
+    Recount every counter, and the daily metrics of the last days days (all days when
+    days is None), from the source tables. Returns the number of rows written.
+    """
+    written = 0
+    for name, queryset in counter_querysets().items():
+        DashboardStat.objects.update_or_create(name=name, defaults={"value": queryset.count()})
+        written += 1
+
+    since = timezone.localdate() - timedelta(days=days - 1) if days else None
+    for metric, (queryset, field) in daily_querysets().items():
+        if since:
+            queryset = queryset.filter(**{f"{field}__gte": timezone.make_aware(datetime.combine(since, time.min))})
+        rows = (
+            queryset
+            .annotate(day=TruncDate(field))
+            .values("day")
+            .annotate(count=Count("id"))
+            .order_by()
+        )
+        with transaction.atomic():
+            stale = DailyStat.objects.filter(metric=metric)
+            if since:
+                stale = stale.filter(day__gte=since)
+            stale.delete()
+            created = DailyStat.objects.bulk_create(
+                [DailyStat(metric=metric, day=row["day"], count=row["count"]) for row in rows],
+                batch_size=2000,
+            )
+        written += len(created)
+    return written
@@ -0,0 +1,8 @@
+from celery import shared_task
+from .stats import recount_dashboard_stats
+
+
+@shared_task
+def task_recount_dashboard_stats():
+    return recount_dashboard_stats()
+
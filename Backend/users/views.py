@@ -1,17 +1,27 @@
 from rest_framework.views import APIView
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.exceptions import ParseError, Throttled
+from rest_framework.settings import api_settings
 from rest_framework import status, permissions
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.conf import settings
 from django.utils import timezone
-from django.core.mail import send_mail
 from django.urls import reverse
 from .serializers import (
     RegisterSerializer, LoginSerializer, UserInfoSerializer,
     PasswordResetRequestSerializer, PasswordResetVerifySerializer, PasswordResetSerializer
 )
 from .models import UserInfo, User, PasswordResetToken
+from .services import aauthenticate_login, LoginBusy
+from notifications.outbox import enqueue_email
+import math
 import threading
 import secrets
 from datetime import timedelta
@@ -46,31 +56,58 @@ class RegisterView(APIView):
             "referral_code": user.info.own_refercode
         }, status=status.HTTP_201_CREATED)
 
-class LoginView(APIView):
-    permission_classes = [permissions.AllowAny]
-    def post(self, request):
-        s = LoginSerializer(data=request.data)
+@method_decorator(csrf_exempt, name="dispatch")
+class LoginView(View):
+    """
+    Async, so the password hash is awaited on the hash pool instead of holding a
+    worker thread or the event loop. Takes the same bodies and applies the same
+    anonymous throttling as the API views.
+    """
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+
+    async def post(self, request):
+        drf_request = Request(request, parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES], authenticators=[])
+        for throttle in [throttle_class() for throttle_class in self.throttle_classes]:
+            if not await sync_to_async(throttle.allow_request)(drf_request, self):
+                wait = throttle.wait()
+                return JsonResponse(
+                    {"detail": Throttled(wait).detail},
+                    status=status.HTTP_429_TOO_MANY_REQUESTS,
+                    headers={"Retry-After": str(math.ceil(wait))} if wait is not None else None,
+                )
+        try:
+            data = drf_request.data
+        except ParseError as e:
+            return JsonResponse({"detail": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        s = LoginSerializer(data=data)
         if not s.is_valid():
             # Return validation errors
-            return Response(s.errors, status=status.HTTP_400_BAD_REQUEST)
+            return JsonResponse(s.errors, status=status.HTTP_400_BAD_REQUEST)
         
         identifier = s.validated_data["identifier"]
         password = s.validated_data["password"]
         
-        # Try to find user by email or phone number
-        user = User.objects.filter(email=identifier).first() or User.objects.filter(phone_number=identifier).first()
+        # One lookup by email or phone number; unknown identifiers are hashed too, so both failures look alike
+        try:
+            user = await aauthenticate_login(identifier, password)
+        except LoginBusy:
+            return JsonResponse(
+                {"detail": "Too many login attempts right now. Please try again in a moment."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"}
+            )
         
-        # Check if user exists and password is correct
         # Return generic error for both cases to prevent user enumeration
-        if not user or not user.check_password(password):
-            return Response(
+        if not user:
+            return JsonResponse(
                 {"detail": "Invalid credentials. Please check your email/phone and password."}, 
                 status=status.HTTP_401_UNAUTHORIZED
             )
         
         # Generate tokens for authenticated user
         refresh = RefreshToken.for_user(user)
-        return Response({
+        return JsonResponse({
             "refresh": str(refresh), 
             "access": str(refresh.access_token)
         })
@@ -84,19 +121,25 @@ class MyDownlinesView(APIView):
         downlines = get_downlines(user.id)
         return Response({"downlines": downlines})
 
+def user_info_for(user):
+    """The user's profile, reusing the one loaded with the user at authentication when present"""
+    try:
+        return user.info
+    except UserInfo.DoesNotExist:
+        user_info, created = UserInfo.objects.get_or_create(user=user)
+        return user_info
+
 class UserInfoUpdateView(APIView):
     """Get or update user info profile"""
     def get(self, request):
         """Get user info"""
-        user = request.user
-        user_info, created = UserInfo.objects.get_or_create(user=user)
+        user_info = user_info_for(request.user)
         serializer = UserInfoSerializer(user_info)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
     def post(self, request):
         """Update user info profile"""
-        user = request.user
-        user_info, created = UserInfo.objects.get_or_create(user=user)
+        user_info = user_info_for(request.user)
         
         # Filter out read-only fields from request data
         # Note: is_verified and member_status are read-only - they can only be updated via membership purchase signal
@@ -122,7 +165,7 @@ class UserInfoUpdateView(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 class PasswordResetRequestView(APIView):
-    """Request password reset - sends email with reset token"""
+    """Request password reset - queues an email with the reset token"""
     permission_classes = [permissions.AllowAny]
     
     def post(self, request):
@@ -156,17 +199,12 @@ class PasswordResetRequestView(APIView):
         frontend_url = getattr(settings, 'FRONTEND_URL', 'http://localhost:3000')
         reset_url = f"{frontend_url}/reset-password?token={token}"
         
-        # Check if email is configured
-        email_user = getattr(settings, 'EMAIL_HOST_USER', '') or ''
-        email_password = getattr(settings, 'EMAIL_HOST_PASSWORD', '') or ''
-        email_configured = bool(email_user.strip() and email_password.strip())
-        
-        # Send email if configured, otherwise log to console for development
-        if email_configured:
-            try:
-                send_mail(
-                    subject='Password Reset Request - Dreamy Life',
-                    message=f'''
+        # Queue the email if configured, otherwise log to console for development
+        if settings.EMAIL_ENABLED:
+            enqueue_email(
+                user.email,
+                'Password Reset Request - Dreamy Life',
+                f'''
 Hello {user.username},
 
 You requested to reset your password. Please click the link below to reset your password:
@@ -180,24 +218,7 @@ If you did not request this password reset, please ignore this email.
 Best regards,
 Dreamy Life Team
                     ''',
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[user.email],
-                    fail_silently=False,
-                )
-            except Exception as e:
-                # Log error
-                print(f"Error sending password reset email: {e}")
-                # In development, also print the reset link to console
-                if settings.DEBUG:
-                    print(f"\n{'='*60}")
-                    print(f"PASSWORD RESET LINK (Email not configured):")
-                    print(f"Email: {user.email}")
-                    print(f"Reset URL: {reset_url}")
-                    print(f"{'='*60}\n")
-                return Response({
-                    'detail': 'Failed to send email. Please check email configuration or contact support.',
-                    'account_exists': True
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            )
         else:
             # Email not configured - log to console for development
             print(f"\n{'='*60}")
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
 
 
 class VendorsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'vendors'
+
+    def ready(self):
+        post_migrate.connect(repair_search_index, sender=self)
+
+
+def repair_search_index(sender, using, **kwargs):
+    from .search import PRODUCT_SEARCH
+    PRODUCT_SEARCH.repair(connections[using])
@@ -0,0 +1,60 @@
+"""
+Rows of the admin order export: one row per order item with its order's columns,
+read in one joined query through a server-side cursor (referral_system.exports writes them).
+"""
+from users.filters import parse_moment
+
+# Export column and the values() lookup it reads. Orders without items get one row with empty item columns.
+ORDER_EXPORT_COLUMNS = [
+    ("order_id", "id"),
+    ("order_number", "order_number"),
+    ("created_at", "created_at"),
+    ("user_id", "user_id"),
+    ("username", "user__username"),
+    ("customer_name", "customer_name"),
+    ("customer_email", "customer_email"),
+    ("customer_phone", "customer_phone"),
+    ("delivery_address", "delivery_address"),
+    ("delivery_area", "delivery_area"),
+    ("order_status", "order_status"),
+    ("payment_status", "payment_status"),
+    ("subtotal", "subtotal"),
+    ("delivery_charge", "delivery_charge"),
+    ("vat_amount", "vat_amount"),
+    ("total_amount", "total_amount"),
+    ("reseller_price_applied", "reseller_price_applied"),
+    ("reseller_price_total", "reseller_price_total"),
+    ("item_id", "items__id"),
+    ("product_id", "items__product_id"),
+    ("sku", "items__product__sku"),
+    ("product", "items__product__title"),
+    ("quantity", "items__quantity"),
+    ("unit_price", "items__unit_price"),
+    ("reseller_unit_price", "items__reseller_unit_price"),
+    ("item_subtotal", "items__subtotal"),
+]
+ORDER_EXPORT_HEADER = [column for column, lookup in ORDER_EXPORT_COLUMNS]
+
+
+def filter_orders(queryset, params):
+    """Filter by order_status, payment_status, user and created_after/created_before. Raises ValueError."""
+    if params.get("order_status"):
+        queryset = queryset.filter(order_status=params["order_status"])
+    if params.get("payment_status"):
+        queryset = queryset.filter(payment_status=params["payment_status"])
+    if params.get("user"):
+        try:
+            queryset = queryset.filter(user_id=int(params["user"]))
+        except ValueError:
+            raise ValueError("user must be a user id")
+    if params.get("created_after"):
+        queryset = queryset.filter(created_at__gte=parse_moment("created_after", params["created_after"]))
+    if params.get("created_before"):
+        queryset = queryset.filter(created_at__lt=parse_moment("created_before", params["created_before"]))
+    return queryset
+
+
+def order_export_rows(queryset, chunk_size=2000):
+    """Rows of ORDER_EXPORT_COLUMNS, by order id and then item id"""
+    rows = queryset.order_by("id", "items__id").values_list(*(lookup for column, lookup in ORDER_EXPORT_COLUMNS))
+    return rows.iterator(chunk_size=chunk_size)
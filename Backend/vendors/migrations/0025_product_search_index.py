@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from vendors.search import PRODUCT_SEARCH
+    PRODUCT_SEARCH.install(schema_editor.connection)
+
+
+def uninstall_search_index(apps, schema_editor):
+    from vendors.search import PRODUCT_SEARCH
+    PRODUCT_SEARCH.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0024_order_orderitem_order_vendors_ord_order_n_83f55a_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,4 @@
+from referral_system.search import SearchIndex
+
+# Shop product search; a title match ranks above a tag match, which ranks above a description match
+PRODUCT_SEARCH = SearchIndex("vendors_product", {"title": 1.0, "sku": 1.0, "tags": 0.6, "description": 0.3})
@@ -3,11 +3,14 @@ from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view, permission_classes
-from django.db.models import Q, Prefetch
+from django.db.models import Prefetch
 from django.utils import timezone
 from decimal import Decimal
 import secrets
+from referral_system.exports import EXPORT_FORMATS, export_response
 from .models import Product, Vendor, Category, Brand, Order, OrderItem
+from .exports import ORDER_EXPORT_HEADER, filter_orders, order_export_rows
+from .search import PRODUCT_SEARCH
 from .serializers import (
     ProductSerializer, ProductCreateSerializer, VendorSerializer,
     PublicProductSerializer, PublicVendorSerializer,
@@ -149,7 +152,7 @@ class PublicShopProductsView(APIView):
         vendor_id = request.query_params.get('vendor', None)
         min_price = request.query_params.get('min_price', None)
         max_price = request.query_params.get('max_price', None)
-        sort_by = request.query_params.get('sort_by', 'created_at')  # created_at, price_asc, price_desc, name
+        sort_by = request.query_params.get('sort_by', 'relevance' if search else 'created_at')  # relevance, created_at, price_asc, price_desc, name
         page = int(request.query_params.get('page', 1))
         page_size = int(request.query_params.get('page_size', 20))
         
@@ -162,12 +165,7 @@ class PublicShopProductsView(APIView):
         
         # Apply filters
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search) |
-                Q(sku__icontains=search) |
-                Q(tags__icontains=search)
-            )
+            queryset = PRODUCT_SEARCH.search(queryset, search)
         
         if category_id:
             queryset = queryset.filter(category_id=category_id)
@@ -191,6 +189,8 @@ class PublicShopProductsView(APIView):
             queryset = queryset.order_by('-price')
         elif sort_by == 'name':
             queryset = queryset.order_by('title')
+        elif sort_by == 'relevance' and search:
+            queryset = queryset.order_by('-search_rank', '-created_at')
         else:
             queryset = queryset.order_by('-created_at')
         
@@ -415,3 +415,20 @@ class OrderDetailView(APIView):
                 {'detail': 'Order not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+
+
+class AdminOrderExportView(APIView):
+    """
+    Stream every order with its items as CSV or XLSX (Admin only), one row per item.
+    Filters: order_status, payment_status, user, created_after, created_before.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+
+    def get(self, request, file_format):
+        if file_format not in EXPORT_FORMATS:
+            return Response({"error": "Export format must be csv or xlsx"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            orders = filter_orders(Order.objects.all(), request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return export_response(request, file_format, "orders", ORDER_EXPORT_HEADER, order_export_rows(orders), sheet="Orders")
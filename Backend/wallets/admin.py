@@ -2,7 +2,8 @@ from django.contrib import admin
 from .models import (
     Wallet, WalletTransaction,
     Funds, FundsTransaction,
-    Points, PointsTransaction
+    Points, PointsTransaction,
+    EarningsRollup, LedgerArchive, ArchivedTransaction
 )
 
 @admin.register(Wallet)
@@ -12,9 +13,11 @@ class WalletAdmin(admin.ModelAdmin):
 
 @admin.register(WalletTransaction)
 class WalletTransactionAdmin(admin.ModelAdmin):
-    list_display = ('wallet', 'transaction_type', 'amount', 'description', 'created_at')
-    search_fields = ('wallet__user__username', 'description')
-    list_filter = ('transaction_type', 'created_at')
+    list_display = ('wallet', 'transaction_type', 'amount', 'kind', 'level', 'source_user', 'created_at')
+    search_fields = ('wallet__user__username', 'source_user__username')
+    list_filter = ('transaction_type', 'kind', 'level', 'created_at')
+    list_select_related = ('wallet__user', 'source_user')
+    raw_id_fields = ('wallet', 'source_user', 'membership', 'purchase')
     ordering = ('-created_at',)
 
 @admin.register(Funds)
@@ -39,4 +42,26 @@ class PointsTransactionAdmin(admin.ModelAdmin):
     list_display = ('points', 'transaction_type', 'amount', 'description', 'created_at')
     search_fields = ('points__user__username', 'description')
     list_filter = ('transaction_type', 'created_at')
+    ordering = ('-created_at',)
+
+@admin.register(EarningsRollup)
+class EarningsRollupAdmin(admin.ModelAdmin):
+    list_display = ('user', 'day', 'kind', 'level', 'total', 'count')
+    search_fields = ('user__username',)
+    list_filter = ('kind', 'level', 'day')
+    raw_id_fields = ('user',)
+    ordering = ('-day',)
+
+@admin.register(LedgerArchive)
+class LedgerArchiveAdmin(admin.ModelAdmin):
+    list_display = ('ledger', 'account_id', 'credits', 'debits', 'archived_until', 'updated_at')
+    search_fields = ('account_id',)
+    list_filter = ('ledger',)
+    ordering = ('-updated_at',)
+
+@admin.register(ArchivedTransaction)
+class ArchivedTransactionAdmin(admin.ModelAdmin):
+    list_display = ('ledger', 'account_id', 'transaction_type', 'amount', 'kind', 'created_at', 'archived_at')
+    search_fields = ('account_id',)
+    list_filter = ('ledger', 'transaction_type', 'kind')
     ordering = ('-created_at',)
\ No newline at end of file
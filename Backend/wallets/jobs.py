@@ -0,0 +1,48 @@
+"""Background jobs over the ledgers."""
+from jobs.registry import register
+from jobs.results import csv_result
+from .services import LEDGERS, account_id_chunks, reconcile_chunk
+
+
+def clean_reconcile_params(params):
+    """{"ledgers": [...] (default all), "fix": bool, "chunk_size": account ids per chunk}"""
+    ledgers = params.get("ledgers") or list(LEDGERS)
+    if not isinstance(ledgers, list) or set(ledgers) - set(LEDGERS):
+        raise ValueError(f"ledgers must be a list of: {', '.join(LEDGERS)}")
+    try:
+        chunk_size = int(params.get("chunk_size", 10000))
+    except (TypeError, ValueError):
+        chunk_size = 0
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer")
+    return {"ledgers": ledgers, "fix": bool(params.get("fix", False)), "chunk_size": chunk_size}
+
+
+@register("reconcile_ledgers", clean=clean_reconcile_params)
+def reconcile_ledgers(job):
+    """
+    What `manage.py reconcile_wallets` does, in one process: check every account
+    chunk by chunk and write the drifted accounts to drift.csv.
+    """
+    fix = job.params.get("fix", False)
+    chunks = [
+        (ledger, start, end)
+        for ledger in job.params.get("ledgers", list(LEDGERS))
+        for start, end in account_id_chunks(ledger, job.params.get("chunk_size", 10000))
+    ]
+    job.report(total=len(chunks))
+    checked = drifted = fixed = 0
+    with csv_result(job, "drift.csv") as writer:
+        writer.writerow(["ledger", "account_id", "user_id", "balance", "expected", "drift"])
+        for done, (ledger, start, end) in enumerate(chunks, 1):
+            chunk_checked, drift, chunk_fixed = reconcile_chunk(ledger, start, end, fix)
+            checked += chunk_checked
+            drifted += len(drift)
+            fixed += chunk_fixed
+            for row in drift:
+                writer.writerow([
+                    row["ledger"], row["account_id"], row["user_id"],
+                    row["balance"], row["expected"], row["balance"] - row["expected"],
+                ])
+            job.report(processed=done, result={"checked": checked, "drifted": drifted, "fixed": fixed})
+    return {"checked": checked, "drifted": drifted, "fixed": fixed}
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from wallets.services import LEDGERS, account_id_chunks, archive_chunk, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = "Move ledger rows older than LEDGER_ARCHIVE_AFTER_DAYS to the archive, leaving one opening-balance row per account"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ledger", action="append", choices=sorted(LEDGERS),
+            help="Ledger to archive (repeatable). Defaults to all ledgers.",
+        )
+        parser.add_argument("--older-than-days", type=int, help="Override LEDGER_ARCHIVE_AFTER_DAYS")
+        parser.add_argument("--chunk-size", type=int, default=200, help="Account ids per transaction")
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options["older_than_days"])
+        self.stdout.write(f"Archiving ledger rows created before {cutoff:%Y-%m-%d %H:%M %Z}")
+
+        for ledger in options["ledger"] or list(LEDGERS):
+            accounts = rows = 0
+            for start, end in account_id_chunks(ledger, options["chunk_size"]):
+                chunk_accounts, chunk_rows = archive_chunk(ledger, start, end, cutoff)
+                accounts += chunk_accounts
+                rows += chunk_rows
+            self.stdout.write(self.style.SUCCESS(f"{ledger}: archived {rows} rows of {accounts} accounts"))
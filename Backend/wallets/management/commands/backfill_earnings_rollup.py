@@ -0,0 +1,47 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from wallets.models import WalletTransaction, ArchivedTransaction
+from wallets.services import rebuild_earnings_rollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily earnings rollup from wallet transactions (hot and archived), one day per transaction"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="First day to rebuild (YYYY-MM-DD). Defaults to the oldest transaction, archived or not.")
+        parser.add_argument(
+            "--until",
+            help="Last day to rebuild (YYYY-MM-DD). Defaults to yesterday, because today's rows are still "
+                 "being updated by live credits.",
+        )
+
+    def handle(self, *args, **options):
+        since = self.parse_day(options["since"]) if options["since"] else None
+        until = self.parse_day(options["until"]) if options["until"] else timezone.localdate() - timedelta(days=1)
+
+        if since is None:
+            firsts = [
+                queryset.exclude(kind="opening_balance").order_by("created_at").values_list("created_at", flat=True).first()
+                for queryset in (WalletTransaction.objects.all(), ArchivedTransaction.objects.filter(ledger="wallet"))
+            ]
+            firsts = [first for first in firsts if first is not None]
+            if not firsts:
+                self.stdout.write("No wallet transactions to roll up")
+                return
+            since = timezone.localdate(min(firsts))
+
+        day = since
+        total_rows = 0
+        while day <= until:
+            total_rows += rebuild_earnings_rollup(day)
+            day += timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt earnings rollup from {since} to {until}: {total_rows} rows"))
+
+    def parse_day(self, value):
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"Invalid date: {value}")
+        return day
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from datetime import datetime, timezone as dt_timezone
+from wallets.partitions import (
+    PARTITIONED_MODELS, add_months, month_start,
+    is_partitioned, list_partitions, create_partition, check_archived, detach_partition,
+)
+
+
+class Command(BaseCommand):
+    help = "Create upcoming monthly partitions of the ledger transaction tables and detach old ones (PostgreSQL)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ahead", type=int, default=3, help="Months after the current one to create partitions for")
+        parser.add_argument(
+            "--detach-older-than", type=int, metavar="MONTHS",
+            help="Detach partitions that ended more than MONTHS months before the current month; "
+                 "months archive_ledgers has not archived yet are skipped",
+        )
+        parser.add_argument(
+            "--archive-schema",
+            help="Move detached partitions into this schema instead of leaving them next to the live tables",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only print what would be done")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Ledger partitioning requires PostgreSQL")
+        if options["archive_schema"] and options["detach_older_than"] is None:
+            raise CommandError("--archive-schema requires --detach-older-than")
+
+        this_month = month_start(datetime.now(dt_timezone.utc))
+        dry_run = options["dry_run"]
+
+        for model in PARTITIONED_MODELS:
+            table = model._meta.db_table
+            with transaction.atomic(), connection.cursor() as cursor:
+                if not is_partitioned(cursor, table):
+                    raise CommandError(f"{table} is not partitioned; run migrations first")
+                existing = list_partitions(cursor, table)
+
+                for offset in range(options["ahead"] + 1):
+                    month = add_months(this_month, offset)
+                    if month not in existing:
+                        self.stdout.write(f"{table}: create partition for {month:%Y-%m}")
+                        if not dry_run:
+                            create_partition(cursor, table, month)
+
+                if options["detach_older_than"] is not None:
+                    cutoff = add_months(this_month, -options["detach_older_than"])
+                    for month, name in sorted(existing.items()):
+                        # A partition covers [month, month + 1); keep it until it ends before the cutoff
+                        if add_months(month, 1) <= cutoff:
+                            try:
+                                check_archived(cursor, table, name)
+                            except ValueError as e:
+                                self.stderr.write(f"Not detached: {e}")
+                                continue
+                            target = f" into schema {options['archive_schema']}" if options["archive_schema"] else ""
+                            self.stdout.write(f"{table}: detach {name}{target}")
+                            if not dry_run:
+                                detach_partition(cursor, table, name, options["archive_schema"])
+
+        self.stdout.write(self.style.SUCCESS("Dry run finished" if dry_run else "Ledger partitions are up to date"))
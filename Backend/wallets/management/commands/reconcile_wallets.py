@@ -0,0 +1,61 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.db import connections
+from wallets.services import LEDGERS, account_id_chunks, reconcile_chunk, init_reconcile_worker
+
+
+class Command(BaseCommand):
+    help = "Check that Wallet, Funds and Points balances equal credits minus debits, and optionally fix drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ledger", action="append", choices=sorted(LEDGERS),
+            help="Ledger to check (repeatable). Defaults to all ledgers.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=10000, help="Account ids per chunk")
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1,
+            help="Worker processes. Use 1 to run in this process.",
+        )
+        parser.add_argument("--fix", action="store_true", help="Set drifted balances to the ledger total")
+
+    def handle(self, *args, **options):
+        ledgers = options["ledger"] or list(LEDGERS)
+        fix = options["fix"]
+        jobs = [
+            (ledger, start, end)
+            for ledger in ledgers
+            for start, end in account_id_chunks(ledger, options["chunk_size"])
+        ]
+
+        checked = drifted = fixed = 0
+        for chunk_checked, drift, chunk_fixed in self.run_chunks(jobs, fix, options["workers"]):
+            checked += chunk_checked
+            drifted += len(drift)
+            fixed += chunk_fixed
+            for row in drift:
+                self.stdout.write(
+                    f"{row['ledger']} #{row['account_id']} (user {row['user_id']}): "
+                    f"balance {row['balance']}, ledger {row['expected']}, "
+                    f"drift {row['balance'] - row['expected']}"
+                )
+
+        summary = f"Checked {checked} accounts in {len(jobs)} chunks, {drifted} drifted"
+        if fix:
+            summary += f", {fixed} fixed"
+        style = self.style.WARNING if drifted > fixed else self.style.SUCCESS
+        self.stdout.write(style(summary))
+
+    def run_chunks(self, jobs, fix, workers):
+        if workers <= 1 or len(jobs) <= 1:
+            for ledger, start, end in jobs:
+                yield reconcile_chunk(ledger, start, end, fix)
+            return
+
+        # Forked workers must not share the parent's database sockets
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_reconcile_worker) as pool:
+            futures = [pool.submit(reconcile_chunk, ledger, start, end, fix) for ledger, start, end in jobs]
+            for future in as_completed(futures):
+                yield future.result()
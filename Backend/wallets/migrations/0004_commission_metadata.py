@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memberships', '0002_membershippurchase'),
+        ('wallets', '0003_funds_fundstransaction_points_pointstransaction'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wallettransaction',
+            name='kind',
+            field=models.CharField(choices=[('commission', 'Commission'), ('adjustment', 'Adjustment'), ('other', 'Other')], default='other', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='wallettransaction',
+            name='level',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='wallettransaction',
+            name='membership',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='memberships.membership'),
+        ),
+        migrations.AddField(
+            model_name='wallettransaction',
+            name='purchase',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='commission_transactions', to='memberships.membershippurchase'),
+        ),
+        migrations.AddField(
+            model_name='wallettransaction',
+            name='source_user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='generated_commissions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='wallettransaction',
+            name='wallet',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='wallets.wallet'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', 'kind', 'level'], name='wallets_wal_wallet__b3a2c9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', 'source_user'], name='wallets_wal_wallet__2a2498_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+import re
+from django.db import migrations
+
+# Descriptions written by memberships.services and referral.services before the structured columns existed
+LEVEL_PATTERNS = [
+    re.compile(r"^Level (\d+) commission from "),
+    re.compile(r"^Referral commission from .* \(L(\d+)\)$"),
+]
+
+
+def backfill_commission_metadata(apps, schema_editor):
+    """Set kind and level on existing commission rows. Usernames are not unique, so source_user stays empty."""
+    WalletTransaction = apps.get_model("wallets", "WalletTransaction")
+    rows = (
+        WalletTransaction.objects
+        .filter(kind="other", description__contains="ommission")
+        .only("id", "description")
+        .iterator(chunk_size=2000)
+    )
+    batch = []
+    for row in rows:
+        for pattern in LEVEL_PATTERNS:
+            match = pattern.match(row.description)
+            if match:
+                row.kind = "commission"
+                row.level = int(match.group(1))
+                batch.append(row)
+                break
+        if len(batch) >= 2000:
+            WalletTransaction.objects.bulk_update(batch, ["kind", "level"])
+            batch = []
+    if batch:
+        WalletTransaction.objects.bulk_update(batch, ["kind", "level"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallets', '0004_commission_metadata'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_commission_metadata, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallets', '0005_backfill_commission_metadata'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EarningsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('kind', models.CharField(choices=[('commission', 'Commission'), ('adjustment', 'Adjustment'), ('other', 'Other')], max_length=20)),
+                ('level', models.PositiveSmallIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='earnings_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'day', 'kind', 'level')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def partition_ledger_tables(apps, schema_editor):
+    """Convert the ledger transaction tables to monthly partitions on PostgreSQL"""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    from wallets.partitions import is_partitioned, partition_table
+
+    with schema_editor.connection.cursor() as cursor:
+        for model_name in ("WalletTransaction", "FundsTransaction", "PointsTransaction"):
+            table = apps.get_model("wallets", model_name)._meta.db_table
+            if not is_partitioned(cursor, table):
+                partition_table(cursor, table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallets', '0006_earningsrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_ledger_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallets', '0007_partition_ledger_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fundstransaction',
+            name='kind',
+            field=models.CharField(choices=[('opening_balance', 'Opening balance'), ('other', 'Other')], default='other', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='pointstransaction',
+            name='kind',
+            field=models.CharField(choices=[('opening_balance', 'Opening balance'), ('other', 'Other')], default='other', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='earningsrollup',
+            name='kind',
+            field=models.CharField(choices=[('commission', 'Commission'), ('adjustment', 'Adjustment'), ('opening_balance', 'Opening balance'), ('other', 'Other')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='wallettransaction',
+            name='kind',
+            field=models.CharField(choices=[('commission', 'Commission'), ('adjustment', 'Adjustment'), ('opening_balance', 'Opening balance'), ('other', 'Other')], default='other', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ledger', models.CharField(choices=[('wallet', 'Wallet'), ('funds', 'Funds'), ('points', 'Points')], max_length=10)),
+                ('account_id', models.BigIntegerField()),
+                ('original_id', models.BigIntegerField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('transaction_type', models.CharField(choices=[('credit', 'Credit'), ('debit', 'Debit')], max_length=10)),
+                ('kind', models.CharField(default='other', max_length=20)),
+                ('description', models.TextField(blank=True)),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ledger', 'account_id', 'created_at'], name='wallets_arc_ledger_666a43_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ledger', models.CharField(choices=[('wallet', 'Wallet'), ('funds', 'Funds'), ('points', 'Points')], max_length=10)),
+                ('account_id', models.BigIntegerField()),
+                ('credits', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('debits', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('archived_until', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('ledger', 'account_id')},
+            },
+        ),
+    ]
@@ -10,12 +10,27 @@ class Wallet(models.Model):
         return f"{self.user.username} - {self.balance}"
 
 class WalletTransaction(models.Model):
+    KIND_CHOICES = [("commission","Commission"),("adjustment","Adjustment"),("opening_balance","Opening balance"),("other","Other")]
+
     wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="transactions")
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     transaction_type = models.CharField(max_length=10, choices=[("credit","Credit"),("debit","Debit")], default="credit")
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(default=timezone.now)
 
+    # Structured commission metadata, filled by the commission engine
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default="other")
+    source_user = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name="generated_commissions")
+    level = models.PositiveSmallIntegerField(null=True, blank=True)
+    membership = models.ForeignKey("memberships.Membership", null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    purchase = models.ForeignKey("memberships.MembershipPurchase", null=True, blank=True, on_delete=models.SET_NULL, related_name="commission_transactions")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["wallet", "kind", "level"]),
+            models.Index(fields=["wallet", "source_user"]),
+        ]
+
     def __str__(self):
         return f"{self.wallet.user.username} {self.transaction_type} {self.amount}"
 
@@ -27,11 +42,14 @@ class Funds(models.Model):
         return f"{self.user.username} - Funds: {self.balance}"
 
 class FundsTransaction(models.Model):
+    KIND_CHOICES = [("opening_balance","Opening balance"),("other","Other")]
+
     funds = models.ForeignKey(Funds, on_delete=models.CASCADE, related_name="transactions")
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     transaction_type = models.CharField(max_length=10, choices=[("credit","Credit"),("debit","Debit")], default="credit")
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(default=timezone.now)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default="other")
 
     def __str__(self):
         return f"{self.funds.user.username} Funds {self.transaction_type} {self.amount}"
@@ -44,11 +62,69 @@ class Points(models.Model):
         return f"{self.user.username} - Points: {self.balance}"
 
 class PointsTransaction(models.Model):
+    KIND_CHOICES = [("opening_balance","Opening balance"),("other","Other")]
+
     points = models.ForeignKey(Points, on_delete=models.CASCADE, related_name="transactions")
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     transaction_type = models.CharField(max_length=10, choices=[("credit","Credit"),("debit","Debit")], default="credit")
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(default=timezone.now)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default="other")
+
+    def __str__(self):
+        return f"{self.points.user.username} Points {self.transaction_type} {self.amount}"
+
+class EarningsRollup(models.Model):
+    """Daily wallet credit totals per user, kind and level. Maintained by wallets.services.credit_wallet."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="earnings_rollups")
+    day = models.DateField()
+    kind = models.CharField(max_length=20, choices=WalletTransaction.KIND_CHOICES)
+    level = models.PositiveSmallIntegerField(default=0)  # 0 when the credit has no upline level
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("user", "day", "kind", "level")
+
+    def __str__(self):
+        return f"{self.user.username} {self.day} {self.kind} L{self.level}: {self.total}"
+
+
+class LedgerArchive(models.Model):
+    """Per-account totals of the ledger rows moved to ArchivedTransaction by archive_ledgers"""
+    LEDGER_CHOICES = [("wallet","Wallet"),("funds","Funds"),("points","Points")]
+
+    ledger = models.CharField(max_length=10, choices=LEDGER_CHOICES)
+    account_id = models.BigIntegerField()
+    credits = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    debits = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    archived_until = models.DateTimeField()  # every row older than this is in the archive
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("ledger", "account_id")
+
+    def __str__(self):
+        return f"{self.ledger} #{self.account_id} archived until {self.archived_until:%Y-%m-%d}"
+
+
+class ArchivedTransaction(models.Model):
+    """Cold copy of a ledger row older than LEDGER_ARCHIVE_AFTER_DAYS. Opening-balance rows are kept for audit only."""
+    ledger = models.CharField(max_length=10, choices=LedgerArchive.LEDGER_CHOICES)
+    account_id = models.BigIntegerField()
+    original_id = models.BigIntegerField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    transaction_type = models.CharField(max_length=10, choices=[("credit","Credit"),("debit","Debit")])
+    kind = models.CharField(max_length=20, default="other")
+    description = models.TextField(blank=True)
+    metadata = models.JSONField(default=dict, blank=True)  # structured columns of the original row (source_user_id, level, ...)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["ledger", "account_id", "created_at"]),
+        ]
 
     def __str__(self):
-        return f"{self.points.user.username} Points {self.transaction_type} {self.amount}"
\ No newline at end of file
+        return f"{self.ledger} #{self.account_id} {self.transaction_type} {self.amount} (archived)"
@@ -0,0 +1,175 @@
+"""
+Monthly range partitioning of the ledger transaction tables on created_at.
+PostgreSQL only: the tables stay regular tables on other databases.
+
+Each table gets one partition per calendar month (UTC), named <table>_pYYYY_MM,
+plus a <table>_default partition that catches rows outside the created months.
+The default partition should stay empty: create partitions ahead of time with
+`manage.py manage_ledger_partitions`. Only months archive_ledgers has moved to
+the archive can be detached.
+"""
+import re
+from datetime import date, datetime, timezone as dt_timezone
+from django.db.models import Max
+from .models import WalletTransaction, FundsTransaction, PointsTransaction, LedgerArchive
+
+PARTITIONED_MODELS = [WalletTransaction, FundsTransaction, PointsTransaction]
+
+# Ledger (as in LedgerArchive) whose rows each partitioned table holds
+PARTITIONED_LEDGERS = {
+    WalletTransaction._meta.db_table: "wallet",
+    FundsTransaction._meta.db_table: "funds",
+    PointsTransaction._meta.db_table: "points",
+}
+
+PARTITION_SUFFIX = re.compile(r"_p(\d{4})_(\d{2})$")
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y_%m}"
+
+
+def is_partitioned(cursor, table):
+    cursor.execute(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+        [table],
+    )
+    return cursor.fetchone() is not None
+
+
+def list_partitions(cursor, table):
+    """Return {month: partition name} for the monthly partitions currently attached to table"""
+    cursor.execute(
+        "SELECT child.relname FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent "
+        "JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = %s AND pg_table_is_visible(parent.oid)",
+        [table],
+    )
+    partitions = {}
+    for (name,) in cursor.fetchall():
+        match = PARTITION_SUFFIX.search(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def create_partition(cursor, table, month):
+    """Create the partition holding one month of rows, if it does not exist yet"""
+    quote = cursor.db.ops.quote_name
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {quote(partition_name(table, month))} "
+        f"PARTITION OF {quote(table)} FOR VALUES FROM (%s) TO (%s)",
+        [f"{month:%Y-%m-%d} 00:00:00+00", f"{add_months(month, 1):%Y-%m-%d} 00:00:00+00"],
+    )
+
+
+def check_archived(cursor, table, name):
+    """
+    Raise ValueError unless archive_ledgers has moved every row of the partition
+    to the archive: its month must end before the ledger's archive cutoff, and it
+    must be empty. Detaching any other partition would take rows out of balances.
+    """
+    quote = cursor.db.ops.quote_name
+    ledger = PARTITIONED_LEDGERS[table]
+    match = PARTITION_SUFFIX.search(name)
+    end = add_months(date(int(match.group(1)), int(match.group(2)), 1), 1)
+    cutoff = LedgerArchive.objects.filter(ledger=ledger).aggregate(cutoff=Max("archived_until"))["cutoff"]
+    if cutoff is None or datetime(end.year, end.month, end.day, tzinfo=dt_timezone.utc) > cutoff:
+        archived = f"is archived up to {cutoff:%Y-%m-%d}" if cutoff else "has not been archived"
+        raise ValueError(f"{name} is not archived yet: the {ledger} ledger {archived}; run archive_ledgers first")
+    cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {quote(name)})")
+    if cursor.fetchone()[0]:
+        raise ValueError(f"{name} still holds rows; run archive_ledgers over its month first")
+
+
+def detach_partition(cursor, table, name, archive_schema=None):
+    """
+    Detach a partition so it no longer takes part in queries on table.
+    With archive_schema the detached table is moved into that schema.
+    Raises ValueError when the partition is not archived yet (see check_archived).
+    """
+    quote = cursor.db.ops.quote_name
+    check_archived(cursor, table, name)
+    cursor.execute(f"ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}")
+    if archive_schema:
+        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {quote(archive_schema)}")
+        cursor.execute(f"ALTER TABLE {quote(name)} SET SCHEMA {quote(archive_schema)}")
+
+
+def partition_table(cursor, table, months_ahead=3, today=None):
+    """
+    Convert an existing regular table into a table partitioned by month on created_at.
+    Rows are copied into monthly partitions; indexes, check and foreign key constraints
+    are recreated with their original names. The primary key becomes (id, created_at),
+    because PostgreSQL requires the partition key in every unique index; ids keep
+    coming from one sequence, so they stay unique.
+    """
+    quote = cursor.db.ops.quote_name
+    old_table = f"{table}_unpartitioned"
+    sequence = f"{table}_id_seq"
+
+    # Remember indexes and foreign keys; LIKE does not copy them to a partitioned table
+    cursor.execute(
+        "SELECT pg_get_indexdef(indexrelid) FROM pg_index WHERE indrelid = %s::regclass AND NOT indisprimary",
+        [table],
+    )
+    index_defs = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype = 'f'",
+        [table],
+    )
+    foreign_keys = cursor.fetchall()
+
+    cursor.execute(f"ALTER TABLE {quote(table)} RENAME TO {quote(old_table)}")
+    cursor.execute(
+        "SELECT is_identity FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = %s AND column_name = 'id'",
+        [old_table],
+    )
+    if cursor.fetchone()[0] == "YES":
+        cursor.execute(f"ALTER TABLE {quote(old_table)} ALTER COLUMN id DROP IDENTITY")
+    else:
+        cursor.execute(f"ALTER TABLE {quote(old_table)} ALTER COLUMN id DROP DEFAULT")
+        cursor.execute(f"DROP SEQUENCE IF EXISTS {quote(sequence)}")
+
+    cursor.execute(
+        f"CREATE TABLE {quote(table)} (LIKE {quote(old_table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        f"PARTITION BY RANGE (created_at)"
+    )
+    cursor.execute(f"CREATE SEQUENCE {quote(sequence)} OWNED BY {quote(table)}.id")
+    cursor.execute(f"ALTER TABLE {quote(table)} ALTER COLUMN id SET DEFAULT nextval(%s::regclass)", [sequence])
+    cursor.execute(f"ALTER TABLE {quote(table)} ADD PRIMARY KEY (id, created_at)")
+
+    # One partition per month that has rows, up to months_ahead from now
+    this_month = month_start(today or date.today())
+    cursor.execute(
+        f"SELECT MIN(created_at AT TIME ZONE 'UTC'), MAX(created_at AT TIME ZONE 'UTC') FROM {quote(old_table)}"
+    )
+    oldest, newest = cursor.fetchone()
+    month = month_start(oldest) if oldest else this_month
+    last = max(add_months(this_month, months_ahead), month_start(newest) if newest else this_month)
+    while month <= last:
+        create_partition(cursor, table, month)
+        month = add_months(month, 1)
+    cursor.execute(f"CREATE TABLE {quote(table + '_default')} PARTITION OF {quote(table)} DEFAULT")
+
+    cursor.execute(f"INSERT INTO {quote(table)} SELECT * FROM {quote(old_table)}")
+    cursor.execute(f"SELECT setval(%s::regclass, COALESCE(MAX(id), 0) + 1, false) FROM {quote(table)}", [sequence])
+    cursor.execute(f"DROP TABLE {quote(old_table)}")
+
+    for index_def in index_defs:
+        cursor.execute(index_def)
+    for name, definition in foreign_keys:
+        cursor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}")
@@ -9,7 +9,7 @@ from .models import (
 class WalletTransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = WalletTransaction
-        fields = ['id', 'amount', 'transaction_type', 'description', 'created_at']
+        fields = ['id', 'amount', 'transaction_type', 'description', 'kind', 'level', 'source_user', 'created_at']
         read_only_fields = ['id', 'created_at']
 
 class WalletSerializer(serializers.ModelSerializer):
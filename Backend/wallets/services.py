@@ -0,0 +1,334 @@
+import heapq
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import connections, transaction, IntegrityError
+from django.db.models import F, Sum, Q, Min, Max, Count, Value, DecimalField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Wallet, WalletTransaction, Funds, Points, EarningsRollup, LedgerArchive, ArchivedTransaction
+
+# Every ledger account keeps its rows under the "transactions" related name
+LEDGERS = {
+    "wallet": Wallet,
+    "funds": Funds,
+    "points": Points,
+}
+
+
+def ledger_transactions(ledger):
+    """Return (transaction model, name of its account foreign key) for a ledger"""
+    field = LEDGERS[ledger].transactions.field
+    return field.model, field.name
+
+
+def user_wallet(user):
+    """The user's wallet, reusing the one loaded with the user at authentication when present"""
+    try:
+        return user.wallet
+    except Wallet.DoesNotExist:
+        wallet, _ = Wallet.objects.get_or_create(user=user)
+        return wallet
+
+
+@transaction.atomic
+def credit_wallet(user, amount, description="", **metadata):
+    """
+    Credit a user's wallet and log the transaction.
+    The balance is incremented in the database, so concurrent credits are never lost.
+    metadata fills the structured columns (kind, source_user, level, membership, purchase).
+    """
+    amount = Decimal(amount)
+    wallet, _ = Wallet.objects.get_or_create(user=user)
+    Wallet.objects.filter(pk=wallet.pk).update(balance=F("balance") + amount)
+    txn = WalletTransaction.objects.create(
+        wallet=wallet,
+        amount=amount,
+        transaction_type="credit",
+        description=description,
+        **metadata
+    )
+    add_to_earnings_rollup(user.id, timezone.localdate(txn.created_at), txn.kind, txn.level, amount)
+    return txn
+
+
+def add_to_earnings_rollup(user_id, day, kind, level, amount, count=1):
+    """Increment the daily earnings rollup row, creating it on the first credit of the day"""
+    lookup = {"user_id": user_id, "day": day, "kind": kind, "level": level or 0}
+    changes = {"total": F("total") + amount, "count": F("count") + count}
+    if EarningsRollup.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            EarningsRollup.objects.create(total=amount, count=count, **lookup)
+    except IntegrityError:
+        # Another credit created the row first
+        EarningsRollup.objects.filter(**lookup).update(**changes)
+
+
+@transaction.atomic
+def rebuild_earnings_rollup(day):
+    """
+    Recompute every rollup row of one day from the wallet transactions, reading the
+    rows archive_ledgers has moved out of the hot table from ArchivedTransaction.
+    Returns the number of rows written.
+    """
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+    totals = {}
+
+    def add(user_id, kind, level, total, count):
+        key = (user_id, kind, level or 0)
+        current = totals.get(key, (Decimal("0"), 0))
+        totals[key] = (current[0] + total, current[1] + count)
+
+    # Opening-balance rows carry archived rows, which are counted from the archive
+    hot = (
+        WalletTransaction.objects
+        .filter(transaction_type="credit", created_at__gte=start, created_at__lt=end)
+        .exclude(kind="opening_balance")
+        .values("wallet__user_id", "kind", "level")
+        .annotate(total=Sum("amount"), count=Count("id"))
+        .order_by()
+    )
+    for row in hot.iterator(chunk_size=2000):
+        add(row["wallet__user_id"], row["kind"], row["level"], row["total"], row["count"])
+
+    cold = list(
+        ArchivedTransaction.objects
+        .filter(ledger="wallet", transaction_type="credit", created_at__gte=start, created_at__lt=end)
+        .exclude(kind="opening_balance")
+        .values("account_id", "kind", "metadata__level")
+        .annotate(total=Sum("amount"), count=Count("id"))
+        .order_by()
+    )
+    owners = dict(
+        Wallet.objects.filter(id__in={row["account_id"] for row in cold}).values_list("id", "user_id")
+    ) if cold else {}
+    for row in cold:
+        if row["account_id"] in owners:
+            add(owners[row["account_id"]], row["kind"], row["metadata__level"], row["total"], row["count"])
+
+    EarningsRollup.objects.filter(day=day).delete()
+    rollups = EarningsRollup.objects.bulk_create([
+        EarningsRollup(user_id=user_id, day=day, kind=kind, level=level, total=total, count=count)
+        for (user_id, kind, level), (total, count) in totals.items()
+    ], batch_size=2000)
+    return len(rollups)
+
+
+def ledger_totals(ledger, start_id, end_id):
+    """
+    Stream (account_id, user_id, stored balance, ledger balance) for the accounts
+    with ids in [start_id, end_id). Credits and debits are summed per account by
+    the database in one grouped query, so no transaction rows reach Python.
+    """
+    account_model = LEDGERS[ledger]
+    zero = Value(Decimal("0"), output_field=DecimalField(max_digits=12, decimal_places=2))
+    queryset = (
+        account_model.objects
+        .filter(id__gte=start_id, id__lt=end_id)
+        .annotate(
+            credits=Coalesce(Sum("transactions__amount", filter=Q(transactions__transaction_type="credit")), zero),
+            debits=Coalesce(Sum("transactions__amount", filter=Q(transactions__transaction_type="debit")), zero),
+        )
+        .order_by("id")
+        .values_list("id", "user_id", "balance", "credits", "debits")
+    )
+    for account_id, user_id, balance, credits, debits in queryset.iterator(chunk_size=2000):
+        yield account_id, user_id, balance, credits - debits
+
+
+def account_id_chunks(ledger, chunk_size):
+    """Split the account id space of a ledger into [start, end) ranges"""
+    bounds = LEDGERS[ledger].objects.aggregate(low=Min("id"), high=Max("id"))
+    if bounds["low"] is None:
+        return []
+    return [
+        (start, start + chunk_size)
+        for start in range(bounds["low"], bounds["high"] + 1, chunk_size)
+    ]
+
+
+def reconcile_chunk(ledger, start_id, end_id, fix=False):
+    """
+    Compare stored balances with credits minus debits for one chunk of accounts.
+    With fix=True drifted balances are set to the ledger total. The update only
+    applies if the balance is still the value that was checked, so an account
+    credited in the meantime is reported but left alone.
+
+    Returns (accounts checked, list of drift dicts, accounts fixed).
+    """
+    checked = 0
+    drift = []
+    for account_id, user_id, balance, expected in ledger_totals(ledger, start_id, end_id):
+        checked += 1
+        if balance != expected:
+            drift.append({
+                "ledger": ledger,
+                "account_id": account_id,
+                "user_id": user_id,
+                "balance": balance,
+                "expected": expected,
+            })
+
+    fixed = 0
+    if fix:
+        account_model = LEDGERS[ledger]
+        for row in drift:
+            with transaction.atomic():
+                fixed += account_model.objects.filter(
+                    id=row["account_id"], balance=row["balance"]
+                ).update(balance=row["expected"])
+    return checked, drift, fixed
+
+
+def init_reconcile_worker():
+    """Process pool initializer: make sure Django is set up and no parent connection is reused"""
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def archive_cutoff(days=None):
+    """Start of the day LEDGER_ARCHIVE_AFTER_DAYS (or days) ago; rows created before it get archived"""
+    if days is None:
+        days = settings.LEDGER_ARCHIVE_AFTER_DAYS
+    day = timezone.localdate() - timedelta(days=days)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+@transaction.atomic
+def archive_chunk(ledger, start_id, end_id, cutoff):
+    """
+    Move the rows older than cutoff of the accounts with ids in [start_id, end_id)
+    into ArchivedTransaction. Each account gets one opening-balance row dated at the
+    cutoff that carries the net amount of its archived rows, so the balance still
+    equals credits minus debits over the hot table. Earlier opening-balance rows are
+    archived along with the rest and folded into the new one.
+
+    Returns (accounts archived, rows archived).
+    """
+    txn_model, account_field = ledger_transactions(ledger)
+    account_attr = f"{account_field}_id"
+    metadata_fields = [
+        f.attname for f in txn_model._meta.concrete_fields
+        if f.attname not in ("id", account_attr, "amount", "transaction_type", "kind", "description", "created_at")
+    ]
+
+    rows = (
+        txn_model.objects
+        .filter(**{f"{account_attr}__gte": start_id, f"{account_attr}__lt": end_id}, created_at__lt=cutoff)
+        .order_by(account_attr, "created_at", "id")
+        .values()
+    )
+    archived = []
+    totals = {}
+    for row in rows.iterator(chunk_size=2000):
+        account_id = row[account_attr]
+        archived.append(ArchivedTransaction(
+            ledger=ledger,
+            account_id=account_id,
+            original_id=row["id"],
+            amount=row["amount"],
+            transaction_type=row["transaction_type"],
+            kind=row["kind"],
+            description=row["description"],
+            metadata={name: row[name] for name in metadata_fields if row[name] is not None},
+            created_at=row["created_at"],
+        ))
+        total = totals.setdefault(account_id, {"credits": Decimal("0"), "debits": Decimal("0"), "net": Decimal("0")})
+        if row["transaction_type"] == "credit":
+            total["net"] += row["amount"]
+        else:
+            total["net"] -= row["amount"]
+        # Opening-balance rows were already counted when the rows they carry were archived
+        if row["kind"] != "opening_balance":
+            total["credits" if row["transaction_type"] == "credit" else "debits"] += row["amount"]
+
+    if not archived:
+        return 0, 0
+
+    ArchivedTransaction.objects.bulk_create(archived, batch_size=2000)
+    ids = [row.original_id for row in archived]
+    for i in range(0, len(ids), 2000):
+        txn_model.objects.filter(id__in=ids[i:i + 2000], created_at__lt=cutoff).delete()
+
+    txn_model.objects.bulk_create([
+        txn_model(
+            **{account_attr: account_id},
+            amount=abs(total["net"]),
+            transaction_type="credit" if total["net"] >= 0 else "debit",
+            kind="opening_balance",
+            description=f"Opening balance as of {timezone.localdate(cutoff):%Y-%m-%d}",
+            created_at=cutoff,
+        )
+        for account_id, total in totals.items()
+        if total["net"]
+    ], batch_size=2000)
+
+    existing = {
+        archive.account_id: archive
+        for archive in LedgerArchive.objects.select_for_update().filter(ledger=ledger, account_id__in=totals)
+    }
+    new_archives = []
+    for account_id, total in totals.items():
+        archive = existing.get(account_id)
+        if archive is None:
+            new_archives.append(LedgerArchive(
+                ledger=ledger, account_id=account_id,
+                credits=total["credits"], debits=total["debits"], archived_until=cutoff,
+            ))
+        else:
+            archive.credits += total["credits"]
+            archive.debits += total["debits"]
+            archive.archived_until = max(archive.archived_until, cutoff)
+            archive.updated_at = timezone.now()
+    LedgerArchive.objects.bulk_create(new_archives)
+    LedgerArchive.objects.bulk_update(existing.values(), ["credits", "debits", "archived_until", "updated_at"])
+    return len(totals), len(archived)
+
+
+def archived_totals(ledger, account_id):
+    """(credits, debits) of an account's archived rows"""
+    archive = LedgerArchive.objects.filter(ledger=ledger, account_id=account_id).first()
+    if archive is None:
+        return Decimal("0"), Decimal("0")
+    return archive.credits, archive.debits
+
+
+def statement_rows(ledger, account_id, start=None, end=None):
+    """
+    Yield an account's ledger rows in [start, end) in date order, merging archived
+    and hot rows. Opening-balance rows are skipped because the rows they summarise
+    are read from the archive instead.
+    """
+    txn_model, account_field = ledger_transactions(ledger)
+    fields = ["created_at", "transaction_type", "kind", "amount", "description"]
+    hot = txn_model.objects.filter(**{f"{account_field}_id": account_id}).exclude(kind="opening_balance")
+    cold = ArchivedTransaction.objects.filter(ledger=ledger, account_id=account_id).exclude(kind="opening_balance")
+    if start:
+        hot, cold = hot.filter(created_at__gte=start), cold.filter(created_at__gte=start)
+    if end:
+        hot, cold = hot.filter(created_at__lt=end), cold.filter(created_at__lt=end)
+
+    hot_rows = hot.order_by("created_at", "id").values(*fields, original_id=F("id")).iterator(chunk_size=2000)
+    cold_rows = cold.order_by("created_at", "original_id").values(*fields, "original_id").iterator(chunk_size=2000)
+    return heapq.merge(cold_rows, hot_rows, key=lambda row: (row["created_at"], row["original_id"]))
+
+
+def balance_before(ledger, account_id, moment):
+    """Credits minus debits of an account's rows (hot and archived) created before moment"""
+    txn_model, account_field = ledger_transactions(ledger)
+    net = Decimal("0")
+    for queryset in (
+        txn_model.objects.filter(**{f"{account_field}_id": account_id}).exclude(kind="opening_balance"),
+        ArchivedTransaction.objects.filter(ledger=ledger, account_id=account_id).exclude(kind="opening_balance"),
+    ):
+        sums = queryset.filter(created_at__lt=moment).aggregate(
+            credits=Sum("amount", filter=Q(transaction_type="credit")),
+            debits=Sum("amount", filter=Q(transaction_type="debit")),
+        )
+        net += (sums["credits"] or 0) - (sums["debits"] or 0)
+    return net
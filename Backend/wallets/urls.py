@@ -1,8 +1,12 @@
 from django.urls import path
-from .views import WalletView, FundsView, PointsView
+from .views import WalletView, FundsView, PointsView, StatementView, EarningsView, EarningsByLevelView, EarningsByDownlineView
 
 urlpatterns = [
     path("", WalletView.as_view(), name="wallet"),
     path("funds/", FundsView.as_view(), name="funds"),
     path("points/", PointsView.as_view(), name="points"),
+    path("statement/", StatementView.as_view(), name="statement"),
+    path("earnings/", EarningsView.as_view(), name="earnings"),
+    path("earnings/by-level/", EarningsByLevelView.as_view(), name="earnings-by-level"),
+    path("earnings/by-downline/", EarningsByDownlineView.as_view(), name="earnings-by-downline"),
 ]
@@ -1,13 +1,20 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from .models import Wallet, WalletTransaction, Funds, FundsTransaction, Points, PointsTransaction
+from .models import WalletTransaction, Funds, FundsTransaction, Points, PointsTransaction, EarningsRollup
+from .services import LEDGERS, archived_totals, statement_rows, balance_before, user_wallet
 from .serializers import (
     WalletSerializer, WalletTransactionSerializer,
     FundsSerializer, FundsTransactionSerializer,
     PointsSerializer, PointsTransactionSerializer
 )
-from django.db.models import Sum
+from django.db.models import Sum, Count, Min
+from django.db.models.functions import TruncDay, TruncWeek, TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.http import StreamingHttpResponse
+from datetime import datetime, time, timedelta
+import csv
 
 # Wallet Views
 class WalletView(APIView):
@@ -16,21 +23,26 @@ class WalletView(APIView):
     
     def get(self, request):
         user = request.user
-        wallet, created = Wallet.objects.get_or_create(user=user)
+        wallet = user_wallet(user)
         
         # Get all transactions ordered by date
         transactions = WalletTransaction.objects.filter(wallet=wallet).order_by('-created_at')
         
         # Calculate income (credits) and expense (debits)
+        # Opening-balance rows stand in for archived rows, whose totals come from the archive
         income = WalletTransaction.objects.filter(
             wallet=wallet,
             transaction_type='credit'
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        ).exclude(kind='opening_balance').aggregate(total=Sum('amount'))['total'] or 0
         
         expense = WalletTransaction.objects.filter(
             wallet=wallet,
             transaction_type='debit'
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        ).exclude(kind='opening_balance').aggregate(total=Sum('amount'))['total'] or 0
+        
+        archived_income, archived_expense = archived_totals('wallet', wallet.id)
+        income += archived_income
+        expense += archived_expense
         
         # Serialize wallet
         serializer = WalletSerializer(wallet)
@@ -58,15 +70,20 @@ class FundsView(APIView):
         transactions = FundsTransaction.objects.filter(funds=funds).order_by('-created_at')
         
         # Calculate income (credits) and expense (debits)
+        # Opening-balance rows stand in for archived rows, whose totals come from the archive
         income = FundsTransaction.objects.filter(
             funds=funds,
             transaction_type='credit'
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        ).exclude(kind='opening_balance').aggregate(total=Sum('amount'))['total'] or 0
         
         expense = FundsTransaction.objects.filter(
             funds=funds,
             transaction_type='debit'
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        ).exclude(kind='opening_balance').aggregate(total=Sum('amount'))['total'] or 0
+        
+        archived_income, archived_expense = archived_totals('funds', funds.id)
+        income += archived_income
+        expense += archived_expense
         
         # Serialize funds
         serializer = FundsSerializer(funds)
@@ -94,15 +111,20 @@ class PointsView(APIView):
         transactions = PointsTransaction.objects.filter(points=points).order_by('-created_at')
         
         # Calculate income (credits) and expense (debits)
+        # Opening-balance rows stand in for archived rows, whose totals come from the archive
         income = PointsTransaction.objects.filter(
             points=points,
             transaction_type='credit'
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        ).exclude(kind='opening_balance').aggregate(total=Sum('amount'))['total'] or 0
         
         expense = PointsTransaction.objects.filter(
             points=points,
             transaction_type='debit'
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        ).exclude(kind='opening_balance').aggregate(total=Sum('amount'))['total'] or 0
+        
+        archived_income, archived_expense = archived_totals('points', points.id)
+        income += archived_income
+        expense += archived_expense
         
         # Serialize points
         serializer = PointsSerializer(points)
@@ -116,3 +138,172 @@ class PointsView(APIView):
         data['expense'] = str(expense)
         
         return Response(data, status=status.HTTP_200_OK)
+
+
+# Statement Views
+class Echo:
+    """File-like object that hands back what csv.writer writes, for streaming"""
+    def write(self, value):
+        return value
+
+class StatementView(APIView):
+    """Stream the authenticated user's statement as CSV, reading archived rows transparently"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        ledger = request.query_params.get("ledger", "wallet")
+        if ledger not in LEDGERS:
+            return Response({"error": "ledger must be wallet, funds or points"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            start = self.parse_day(request, "from")
+            end = self.parse_day(request, "to")
+        except ValueError:
+            return Response({"error": "from and to must be dates (YYYY-MM-DD)"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Date filters are inclusive days in the local timezone
+        start_at = timezone.make_aware(datetime.combine(start, time.min)) if start else None
+        end_at = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)) if end else None
+
+        account, created = LEDGERS[ledger].objects.get_or_create(user=request.user)
+        opening = balance_before(ledger, account.id, start_at) if start_at else 0
+
+        def rows():
+            writer = csv.writer(Echo())
+            balance = opening
+            yield writer.writerow(["date", "type", "kind", "amount", "balance", "description"])
+            yield writer.writerow([start or "", "opening", "", "", balance, "Balance brought forward"])
+            for row in statement_rows(ledger, account.id, start_at, end_at):
+                balance += row["amount"] if row["transaction_type"] == "credit" else -row["amount"]
+                yield writer.writerow([
+                    timezone.localtime(row["created_at"]).isoformat(),
+                    row["transaction_type"], row["kind"], row["amount"], balance, row["description"],
+                ])
+
+        response = StreamingHttpResponse(rows(), content_type="text/csv")
+        response["Content-Disposition"] = f'attachment; filename="{ledger}-statement.csv"'
+        return response
+
+    @staticmethod
+    def parse_day(request, name):
+        value = request.query_params.get(name)
+        if not value:
+            return None
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        return day
+
+# Earnings Views
+class EarningsView(APIView):
+    """Earnings time series of the authenticated user, read from the daily rollup"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    # granularity -> (truncation, default window)
+    GRANULARITIES = {
+        "day": (TruncDay, timedelta(days=30)),
+        "week": (TruncWeek, timedelta(weeks=12)),
+        "month": (TruncMonth, timedelta(days=365)),
+    }
+
+    def get(self, request):
+        granularity = request.query_params.get("granularity", "day")
+        if granularity not in self.GRANULARITIES:
+            return Response({"error": "granularity must be day, week or month"}, status=status.HTTP_400_BAD_REQUEST)
+        trunc, window = self.GRANULARITIES[granularity]
+
+        try:
+            end = parse_date(request.query_params["to"]) if request.query_params.get("to") else timezone.localdate()
+            start = parse_date(request.query_params["from"]) if request.query_params.get("from") else end - window
+        except ValueError:
+            start = end = None
+        if start is None or end is None:
+            return Response({"error": "from and to must be dates (YYYY-MM-DD)"}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = EarningsRollup.objects.filter(user=request.user, day__gte=start, day__lte=end)
+
+        # Optional kind filter (e.g. commission)
+        kind = request.query_params.get("kind")
+        if kind:
+            queryset = queryset.filter(kind=kind)
+
+        rows = (
+            queryset
+            .annotate(period=trunc("day"))
+            .values("period")
+            .annotate(total=Sum("total"), count=Sum("count"))
+            .order_by("period")
+        )
+
+        return Response({
+            "granularity": granularity,
+            "from": start,
+            "to": end,
+            "series": [
+                {"period": row["period"], "total": str(row["total"]), "count": row["count"]}
+                for row in rows
+            ]
+        }, status=status.HTTP_200_OK)
+
+class EarningsByLevelView(APIView):
+    """Commission earnings of the authenticated user grouped by upline level"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        wallet = user_wallet(request.user)
+
+        rows = (
+            WalletTransaction.objects
+            .filter(wallet=wallet, kind="commission")
+            .values("level")
+            .annotate(total=Sum("amount"), count=Count("id"))
+            .order_by("level")
+        )
+
+        return Response({
+            "levels": [
+                {"level": row["level"], "total": str(row["total"]), "count": row["count"]}
+                for row in rows
+            ]
+        }, status=status.HTTP_200_OK)
+
+class EarningsByDownlineView(APIView):
+    """Commission earnings of the authenticated user grouped by the downline whose purchase paid them"""
+    permission_classes = [permissions.IsAuthenticated]
+    MAX_LIMIT = 500
+
+    def get(self, request):
+        wallet = user_wallet(request.user)
+
+        try:
+            limit = min(max(int(request.query_params.get("limit", 50)), 1), self.MAX_LIMIT)
+            offset = max(int(request.query_params.get("offset", 0)), 0)
+            # Optional level filter
+            level = request.query_params.get("level")
+            level = int(level) if level else None
+        except ValueError:
+            return Response({"error": "limit, offset and level must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = WalletTransaction.objects.filter(wallet=wallet, kind="commission", source_user__isnull=False)
+        if level is not None:
+            queryset = queryset.filter(level=level)
+
+        rows = (
+            queryset
+            .values("source_user", "source_user__username")
+            .annotate(total=Sum("amount"), count=Count("id"), level=Min("level"))
+            .order_by("-total", "source_user")[offset:offset + limit]
+        )
+
+        return Response({
+            "downlines": [
+                {
+                    "user_id": row["source_user"],
+                    "username": row["source_user__username"],
+                    "level": row["level"],
+                    "total": str(row["total"]),
+                    "count": row["count"],
+                }
+                for row in rows
+            ]
+        }, status=status.HTTP_200_OK)
@@ -16,13 +16,13 @@ export default function AdminEditUserPage() {
   const userId = params.id;
   const [loading, setLoading] = useState(true);
   const [saving, setSaving] = useState(false);
-  const [referralCodes, setReferralCodes] = useState([]);
   const [userInfo, setUserInfo] = useState(null);
 
   const {
     register,
     handleSubmit,
     formState: { errors },
+    setError,
     setValue,
     watch,
   } = useForm({
@@ -62,26 +62,9 @@ export default function AdminEditUserPage() {
   });
 
   useEffect(() => {
-    fetchReferralCodes();
     fetchUser();
   }, [userId]);
 
-  const fetchReferralCodes = async () => {
-    try {
-      const response = await axios.get("/api/admin/users/");
-      const users = response.data.results || response.data;
-      const codes = users
-        .filter((u) => u.info?.own_refercode && u.id !== parseInt(userId))
-        .map((u) => ({
-          label: `${u.username} (${u.info.own_refercode})`,
-          value: u.info.own_refercode,
-        }));
-      setReferralCodes(codes);
-    } catch (error) {
-      console.error("Error fetching referral codes:", error);
-    }
-  };
-
   const fetchUser = async () => {
     try {
       setLoading(true);
@@ -96,15 +79,7 @@ export default function AdminEditUserPage() {
       setValue("is_staff", user.is_staff || false);
       setValue("is_superuser", user.is_superuser || false);
 
-      if (user.referred_by) {
-        // Find referral code for referred_by user
-        const usersResponse = await axios.get("/api/admin/users/");
-        const users = usersResponse.data.results || usersResponse.data;
-        const referredUser = users.find((u) => u.id === user.referred_by);
-        if (referredUser?.info?.own_refercode) {
-          setValue("referred_by", referredUser.info.own_refercode);
-        }
-      }
+      setValue("referred_by", user.referred_by_refercode || "");
 
       if (user.info) {
         setValueInfo("member_status", user.info.member_status || "user");
@@ -149,19 +124,22 @@ export default function AdminEditUserPage() {
         submitData.password = data.password;
       }
 
-      // Handle referred_by - find user by referral code
-      if (data.referred_by) {
+      // Handle referred_by - find the owner of the referral code
+      if (data.referred_by && data.referred_by.trim()) {
         try {
-          const usersResponse = await axios.get("/api/admin/users/");
-          const users = usersResponse.data.results || usersResponse.data;
-          const referredUser = users.find(
-            (u) => u.info?.own_refercode === data.referred_by
-          );
-          if (referredUser) {
-            submitData.referred_by = referredUser.id;
+          const lookup = await axios.get("/api/admin/users/lookup/", {
+            params: { refer_code: data.referred_by.trim() },
+          });
+          if (lookup.data.id === parseInt(userId)) {
+            setError("referred_by", { message: "A user cannot refer themselves" });
+            return;
           }
+          submitData.referred_by = lookup.data.id;
         } catch (error) {
-          console.error("Error finding referred user:", error);
+          setError("referred_by", {
+            message: error.response?.data?.error || "Could not check the referral code",
+          });
+          return;
         }
       }
 
@@ -417,16 +395,10 @@ export default function AdminEditUserPage() {
                   Referral Information
                 </h2>
                 <div className="space-y-3 sm:space-y-4">
-                  <Select
+                  <Input
                     label="Referred By (Optional)"
-                    data={[
-                      { label: "None", value: "" },
-                      ...referralCodes,
-                    ]}
+                    placeholder="Sponsor's referral code"
                     {...register("referred_by")}
-                    onChange={(e) => {
-                      setValue("referred_by", e.target.value);
-                    }}
                     error={errors.referred_by?.message}
                   />
                 </div>
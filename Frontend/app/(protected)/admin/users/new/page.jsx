@@ -1,25 +1,24 @@
 "use client";
 
-import { useState, useEffect } from "react";
+import { useState } from "react";
 import { useRouter } from "next/navigation";
 import { useForm } from "react-hook-form";
 import { toast } from "sonner";
 import { ArrowLeftIcon } from "@heroicons/react/24/outline";
 
 import { Page } from "components/shared/Page";
-import { Card, Button, Input, Select, Checkbox } from "components/ui";
+import { Card, Button, Input, Checkbox } from "components/ui";
 import axios from "utils/axios";
 
 export default function AdminNewUserPage() {
   const router = useRouter();
   const [loading, setLoading] = useState(false);
-  const [referralCodes, setReferralCodes] = useState([]);
 
   const {
     register,
     handleSubmit,
     formState: { errors },
-    setValue,
+    setError,
     watch,
   } = useForm({
     defaultValues: {
@@ -34,26 +33,6 @@ export default function AdminNewUserPage() {
     },
   });
 
-  useEffect(() => {
-    fetchReferralCodes();
-  }, []);
-
-  const fetchReferralCodes = async () => {
-    try {
-      const response = await axios.get("/api/admin/users/");
-      const users = response.data.results || response.data;
-      const codes = users
-        .filter((u) => u.info?.own_refercode)
-        .map((u) => ({
-          label: `${u.username} (${u.info.own_refercode})`,
-          value: u.info.own_refercode,
-        }));
-      setReferralCodes(codes);
-    } catch (error) {
-      console.error("Error fetching referral codes:", error);
-    }
-  };
-
   const onSubmit = async (data) => {
     try {
       setLoading(true);
@@ -68,19 +47,18 @@ export default function AdminNewUserPage() {
         is_superuser: data.is_superuser,
       };
 
-      // Handle referred_by - find user by referral code
-      if (data.referred_by) {
+      // Handle referred_by - find the owner of the referral code
+      if (data.referred_by && data.referred_by.trim()) {
         try {
-          const usersResponse = await axios.get("/api/admin/users/");
-          const users = usersResponse.data.results || usersResponse.data;
-          const referredUser = users.find(
-            (u) => u.info?.own_refercode === data.referred_by
-          );
-          if (referredUser) {
-            submitData.referred_by = referredUser.id;
-          }
+          const lookup = await axios.get("/api/admin/users/lookup/", {
+            params: { refer_code: data.referred_by.trim() },
+          });
+          submitData.referred_by = lookup.data.id;
         } catch (error) {
-          console.error("Error finding referred user:", error);
+          setError("referred_by", {
+            message: error.response?.data?.error || "Could not check the referral code",
+          });
+          return;
         }
       }
 
@@ -196,16 +174,10 @@ export default function AdminNewUserPage() {
                   Referral Information
                 </h2>
                 <div className="space-y-3 sm:space-y-4">
-                  <Select
+                  <Input
                     label="Referred By (Optional)"
-                    data={[
-                      { label: "None", value: "" },
-                      ...referralCodes,
-                    ]}
+                    placeholder="Sponsor's referral code"
                     {...register("referred_by")}
-                    onChange={(e) => {
-                      setValue("referred_by", e.target.value);
-                    }}
                     error={errors.referred_by?.message}
                   />
                 </div>
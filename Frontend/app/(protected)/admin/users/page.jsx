@@ -21,6 +21,9 @@ export default function AdminUsersPage() {
   const router = useRouter();
   const [users, setUsers] = useState([]);
   const [loading, setLoading] = useState(true);
+  // Cursor of the next page from /api/admin/users/; null when every user is loaded
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [deleteModal, setDeleteModal] = useState({
     show: false,
     userId: null,
@@ -38,27 +41,35 @@ export default function AdminUsersPage() {
     fetchUsers();
   }, [filters]);
 
-  const fetchUsers = async () => {
+  const fetchUsers = async (cursor = null) => {
     try {
-      setLoading(true);
+      if (cursor) setLoadingMore(true);
+      else setLoading(true);
       const params = new URLSearchParams();
       if (search) params.append("search", search);
       if (filters.is_active) params.append("is_active", filters.is_active);
       if (filters.is_staff) params.append("is_staff", filters.is_staff);
       if (filters.member_status)
         params.append("member_status", filters.member_status);
+      if (cursor) params.append("cursor", cursor);
 
       const response = await axios.get(
         `/api/admin/users/?${params.toString()}`
       );
-      setUsers(response.data.results || response.data);
+      const page = response.data.results || response.data;
+      setUsers((current) => (cursor ? [...current, ...page] : page));
+      setNextCursor(response.data.next_cursor || null);
     } catch (error) {
       console.error("Error fetching users:", error);
       toast.error("Failed to load users", {
-        description: error.response?.data?.detail || "Please try again later",
+        description:
+          error.response?.data?.error ||
+          error.response?.data?.detail ||
+          "Please try again later",
       });
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
@@ -71,8 +82,11 @@ export default function AdminUsersPage() {
 
     try {
       setDeleteLoading(true);
+      // The account is deactivated now and removed by a background job
       await axios.delete(`/api/admin/users/${deleteModal.userId}/`);
-      toast.success("User deleted successfully");
+      toast.success("User deletion started", {
+        description: "The account is deactivated and will be removed shortly.",
+      });
       setDeleteModal({ show: false, userId: null, userName: "" });
       fetchUsers();
     } catch (error) {
@@ -409,6 +423,19 @@ export default function AdminUsersPage() {
                   </tbody>
                 </Table>
               </div>
+
+              {nextCursor && (
+                <div className="flex justify-center border-t border-gray-200 p-4 dark:border-dark-500">
+                  <Button
+                    onClick={() => fetchUsers(nextCursor)}
+                    variant="flat"
+                    disabled={loadingMore}
+                    className="w-full sm:w-auto"
+                  >
+                    {loadingMore ? "Loading..." : "Load more"}
+                  </Button>
+                </div>
+              )}
             </>
           )}
         </Card>
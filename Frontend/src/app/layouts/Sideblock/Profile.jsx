@@ -43,7 +43,9 @@ export function Profile() {
   }, [user]);
 
   const profilePicture =
-    userInfo?.profile_picture || "/images/avatar/avatar-12.jpg";
+    userInfo?.profile_picture_thumbnail ||
+    userInfo?.profile_picture ||
+    "/images/avatar/avatar-12.jpg";
 
   const handleLogout = () => {
     toast.success("Logged out successfully", {
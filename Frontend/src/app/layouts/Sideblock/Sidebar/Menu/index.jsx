@@ -143,7 +143,7 @@ export function Menu() {
             "+8800000000000"
           }
           avatarSrc={
-            userData?.profile_picture || "/images/avatar/avatar-20.jpg"
+            userData?.profile_picture_thumbnail || userData?.profile_picture || "/images/avatar/avatar-20.jpg"
           }
           referralCode={userData?.own_refercode || "N/A"}
           showStatus={true}
@@ -175,7 +175,7 @@ export function Menu() {
             "+8800000000000"
           }
           avatarSrc={
-            userData?.profile_picture || "/images/avatar/avatar-20.jpg"
+            userData?.profile_picture_thumbnail || userData?.profile_picture || "/images/avatar/avatar-20.jpg"
           }
           referralCode={userData?.own_refercode || "N/A"}
           showStatus={true}